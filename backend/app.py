@@ -4,49 +4,104 @@ running on Raspberry Pi.
 """
 
 from flask import Flask, jsonify, request
-import logging
-from logging.handlers import RotatingFileHandler
-import os
+import json
 from datetime import datetime
 
 # Import modules
 from config import Config
-from database import db
+from database import db, upgrade_schema
+from storage import storage
 from mqtt_client import mqtt_client
+import metrics
+from services.ingest_service import ingest_buffer
+from services.device_cache import device_cache
+from services.dedup_service import event_window
+from services.automation_service import automation_engine
+from services.telemetry_service import telemetry_hub
+from services.command_service import command_dispatcher
+from services.reconcile_service import state_reconciler
+from services.anomaly_service import anomaly_detector
+from services.schedule_service import schedule_engine
+from services.liveness_service import liveness_tracker
+from utils.http_cache import response_cache
+from utils.metrics import registry, CONTENT_TYPE
+from utils.log_utils import configure_logging
+from scheduler import start_scheduler
 from models.device import Device
 from models.sensor_data import SensorData
 from models.control_history import ControlHistory
+from models.sensor_rollup import SensorRollup
+from models.sensor_anomaly import SensorAnomaly
+from models.fan_usage import FanUsage
+from models.control_schedule import ControlSchedule
+from models.device_outage import DeviceOutage
 
 # Import routes
 from routes.device_routes import device_bp
 from routes.control_routes import control_bp
+from routes.analytics_routes import analytics_bp
+from routes.schedule_routes import schedule_bp
 
 # Initialize Flask app
 app = Flask(__name__)
 app.config.from_object(Config)
 
 # Configure logging
-if not os.path.exists('logs'):
-    os.mkdir('logs')
-
-file_handler = RotatingFileHandler('logs/exhaust_fan.log', maxBytes=10240, backupCount=10)
-file_handler.setFormatter(logging.Formatter(
-    '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
-))
-file_handler.setLevel(logging.INFO)
-app.logger.addHandler(file_handler)
-app.logger.setLevel(logging.INFO)
+configure_logging(app)
 app.logger.info('Exhaust Fan Backend startup')
 
-# Initialize database
+# Initialize database and the storage backend for it
 db.init_app(app)
+storage.init_app(app)
+
+# Initialize device state cache and reading deduplication
+device_cache.init_app(app)
+event_window.init_app(app)
+
+# Initialize metrics and per-route request timing
+metrics.init_app(app)
+
+# Initialize serialized device response cache
+response_cache.init_app(app)
+
+# Initialize server-side fan automation
+automation_engine.init_app(app)
+
+# Initialize live telemetry streaming
+telemetry_hub.init_app(app)
+
+# Initialize command/report reconciliation (only fed where device topics are consumed)
+state_reconciler.init_app(app)
+
+# Initialize fleet sensor anomaly detection (also only fed by the device consumer)
+anomaly_detector.init_app(app)
+
+# Initialize device liveness tracking (also only fed by the device consumer)
+liveness_tracker.init_app(app)
+
+# Initialize control schedules (fired by the process running the scheduler)
+schedule_engine.init_app(app)
+
+# Initialize buffered sensor ingestion and maintenance jobs when this
+# process consumes device topics; the jobs run right away, so the schema
+# must be up to date before they start
+if app.config['MQTT_SUBSCRIBE_DEVICES']:
+    with app.app_context():
+        upgrade_schema()
+    ingest_buffer.init_app(app)
+    start_scheduler(app)
 
 # Initialize MQTT client
 mqtt_client.init_app(app)
 
+# Initialize background publishing of control commands
+command_dispatcher.init_app(app)
+
 # Register blueprints
 app.register_blueprint(device_bp, url_prefix='/api/devices')
 app.register_blueprint(control_bp, url_prefix='/api/control')
+app.register_blueprint(analytics_bp, url_prefix='/api/analytics')
+app.register_blueprint(schedule_bp, url_prefix='/api/schedules')
 
 # Health check endpoint
 @app.route('/api/health', methods=['GET'])
@@ -57,6 +112,11 @@ def health_check():
         'version': '1.0.0'
     })
 
+# Metrics endpoint (values of this worker process)
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return app.response_class(registry.render(), content_type=CONTENT_TYPE)
+
 # Error handlers
 @app.errorhandler(404)
 def not_found_error(error):
@@ -68,26 +128,45 @@ def internal_error(error):
     app.logger.error('Server Error: %s', str(error))
     return jsonify({'error': 'Internal server error'}), 500
 
-# Create database tables if they don't exist
+# Create database tables and indexes if they don't exist
 @app.before_first_request
 def create_tables():
-    db.create_all()
+    upgrade_schema()
 
 # MQTT callbacks
 @mqtt_client.on_connect()
 def handle_connect(client, userdata, flags, rc):
     if rc == 0:
         app.logger.info('Connected to MQTT Broker')
-        # Subscribe to device topics
-        client.subscribe('device/#')
+        # Subscribe to device topics unless ingest.py is the dedicated consumer,
+        # in which case live readings arrive already processed on telemetry/#
+        if app.config['MQTT_SUBSCRIBE_DEVICES']:
+            client.subscribe('device/#')
+            if state_reconciler.enabled:
+                client.subscribe('control/#')
+        elif app.config['MQTT_SUBSCRIBE_TELEMETRY']:
+            client.subscribe('telemetry/#')
     else:
         app.logger.error(f'Failed to connect to MQTT Broker with code {rc}')
 
+@mqtt_client.on_publish()
+def handle_publish(client, userdata, mid):
+    # Runs on the MQTT network thread; the dispatcher matches the message ID
+    command_dispatcher.acknowledge(mid)
+
 @mqtt_client.on_message()
 def handle_message(client, userdata, message):
     try:
+        if message.topic.startswith('telemetry/'):
+            telemetry_hub.dispatch(json.loads(message.payload))
+            return
+        if message.topic.startswith('control/'):
+            state_reconciler.process_command_message(message)
+            return
+        
         from services.device_service import process_device_message
-        process_device_message(message)
+        with app.app_context():
+            process_device_message(message)
     except Exception as e:
         app.logger.error(f'Error processing MQTT message: {str(e)}')
 
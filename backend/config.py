@@ -13,6 +13,25 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///exhaust_fan.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Storage backend ('auto' picks it from the database URI scheme; the
+    # PostgreSQL backend needs psycopg2 for COPY bulk loading)
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND') or 'auto'
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS') or 'NORMAL'
+    SQLITE_BUSY_TIMEOUT = float(os.environ.get('SQLITE_BUSY_TIMEOUT') or 30.0)  # seconds
+    # SQLite tuning profile ('default' or 'pi'); the settings below override
+    # single values of it when set
+    SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE') or 'default'
+    SQLITE_CACHE_SIZE = os.environ.get('SQLITE_CACHE_SIZE')  # KiB per connection
+    SQLITE_MMAP_SIZE = os.environ.get('SQLITE_MMAP_SIZE')  # bytes
+    SQLITE_TEMP_STORE = os.environ.get('SQLITE_TEMP_STORE')  # 'DEFAULT', 'FILE' or 'MEMORY'
+    SQLITE_POOL_SIZE = os.environ.get('SQLITE_POOL_SIZE')  # connections kept per process
+    SQLITE_POOL_OVERFLOW = os.environ.get('SQLITE_POOL_OVERFLOW')
+    SQLITE_CHECKPOINT_INTERVAL = os.environ.get('SQLITE_CHECKPOINT_INTERVAL')  # seconds
+    STORAGE_TIMESCALE = os.environ.get('STORAGE_TIMESCALE', 'auto').lower()  # 'auto', 'true' or 'false'
+    STORAGE_PARTITION_DAYS = int(os.environ.get('STORAGE_PARTITION_DAYS') or 7)
+    STORAGE_PARTITIONS_AHEAD = int(os.environ.get('STORAGE_PARTITIONS_AHEAD') or 2)
+    STORAGE_MAINTENANCE_INTERVAL = int(os.environ.get('STORAGE_MAINTENANCE_INTERVAL') or 3600)  # seconds
+    
     # MQTT configuration
     MQTT_BROKER_URL = os.environ.get('MQTT_BROKER_URL') or 'localhost'
     MQTT_BROKER_PORT = int(os.environ.get('MQTT_BROKER_PORT') or 1883)
@@ -21,17 +40,138 @@ class Config:
     MQTT_CLIENT_ID = os.environ.get('MQTT_CLIENT_ID') or 'exhaust_fan_backend'
     MQTT_KEEPALIVE = int(os.environ.get('MQTT_KEEPALIVE') or 60)
     
+    # Whether the web app subscribes to device topics itself. Disable this
+    # when ingest.py runs as the dedicated subscriber so gunicorn workers
+    # only publish control commands.
+    MQTT_SUBSCRIBE_DEVICES = os.environ.get('MQTT_SUBSCRIBE_DEVICES', 'true').lower() == 'true'
+    MQTT_INGEST_CLIENT_ID = os.environ.get('MQTT_INGEST_CLIENT_ID') or 'exhaust_fan_ingest'
+    MQTT_INGEST_QOS = int(os.environ.get('MQTT_INGEST_QOS') or 1)
+    # Whether a publish-only web app receives processed readings from the
+    # ingest process for live telemetry streams
+    MQTT_SUBSCRIBE_TELEMETRY = os.environ.get('MQTT_SUBSCRIBE_TELEMETRY', 'true').lower() == 'true'
+    
+    # Control command delivery (retries back off exponentially from COMMAND_RETRY_BACKOFF)
+    COMMAND_QOS = int(os.environ.get('COMMAND_QOS') or 1)
+    COMMAND_ACK_TIMEOUT = float(os.environ.get('COMMAND_ACK_TIMEOUT') or 5.0)  # seconds
+    COMMAND_MAX_RETRIES = int(os.environ.get('COMMAND_MAX_RETRIES') or 3)
+    COMMAND_RETRY_BACKOFF = float(os.environ.get('COMMAND_RETRY_BACKOFF') or 1.0)  # seconds
+    COMMAND_QUEUE_SIZE = int(os.environ.get('COMMAND_QUEUE_SIZE') or 10000)  # commands per process
+    COMMAND_STALE_JOB_INTERVAL = int(os.environ.get('COMMAND_STALE_JOB_INTERVAL') or 300)  # seconds
+    
+    # Reconciliation of commanded and reported device state (in the device consumer)
+    RECONCILE_ENABLED = os.environ.get('RECONCILE_ENABLED', 'true').lower() == 'true'
+    # Commands unconfirmed after RECONCILE_DEADLINE are re-issued; by default the
+    # dispatcher's whole retry window plus RECONCILE_CONFIRM_GRACE for the report
+    RECONCILE_DEADLINE = float(os.environ['RECONCILE_DEADLINE']) if os.environ.get('RECONCILE_DEADLINE') else None  # seconds
+    RECONCILE_CONFIRM_GRACE = float(os.environ.get('RECONCILE_CONFIRM_GRACE') or 10.0)  # seconds
+    RECONCILE_MAX_REISSUES = int(os.environ.get('RECONCILE_MAX_REISSUES') or 2)
+    RECONCILE_INTERVAL = float(os.environ.get('RECONCILE_INTERVAL') or 1.0)  # seconds
+    
+    # Fleet sensor anomaly detection (in the device consumer). Windows count
+    # readings per device; temperatures are in degrees Celsius.
+    ANOMALY_ENABLED = os.environ.get('ANOMALY_ENABLED', 'true').lower() == 'true'
+    ANOMALY_INTERVAL = float(os.environ.get('ANOMALY_INTERVAL') or 30.0)  # seconds
+    ANOMALY_WINDOW = int(os.environ.get('ANOMALY_WINDOW') or 30)  # readings
+    ANOMALY_MIN_SAMPLES = int(os.environ.get('ANOMALY_MIN_SAMPLES') or 10)  # readings
+    ANOMALY_FLATLINE_TOLERANCE = float(os.environ.get('ANOMALY_FLATLINE_TOLERANCE') or 0.0)
+    ANOMALY_SPIKE_DELTA = float(os.environ.get('ANOMALY_SPIKE_DELTA') or 5.0)
+    ANOMALY_SPIKE_MAD = float(os.environ.get('ANOMALY_SPIKE_MAD') or 6.0)  # scaled MADs
+    ANOMALY_DRIFT_THRESHOLD = float(os.environ.get('ANOMALY_DRIFT_THRESHOLD') or 4.0)
+    ANOMALY_DRIFT_MIN_PEERS = int(os.environ.get('ANOMALY_DRIFT_MIN_PEERS') or 3)  # devices per location
+    ANOMALY_MIN_TEMPERATURE = float(os.environ.get('ANOMALY_MIN_TEMPERATURE') or -40.0)
+    ANOMALY_MAX_TEMPERATURE = float(os.environ.get('ANOMALY_MAX_TEMPERATURE') or 80.0)
+    ANOMALY_LOCATION_REFRESH = float(os.environ.get('ANOMALY_LOCATION_REFRESH') or 300.0)  # seconds
+    
     # Application-specific configuration
     TEMPERATURE_THRESHOLD = float(os.environ.get('TEMPERATURE_THRESHOLD') or 35.0)
     TEMPERATURE_HYSTERESIS = float(os.environ.get('TEMPERATURE_HYSTERESIS') or 2.0)
     
+    # Server-side fan automation. Devices need firmware built with
+    # SERVER_AUTOMATION so they stay in auto mode on the server's commands.
+    AUTOMATION_ENABLED = os.environ.get('AUTOMATION_ENABLED', 'false').lower() == 'true'
+    AUTOMATION_REFRESH_INTERVAL = int(os.environ.get('AUTOMATION_REFRESH_INTERVAL') or 60)  # seconds
+    
+    # Ingestion pipeline configuration
+    INGEST_QUEUE_SIZE = int(os.environ.get('INGEST_QUEUE_SIZE') or 10000)
+    INGEST_BATCH_SIZE = int(os.environ.get('INGEST_BATCH_SIZE') or 500)
+    INGEST_FLUSH_INTERVAL = float(os.environ.get('INGEST_FLUSH_INTERVAL') or 1.0)  # seconds
+    INGEST_ENQUEUE_TIMEOUT = float(os.environ.get('INGEST_ENQUEUE_TIMEOUT') or 0.5)  # seconds
+    
+    # Device event time and duplicate detection
+    INGEST_DEDUP_WINDOW = float(os.environ.get('INGEST_DEDUP_WINDOW') or 600.0)  # seconds
+    INGEST_DEDUP_MAX_KEYS = int(os.environ.get('INGEST_DEDUP_MAX_KEYS') or 100000)
+    INGEST_MAX_LATENESS = int(os.environ.get('INGEST_MAX_LATENESS') or 86400)  # seconds
+    INGEST_MAX_CLOCK_SKEW = float(os.environ.get('INGEST_MAX_CLOCK_SKEW') or 60.0)  # seconds
+    
+    # Device state cache configuration
+    DEVICE_CACHE_TTL = float(os.environ.get('DEVICE_CACHE_TTL') or 5.0)  # seconds
+    DEVICE_CACHE_FLUSH_INTERVAL = float(os.environ.get('DEVICE_CACHE_FLUSH_INTERVAL') or 10.0)  # seconds
+    
+    # History endpoint pagination
+    MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE') or 1000)
+    
+    # Live telemetry stream configuration
+    TELEMETRY_BUFFER_SIZE = int(os.environ.get('TELEMETRY_BUFFER_SIZE') or 100)  # events per client
+    TELEMETRY_HEARTBEAT_INTERVAL = float(os.environ.get('TELEMETRY_HEARTBEAT_INTERVAL') or 15.0)  # seconds
+    TELEMETRY_MAX_CLIENTS = int(os.environ.get('TELEMETRY_MAX_CLIENTS') or 20)  # per worker
+    
+    # Device listing response cache
+    RESPONSE_CACHE_TTL = float(os.environ.get('RESPONSE_CACHE_TTL') or 1.0)  # seconds
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES') or 1024)
+    
+    # Streaming export configuration
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE') or 1000)  # rows per fetch
+    
+    # Sensor history rollup configuration
+    ROLLUP_MAX_POINTS = int(os.environ.get('ROLLUP_MAX_POINTS') or 1000)
+    ROLLUP_DEFAULT_RANGE = timedelta(hours=int(os.environ.get('ROLLUP_DEFAULT_RANGE_HOURS') or 24))
+    
+    # Fan run time and energy analytics. A reading's fan status holds until
+    # the next reading, at most FAN_USAGE_MAX_GAP (a few PUBLISH_INTERVALs).
+    FAN_POWER_WATTS = float(os.environ.get('FAN_POWER_WATTS') or 40.0)  # per fan, unless set on the device
+    FAN_USAGE_MAX_GAP = float(os.environ.get('FAN_USAGE_MAX_GAP') or 90.0)  # seconds
+    FAN_USAGE_SETTLE = float(os.environ.get('FAN_USAGE_SETTLE') or 300.0)  # seconds before a bucket is stored
+    FAN_USAGE_JOB_INTERVAL = int(os.environ.get('FAN_USAGE_JOB_INTERVAL') or 300)  # seconds
+    FAN_USAGE_BATCH_HOURS = int(os.environ.get('FAN_USAGE_BATCH_HOURS') or 6)  # hours of readings per job run
+    FAN_USAGE_DEFAULT_RANGE = timedelta(days=int(os.environ.get('FAN_USAGE_DEFAULT_RANGE_DAYS') or 30))
+    
+    # Device liveness: offline after LIVENESS_MISSED_INTERVALS missed publishes
+    # (LIVENESS_PUBLISH_INTERVAL matches PUBLISH_INTERVAL in the firmware config.h)
+    LIVENESS_ENABLED = os.environ.get('LIVENESS_ENABLED', 'true').lower() == 'true'
+    LIVENESS_PUBLISH_INTERVAL = float(os.environ.get('LIVENESS_PUBLISH_INTERVAL') or 30.0)  # seconds
+    LIVENESS_MISSED_INTERVALS = int(os.environ.get('LIVENESS_MISSED_INTERVALS') or 3)
+    LIVENESS_CHECK_INTERVAL = float(os.environ.get('LIVENESS_CHECK_INTERVAL') or 5.0)  # seconds
+    AVAILABILITY_DEFAULT_RANGE = timedelta(days=int(os.environ.get('AVAILABILITY_DEFAULT_RANGE_DAYS') or 7))
+    
+    # Control schedules (times are wall-clock times SCHEDULE_UTC_OFFSET minutes
+    # east of UTC, e.g. 420 for WIB)
+    SCHEDULE_ENABLED = os.environ.get('SCHEDULE_ENABLED', 'true').lower() == 'true'
+    SCHEDULE_UTC_OFFSET = int(os.environ.get('SCHEDULE_UTC_OFFSET') or 0)  # minutes
+    SCHEDULE_INTERVAL = float(os.environ.get('SCHEDULE_INTERVAL') or 1.0)  # seconds
+    SCHEDULE_REFRESH_INTERVAL = float(os.environ.get('SCHEDULE_REFRESH_INTERVAL') or 30.0)  # seconds
+    SCHEDULE_MISFIRE_GRACE = float(os.environ.get('SCHEDULE_MISFIRE_GRACE') or 3600.0)  # seconds
+    
+    # Metrics configuration (the ingest process serves /metrics on its own port)
+    METRICS_PORT = int(os.environ.get('METRICS_PORT') or 9101)
+    
     # API configuration
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     
-    # Logging configuration
-    LOG_TO_STDOUT = os.environ.get('LOG_TO_STDOUT') or False
+    # Logging configuration (records are written as JSON by a background thread)
+    LOG_LEVEL = os.environ.get('LOG_LEVEL') or 'INFO'
+    LOG_FILE = os.environ.get('LOG_FILE') or 'logs/exhaust_fan.log'
+    LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES') or 10 * 1024 * 1024)
+    LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT') or 10)
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE') or 10000)  # records
+    LOG_SAMPLE_INTERVAL = float(os.environ.get('LOG_SAMPLE_INTERVAL') or 60.0)  # seconds per key
+    LOG_TO_STDOUT = os.environ.get('LOG_TO_STDOUT', 'false').lower() == 'true'
     
     # Data retention configuration (in days)
     SENSOR_DATA_RETENTION = int(os.environ.get('SENSOR_DATA_RETENTION') or 30)
-    CONTROL_HISTORY_RETENTION = int(os.environ.get('CONTROL_HISTORY_RETENTION') or 60)
\ No newline at end of file
+    CONTROL_HISTORY_RETENTION = int(os.environ.get('CONTROL_HISTORY_RETENTION') or 60)
+    FAN_USAGE_RETENTION = int(os.environ.get('FAN_USAGE_RETENTION') or 400)
+    RETENTION_JOB_INTERVAL = int(os.environ.get('RETENTION_JOB_INTERVAL') or 3600)  # seconds
+    RETENTION_CHUNK_SIZE = int(os.environ.get('RETENTION_CHUNK_SIZE') or 1000)
+    RETENTION_CHUNK_PAUSE = float(os.environ.get('RETENTION_CHUNK_PAUSE') or 0.05)  # seconds
+    RETENTION_ROLLUP_BEFORE_DELETE = os.environ.get('RETENTION_ROLLUP_BEFORE_DELETE', 'true').lower() == 'true'
\ No newline at end of file
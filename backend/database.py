@@ -3,6 +3,47 @@ Database initialization for the Exhaust Fan IoT System.
 """
 
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect, text
 
 # Initialize SQLAlchemy instance
-db = SQLAlchemy()
\ No newline at end of file
+db = SQLAlchemy()
+
+def upgrade_schema():
+    """
+    Bring an existing database up to date with the models.
+    
+    Creates missing tables through the storage backend, then any nullable
+    columns and indexes declared on the models that the database does not
+    have yet (``create_all`` skips tables that already exist). Must be called
+    within an application context.
+    
+    Returns:
+        list: Names of the columns (as ``table.column``) and indexes that
+        were created.
+    """
+    # Imported here since the storage backends build on this module
+    from storage import storage
+    
+    storage.create_all()
+    
+    inspector = inspect(db.engine)
+    created = []
+    
+    for table in db.metadata.sorted_tables:
+        columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in columns and column.nullable:
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                with db.engine.begin() as connection:
+                    connection.execute(text(
+                        f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+                    ))
+                created.append(f'{table.name}.{column.name}')
+        
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=db.engine)
+                created.append(index.name)
+    
+    return created
\ No newline at end of file
@@ -0,0 +1,104 @@
+"""
+Standalone MQTT ingestion service for the Exhaust Fan IoT System.
+
+This process is the only subscriber to the device topics. It reuses
+process_device_message and the buffered ingest writer, so the gunicorn
+workers that serve the REST API never write sensor data themselves.
+"""
+
+import os
+import signal
+import paho.mqtt.client as mqtt
+
+# This process owns the device subscription; the embedded Flask-MQTT client
+# created by app.py stays publish-only here as well
+os.environ['MQTT_SUBSCRIBE_DEVICES'] = 'false'
+os.environ['MQTT_SUBSCRIBE_TELEMETRY'] = 'false'
+
+from app import app
+from database import upgrade_schema
+from services.ingest_service import ingest_buffer
+from services.device_service import process_device_message
+from services.telemetry_service import telemetry_hub
+from services.reconcile_service import state_reconciler
+from mqtt_client import publish_telemetry
+from utils.metrics import registry, start_metrics_server
+from scheduler import start_scheduler
+
+# This process may start before any HTTP request has created the schema
+with app.app_context():
+    upgrade_schema()
+
+# Start the batched writer and maintenance jobs for this process
+ingest_buffer.init_app(app)
+start_scheduler(app)
+
+# Live telemetry is served by the web workers; hand them every processed reading
+telemetry_hub.relay = publish_telemetry
+
+# Ingest metrics are only visible in this process, so serve them separately
+if app.config['METRICS_PORT']:
+    start_metrics_server(registry, app.config['METRICS_PORT'])
+
+# A fixed client ID with a persistent session means the broker keeps at most
+# one ingest consumer connected and queues QoS 1 messages across restarts
+client = mqtt.Client(client_id=app.config['MQTT_INGEST_CLIENT_ID'], clean_session=False)
+
+# MQTT callbacks
+def on_connect(client, userdata, flags, rc):
+    """Subscribe to device topics once connected."""
+    if rc == 0:
+        app.logger.info('Ingest service connected to MQTT Broker')
+        client.subscribe('device/#', qos=app.config['MQTT_INGEST_QOS'])
+        # Commands published by any worker set the desired state to reconcile
+        if state_reconciler.enabled:
+            client.subscribe('control/#', qos=app.config['MQTT_INGEST_QOS'])
+    else:
+        app.logger.error(f'Ingest service failed to connect to MQTT Broker with code {rc}')
+
+def on_message(client, userdata, message):
+    """Hand each device message to the ingest pipeline."""
+    try:
+        if message.topic.startswith('control/'):
+            state_reconciler.process_command_message(message)
+            return
+
+        with app.app_context():
+            process_device_message(message)
+    except Exception as e:
+        app.logger.error(f'Error processing MQTT message: {str(e)}')
+
+def on_disconnect(client, userdata, rc):
+    """Log unexpected disconnections; paho reconnects automatically."""
+    if rc != 0:
+        app.logger.warning(f'Ingest service lost MQTT connection with code {rc}')
+
+client.on_connect = on_connect
+client.on_message = on_message
+client.on_disconnect = on_disconnect
+
+def shutdown(signum, frame):
+    """Stop consuming and let the main loop exit."""
+    app.logger.info('Ingest service shutting down')
+    client.disconnect()
+
+def main():
+    """Run the ingest service until interrupted."""
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    
+    if app.config['MQTT_USERNAME'] and app.config['MQTT_PASSWORD']:
+        client.username_pw_set(app.config['MQTT_USERNAME'], app.config['MQTT_PASSWORD'])
+    
+    app.logger.info('Exhaust Fan ingest service startup')
+    client.connect(app.config['MQTT_BROKER_URL'], app.config['MQTT_BROKER_PORT'],
+                   app.config['MQTT_KEEPALIVE'])
+    
+    try:
+        client.loop_forever(retry_first_connection=True)
+    finally:
+        # Flush everything still buffered before exiting
+        ingest_buffer.stop()
+
+if __name__ == '__main__':
+    main()
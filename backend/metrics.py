@@ -0,0 +1,140 @@
+"""
+Application metrics for the Exhaust Fan IoT System.
+
+Defines the counters and histograms updated on the ingest, database and
+publish paths, and wires the gauges and per-route request timing into the
+Flask app. Every process keeps its own values: the web workers expose them
+on ``/metrics`` and ingest.py on ``METRICS_PORT``.
+"""
+
+import time
+from flask import g, request
+from utils.metrics import registry
+
+# MQTT ingestion
+messages_received = registry.counter(
+    'exhaust_mqtt_messages_received_total', 'Device messages received from MQTT')
+messages_parsed = registry.counter(
+    'exhaust_mqtt_messages_parsed_total', 'Device messages decoded successfully', ['encoding'])
+messages_rejected = registry.counter(
+    'exhaust_mqtt_messages_rejected_total', 'Device messages that were not ingested', ['reason'])
+messages_late = registry.counter(
+    'exhaust_mqtt_messages_late_total', 'Device readings older than one already received from the device')
+readings_committed = registry.counter(
+    'exhaust_sensor_readings_committed_total', 'Sensor readings committed to the database')
+ingest_flush_failures = registry.counter(
+    'exhaust_ingest_flush_failures_total', 'Ingest batches that failed to commit')
+
+# Database
+db_commit_duration = registry.histogram(
+    'exhaust_db_commit_duration_seconds', 'Duration of ingest batch writes including the commit')
+ingest_batch_size = registry.histogram(
+    'exhaust_ingest_batch_size', 'Readings per committed ingest batch',
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500))
+db_checkpoint_duration = registry.histogram(
+    'exhaust_db_checkpoint_duration_seconds', 'Duration of scheduled SQLite WAL checkpoints')
+db_wal_pages = registry.gauge(
+    'exhaust_db_wal_pages', 'Pages in the SQLite WAL at the last checkpoint')
+db_wal_pages_pending = registry.gauge(
+    'exhaust_db_wal_pages_pending', 'WAL pages the last checkpoint could not copy back yet')
+
+# Control publishing
+publish_total = registry.counter(
+    'exhaust_mqtt_publish_total', 'Control commands published', ['result'])
+publish_duration = registry.histogram(
+    'exhaust_mqtt_publish_duration_seconds', 'Time spent handing a control command to the MQTT client')
+command_results = registry.counter(
+    'exhaust_control_commands_total', 'Control commands resolved by the dispatcher', ['status'])
+command_retries = registry.counter(
+    'exhaust_control_command_retries_total', 'Control command publishes after the first attempt')
+command_delivery_duration = registry.histogram(
+    'exhaust_control_command_delivery_seconds', 'Time from queuing a control command to its broker acknowledgement')
+reconcile_results = registry.counter(
+    'exhaust_reconcile_commands_total', 'Control commands by reconciliation outcome', ['outcome'])
+command_convergence_duration = registry.histogram(
+    'exhaust_command_convergence_seconds', 'Time from a control command to the device reporting its state',
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0))
+
+# Sensor anomalies
+anomalies_detected = registry.counter(
+    'exhaust_sensor_anomalies_total', 'Sensor anomaly episodes started', ['kind'])
+anomaly_evaluation_duration = registry.histogram(
+    'exhaust_anomaly_evaluation_seconds', 'Array computation time of a fleet anomaly evaluation cycle',
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5))
+anomalies_active = registry.gauge(
+    'exhaust_sensor_anomalies_active', 'Devices with an active sensor anomaly')
+
+# Device liveness
+liveness_transitions = registry.counter(
+    'exhaust_device_liveness_transitions_total', 'Devices going offline or coming back online', ['status'])
+devices_offline = registry.gauge(
+    'exhaust_devices_offline', 'Devices that missed their report deadline')
+
+# Control schedules
+schedule_firings = registry.counter(
+    'exhaust_schedule_firings_total', 'Due schedule firings, sent or already claimed elsewhere', ['result'])
+schedules_loaded = registry.gauge(
+    'exhaust_schedules_loaded', 'Enabled control schedules in the firing heap')
+
+# Queues and caches
+ingest_queue_depth = registry.gauge(
+    'exhaust_ingest_queue_depth', 'Readings waiting for the ingest writer')
+device_cache_pending = registry.gauge(
+    'exhaust_device_cache_pending_writes', 'Devices with state not yet written back')
+telemetry_clients = registry.gauge(
+    'exhaust_telemetry_stream_clients', 'Connected live telemetry stream clients')
+commands_in_flight = registry.gauge(
+    'exhaust_control_commands_in_flight', 'Control commands queued or awaiting acknowledgement')
+reconcile_pending = registry.gauge(
+    'exhaust_reconcile_pending', 'Commanded device states not yet confirmed by a report')
+
+# HTTP
+request_duration = registry.histogram(
+    'exhaust_http_request_duration_seconds', 'HTTP request latency by route',
+    ['method', 'route', 'status'])
+
+def record_commit(batch, duration):
+    """Ingest buffer listener recording committed batches."""
+    readings_committed.inc(len(batch))
+    db_commit_duration.observe(duration)
+    ingest_batch_size.observe(len(batch))
+
+def init_app(app):
+    """
+    Register the queue gauges, commit listener and request timing hooks.
+    
+    Args:
+        app (Flask): The Flask application.
+    """
+    from services.ingest_service import ingest_buffer
+    from services.device_cache import device_cache
+    from services.telemetry_service import telemetry_hub
+    from services.command_service import command_dispatcher
+    from services.reconcile_service import state_reconciler
+    from services.anomaly_service import anomaly_detector
+    from services.schedule_service import schedule_engine
+    from services.liveness_service import liveness_tracker
+
+    ingest_queue_depth.set_function(ingest_buffer.depth)
+    device_cache_pending.set_function(device_cache.pending_count)
+    telemetry_clients.set_function(lambda: telemetry_hub.client_count)
+    commands_in_flight.set_function(command_dispatcher.in_flight)
+    reconcile_pending.set_function(state_reconciler.pending_count)
+    anomalies_active.set_function(anomaly_detector.active_count)
+    schedules_loaded.set_function(schedule_engine.scheduled_count)
+    devices_offline.set_function(liveness_tracker.offline_count)
+    ingest_buffer.add_listener(record_commit)
+    
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+    
+    @app.after_request
+    def observe_request(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            # Label by route pattern, not path, to keep the series bounded
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            request_duration.observe(time.perf_counter() - started, method=request.method,
+                                     route=route, status=response.status_code)
+        return response
\ No newline at end of file
@@ -5,4 +5,9 @@ Package initialization for the models module.
 # Import all models so they can be imported from the models package
 from models.device import Device
 from models.sensor_data import SensorData
-from models.control_history import ControlHistory
\ No newline at end of file
+from models.control_history import ControlHistory
+from models.sensor_rollup import SensorRollup
+from models.sensor_anomaly import SensorAnomaly
+from models.fan_usage import FanUsage
+from models.control_schedule import ControlSchedule
+from models.device_outage import DeviceOutage
\ No newline at end of file
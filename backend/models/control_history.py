@@ -4,18 +4,32 @@ Control History model for the Exhaust Fan IoT System.
 
 from datetime import datetime
 from database import db
+from storage import storage
+from utils.pagination import keyset_page
 
 class ControlHistory(db.Model):
     """Database model for control commands sent to exhaust fan devices."""
     
     __tablename__ = 'control_history'
+    __table_args__ = (
+        # Serves per-device recent-history queries without a scan or sort
+        db.Index('ix_control_history_device_timestamp', 'device_id', 'timestamp'),
+        # Looks up commands when the dispatcher reports their outcome
+        db.Index('ix_control_history_command_id', 'command_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     device_id = db.Column(db.String(50), db.ForeignKey('devices.id'), nullable=False)
     command_type = db.Column(db.String(50), nullable=False)  # 'fan_control', 'mode_change', etc.
     command_value = db.Column(db.String(50), nullable=False)  # 'on', 'off', 'auto', 'manual', etc.
-    source = db.Column(db.String(50), nullable=False)  # 'app', 'auto', 'schedule'
+    source = db.Column(db.String(50), nullable=False)  # 'app', 'auto', 'schedule', 'reconcile'
     timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    # Outbound command tracking (empty for rows recorded before it existed)
+    command_id = db.Column(db.String(32))
+    status = db.Column(db.String(20))  # 'pending', 'delivered', 'failed', 'diverged'
+    attempts = db.Column(db.Integer)
+    completed_at = db.Column(db.DateTime)
+    confirmed_at = db.Column(db.DateTime)  # when a device report showed the commanded state
     
     def __repr__(self):
         return f'<ControlHistory {self.id} for device {self.device_id}>'
@@ -28,7 +42,12 @@ class ControlHistory(db.Model):
             'command_type': self.command_type,
             'command_value': self.command_value,
             'source': self.source,
-            'timestamp': self.timestamp.isoformat()
+            'timestamp': self.timestamp.isoformat(),
+            'command_id': self.command_id,
+            'status': self.status,
+            'attempts': self.attempts,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+            'confirmed_at': self.confirmed_at.isoformat() if self.confirmed_at else None
         }
     
     @staticmethod
@@ -40,7 +59,7 @@ class ControlHistory(db.Model):
             device_id (str): The device ID.
             command_type (str): Type of command ('fan_control', 'mode_change', etc.).
             command_value (str): Value of the command ('on', 'off', 'auto', 'manual', etc.).
-            source (str): Source of the command ('app', 'auto', 'schedule').
+            source (str): Source of the command ('app', 'auto', 'schedule', 'reconcile').
             
         Returns:
             ControlHistory: The new control history record.
@@ -57,6 +76,136 @@ class ControlHistory(db.Model):
         
         return control_record
     
+    @staticmethod
+    def add_control_records(records):
+        """
+        Add many control records to the database in a single transaction.
+        
+        Args:
+            records (list): List of dicts with ``device_id``, ``command_type``,
+                ``command_value`` and ``source`` keys.
+        
+        Returns:
+            int: Number of records added.
+        """
+        if not records:
+            return 0
+        
+        timestamp = datetime.utcnow()
+        storage.bulk_insert(ControlHistory, [
+            dict(record, timestamp=record.get('timestamp', timestamp)) for record in records
+        ])
+        db.session.commit()
+        
+        return len(records)
+    
+    @staticmethod
+    def update_command_status(updates):
+        """
+        Record the outcome of many outbound commands in a single transaction.
+        
+        Args:
+            updates (list): List of dicts with ``command_id``, ``status``,
+                ``attempts`` and ``completed_at`` keys.
+        
+        Returns:
+            int: Number of commands updated.
+        """
+        if not updates:
+            return 0
+        
+        table = ControlHistory.__table__
+        stmt = table.update().where(table.c.command_id == db.bindparam('b_command_id')).values(
+            status=db.bindparam('b_status'),
+            attempts=db.bindparam('b_attempts'),
+            completed_at=db.bindparam('b_completed_at')
+        )
+        db.session.execute(stmt, [
+            {f'b_{key}': value for key, value in update.items()} for update in updates
+        ])
+        db.session.commit()
+        
+        return len(updates)
+    
+    @staticmethod
+    def confirm_commands(confirmations):
+        """
+        Record when device reports confirmed many commands, in one transaction.
+        
+        Args:
+            confirmations (list): List of dicts with ``command_id`` and
+                ``confirmed_at`` keys.
+        
+        Returns:
+            int: Number of commands updated.
+        """
+        if not confirmations:
+            return 0
+        
+        table = ControlHistory.__table__
+        stmt = table.update().where(table.c.command_id == db.bindparam('b_command_id')).values(
+            confirmed_at=db.bindparam('b_confirmed_at')
+        )
+        db.session.execute(stmt, [
+            {'b_command_id': item['command_id'], 'b_confirmed_at': item['confirmed_at']}
+            for item in confirmations
+        ])
+        db.session.commit()
+        
+        return len(confirmations)
+    
+    @staticmethod
+    def mark_diverged(command_ids):
+        """
+        Mark commands that devices never confirmed as diverged.
+        
+        Args:
+            command_ids (list): The command IDs.
+        
+        Returns:
+            int: Number of commands updated.
+        """
+        if not command_ids:
+            return 0
+        
+        updated = ControlHistory.query.filter(ControlHistory.command_id.in_(command_ids)) \
+                                      .update({'status': 'diverged'}, synchronize_session=False)
+        db.session.commit()
+        
+        return updated
+    
+    @staticmethod
+    def fail_stale_commands(cutoff):
+        """
+        Mark commands still pending since before a cutoff as failed.
+        
+        Args:
+            cutoff (datetime): Commands submitted before this are failed.
+        
+        Returns:
+            int: Number of commands updated.
+        """
+        failed = ControlHistory.query.filter(ControlHistory.status == 'pending',
+                                             ControlHistory.timestamp < cutoff) \
+                                     .update({'status': 'failed', 'completed_at': datetime.utcnow()},
+                                             synchronize_session=False)
+        db.session.commit()
+        
+        return failed
+    
+    @staticmethod
+    def get_by_command_id(command_id):
+        """
+        Get the control record of an outbound command.
+        
+        Args:
+            command_id (str): The command ID.
+        
+        Returns:
+            ControlHistory: The record, or None if not found.
+        """
+        return ControlHistory.query.filter_by(command_id=command_id).first()
+    
     @staticmethod
     def get_recent_history(device_id, limit=50):
         """
@@ -72,4 +221,22 @@ class ControlHistory(db.Model):
         return ControlHistory.query.filter_by(device_id=device_id) \
                                   .order_by(ControlHistory.timestamp.desc()) \
                                   .limit(limit) \
-                                  .all()
\ No newline at end of file
+                                  .all()
+    
+    @staticmethod
+    def get_page(device_id, start=None, end=None, cursor=None, limit=50):
+        """
+        Get one page of control history for a device, newest first.
+        
+        Args:
+            device_id (str): The device ID.
+            start (datetime, optional): Inclusive lower time bound.
+            end (datetime, optional): Exclusive upper time bound.
+            cursor (str, optional): Cursor returned with the previous page.
+            limit (int): Maximum number of records to return.
+            
+        Returns:
+            tuple: (list of control history records, next cursor or None).
+        """
+        return keyset_page(ControlHistory.query.filter_by(device_id=device_id), ControlHistory,
+                           start=start, end=end, cursor=cursor, limit=limit)
\ No newline at end of file
@@ -0,0 +1,109 @@
+"""
+Control Schedule model for the Exhaust Fan IoT System.
+"""
+
+from datetime import datetime
+from database import db
+
+# Value sent when a schedule's window ends, by the value sent when it starts
+END_VALUES = {'on': 'off', 'off': 'on', 'auto': 'manual', 'manual': 'auto'}
+
+class ControlSchedule(db.Model):
+    """Database model for recurring fan and mode commands for a device or location."""
+    
+    __tablename__ = 'control_schedules'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100))
+    # Exactly one target: a device or every device at a location when it fires
+    device_id = db.Column(db.String(50), db.ForeignKey('devices.id'))
+    location = db.Column(db.String(100))
+    command_type = db.Column(db.String(50), nullable=False)  # 'fan_control' or 'mode_change'
+    command_value = db.Column(db.String(50), nullable=False)  # sent at start_time: 'on', 'off', 'auto', 'manual'
+    start_time = db.Column(db.Time, nullable=False)  # wall-clock time in SCHEDULE_UTC_OFFSET
+    end_time = db.Column(db.Time)  # sends the opposite value; earlier than start_time ends the next day
+    weekdays = db.Column(db.String(7), nullable=False, default='0123456')  # days the window starts, Monday = 0
+    enabled = db.Column(db.Boolean, nullable=False, default=True)
+    last_fired_at = db.Column(db.DateTime)  # scheduled time of the newest firing claimed
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ControlSchedule {self.id} {self.command_type} {self.command_value}>'
+    
+    @property
+    def end_value(self):
+        """str: Value sent when the window ends, or None without an end time."""
+        return END_VALUES[self.command_value] if self.end_time is not None else None
+    
+    def to_dict(self):
+        """Convert schedule to dictionary representation."""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'device_id': self.device_id,
+            'location': self.location,
+            'command_type': self.command_type,
+            'command_value': self.command_value,
+            'end_value': self.end_value,
+            'start_time': self.start_time.strftime('%H:%M'),
+            'end_time': self.end_time.strftime('%H:%M') if self.end_time else None,
+            'weekdays': [int(day) for day in self.weekdays],
+            'enabled': self.enabled,
+            'last_fired_at': self.last_fired_at.isoformat() if self.last_fired_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+    
+    @staticmethod
+    def get_all(enabled_only=False):
+        """
+        Get all schedules.
+        
+        Args:
+            enabled_only (bool): Only return enabled schedules.
+        
+        Returns:
+            list: List of ControlSchedule objects ordered by ID.
+        """
+        query = ControlSchedule.query
+        if enabled_only:
+            query = query.filter(ControlSchedule.enabled.is_(True))
+        
+        return query.order_by(ControlSchedule.id).all()
+    
+    @staticmethod
+    def change_token():
+        """
+        Get a value that changes whenever a schedule is added, edited or deleted.
+        
+        Returns:
+            tuple: (number of schedules, newest ``updated_at``).
+        """
+        return tuple(db.session.query(db.func.count(ControlSchedule.id),
+                                      db.func.max(ControlSchedule.updated_at)).one())
+    
+    @staticmethod
+    def claim_firing(schedule_id, fire_at):
+        """
+        Claim a firing of a schedule so that only one process sends it.
+        
+        Moves ``last_fired_at`` forward to the firing time with a single
+        conditional update; a process that finds it already there or beyond
+        lost the race (or the firing was sent before a restart). The caller
+        is responsible for committing the session.
+        
+        Args:
+            schedule_id (int): The schedule ID.
+            fire_at (datetime): Scheduled time of the firing.
+        
+        Returns:
+            bool: True if this caller claimed the firing.
+        """
+        claimed = ControlSchedule.query.filter(
+            ControlSchedule.id == schedule_id,
+            ControlSchedule.enabled.is_(True),
+            db.or_(ControlSchedule.last_fired_at.is_(None), ControlSchedule.last_fired_at < fire_at)
+        ).update({'last_fired_at': fire_at}, synchronize_session=False)
+        
+        return claimed == 1
\ No newline at end of file
@@ -17,6 +17,9 @@ class Device(db.Model):
     fan_status = db.Column(db.Boolean, default=False)
     auto_mode = db.Column(db.Boolean, default=True)
     last_seen = db.Column(db.DateTime, default=datetime.utcnow)
+    temperature_threshold = db.Column(db.Float)  # Overrides TEMPERATURE_THRESHOLD when set
+    temperature_hysteresis = db.Column(db.Float)  # Overrides TEMPERATURE_HYSTERESIS when set
+    fan_power = db.Column(db.Float)  # Rated fan power in watts, overrides FAN_POWER_WATTS when set
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -37,6 +40,9 @@ class Device(db.Model):
             'fan_status': self.fan_status,
             'auto_mode': self.auto_mode,
             'last_seen': self.last_seen.isoformat() if self.last_seen else None,
+            'temperature_threshold': self.temperature_threshold,
+            'temperature_hysteresis': self.temperature_hysteresis,
+            'fan_power': self.fan_power,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
@@ -58,10 +64,70 @@ class Device(db.Model):
             # Create a new device with default values
             device = Device(
                 id=device_id,
-                name=f'Exhaust Fan {device_id[-1]}',  # Assumes device_id ends with a number
+                name=Device.default_name(device_id),
                 location='Unknown'
             )
             db.session.add(device)
             db.session.commit()
         
-        return device
\ No newline at end of file
+        return device
+    
+    @staticmethod
+    def default_name(device_id):
+        """
+        Build the display name given to devices that register themselves.
+        
+        Args:
+            device_id (str): The device ID.
+            
+        Returns:
+            str: The default device name.
+        """
+        return f'Exhaust Fan {device_id[-1]}'  # Assumes device_id ends with a number
+    
+    @staticmethod
+    def bulk_upsert(states, existing_ids=None):
+        """
+        Insert or update the state of many devices in one pass.
+        
+        Unknown devices are created with default name and location, known
+        devices only have their state columns updated. The caller is
+        responsible for committing the session.
+        
+        Args:
+            states (dict): Mapping of device ID to a dict of column values
+                (``last_temperature``, ``fan_status``, ``auto_mode``,
+                ``last_seen``).
+            existing_ids (set, optional): IDs already known to exist, to skip
+                the lookup query when the caller has just loaded them.
+            
+        Returns:
+            int: Number of devices that were newly created.
+        """
+        if not states:
+            return 0
+        
+        if existing_ids is None:
+            existing_ids = {
+                row.id for row in db.session.query(Device.id).filter(Device.id.in_(list(states)))
+            }
+        
+        new_devices = []
+        updated_devices = []
+        for device_id, values in states.items():
+            if device_id in existing_ids:
+                updated_devices.append(dict(values, id=device_id))
+            else:
+                new_devices.append(dict(
+                    values,
+                    id=device_id,
+                    name=Device.default_name(device_id),
+                    location='Unknown'
+                ))
+        
+        if new_devices:
+            db.session.bulk_insert_mappings(Device, new_devices)
+        if updated_devices:
+            db.session.bulk_update_mappings(Device, updated_devices)
+        
+        return len(new_devices)
\ No newline at end of file
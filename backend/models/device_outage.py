@@ -0,0 +1,122 @@
+"""
+Device Outage model for the Exhaust Fan IoT System.
+"""
+
+from database import db
+from models.device import Device
+
+class DeviceOutage(db.Model):
+    """Database model for periods in which a device stopped reporting."""
+    
+    __tablename__ = 'device_outages'
+    __table_args__ = (
+        # Serves per-device outage history without a scan or sort
+        db.Index('ix_device_outages_device_started', 'device_id', 'started_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    device_id = db.Column(db.String(50), db.ForeignKey('devices.id'), nullable=False)
+    started_at = db.Column(db.DateTime, nullable=False)  # first publish the device missed
+    ended_at = db.Column(db.DateTime, index=True)  # next message received; empty while offline
+    last_seen = db.Column(db.DateTime, nullable=False)  # last message before the outage
+    
+    def __repr__(self):
+        return f'<DeviceOutage {self.started_at} for device {self.device_id}>'
+    
+    def to_dict(self):
+        """Convert outage to dictionary representation."""
+        return {
+            'id': self.id,
+            'device_id': self.device_id,
+            'started_at': self.started_at.isoformat(),
+            'ended_at': self.ended_at.isoformat() if self.ended_at else None,
+            'active': self.ended_at is None,
+            'last_seen': self.last_seen.isoformat()
+        }
+    
+    @staticmethod
+    def record_transitions(opened, closed):
+        """
+        Open and close many outages in a single transaction.
+        
+        Args:
+            opened (list): List of dicts with ``device_id``, ``started_at``
+                and ``last_seen`` keys.
+            closed (list): ``(device_id, ended_at)`` pairs of devices that
+                reported again.
+        
+        Returns:
+            int: Number of outages opened and closed.
+        """
+        if not opened and not closed:
+            return 0
+        
+        table = DeviceOutage.__table__
+        if opened:
+            db.session.execute(table.insert(), opened)
+        if closed:
+            stmt = table.update().where(db.and_(
+                table.c.device_id == db.bindparam('b_device_id'),
+                table.c.ended_at.is_(None)
+            )).values(ended_at=db.bindparam('b_ended_at'))
+            db.session.execute(stmt, [{'b_device_id': device_id, 'b_ended_at': ended_at}
+                                      for device_id, ended_at in closed])
+        db.session.commit()
+        
+        return len(opened) + len(closed)
+    
+    @staticmethod
+    def get_active(location=None):
+        """
+        Get the outages of the devices that are offline.
+        
+        Args:
+            location (str, optional): Only devices at this location.
+        
+        Returns:
+            list: Active outages, oldest first.
+        """
+        query = DeviceOutage.query.filter(DeviceOutage.ended_at.is_(None))
+        if location is not None:
+            query = query.join(Device, Device.id == DeviceOutage.device_id) \
+                         .filter(Device.location == location)
+        
+        return query.order_by(DeviceOutage.started_at).all()
+    
+    @staticmethod
+    def get_overlapping(start, end, device_ids=None):
+        """
+        Get the outages overlapping a time range.
+        
+        Args:
+            start (datetime): Inclusive start.
+            end (datetime): Exclusive end.
+            device_ids (list, optional): Devices to include, or None for all.
+        
+        Returns:
+            list: Rows with ``device_id``, ``started_at`` and ``ended_at``.
+        """
+        query = db.session.query(DeviceOutage.device_id, DeviceOutage.started_at, DeviceOutage.ended_at) \
+                          .filter(DeviceOutage.started_at < end,
+                                  db.or_(DeviceOutage.ended_at.is_(None), DeviceOutage.ended_at > start))
+        if device_ids is not None:
+            query = query.filter(DeviceOutage.device_id.in_(device_ids))
+        
+        return query.all()
+    
+    @staticmethod
+    def get_recent(device_id, limit=50):
+        """
+        Get recent outages of a device.
+        
+        Args:
+            device_id (str): The device ID.
+            limit (int): Maximum number of outages to return.
+        
+        Returns:
+            list: Outages, newest first.
+        """
+        return DeviceOutage.query.filter_by(device_id=device_id) \
+                                 .order_by(DeviceOutage.started_at.desc()) \
+                                 .limit(limit) \
+                                 .all()
\ No newline at end of file
@@ -0,0 +1,104 @@
+"""
+Fan Usage model for the Exhaust Fan IoT System.
+"""
+
+from datetime import timedelta
+from database import db
+from storage import storage
+
+class FanUsage(db.Model):
+    """Database model for per-device fan run time in closed time buckets."""
+    
+    __tablename__ = 'fan_usage'
+    __table_args__ = (
+        # Serves fleet-wide range totals and lets retention prune a tier by age
+        db.Index('ix_fan_usage_resolution_bucket', 'resolution', 'bucket_start'),
+    )
+    
+    device_id = db.Column(db.String(50), db.ForeignKey('devices.id'), primary_key=True)
+    resolution = db.Column(db.Integer, primary_key=True)  # Bucket width in seconds
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    on_seconds = db.Column(db.Float, nullable=False)
+    observed_seconds = db.Column(db.Float, nullable=False)  # time covered by readings
+    toggles = db.Column(db.Integer, nullable=False)
+    
+    def __repr__(self):
+        return f'<FanUsage {self.resolution}s {self.bucket_start} for device {self.device_id}>'
+    
+    @staticmethod
+    def add_buckets(buckets):
+        """
+        Store computed buckets, leaving ones another process stored untouched.
+        
+        The caller is responsible for committing the session.
+        
+        Args:
+            buckets (list): List of dicts with the column values of each bucket.
+        
+        Returns:
+            int: Number of buckets submitted.
+        """
+        return storage.bulk_insert(FanUsage, buckets, ignore_conflicts=True)
+    
+    @staticmethod
+    def computed_until(resolution):
+        """
+        Get the end of the newest stored bucket of a tier.
+        
+        Buckets are computed in order, so every bucket of the tier before
+        this time is stored (devices without readings in a bucket have no
+        row).
+        
+        Args:
+            resolution (int): Bucket width in seconds.
+        
+        Returns:
+            datetime: End of the newest bucket, or None if none is stored.
+        """
+        newest = db.session.query(db.func.max(FanUsage.bucket_start)) \
+                           .filter(FanUsage.resolution == resolution) \
+                           .scalar()
+        return None if newest is None else newest + timedelta(seconds=resolution)
+    
+    @staticmethod
+    def first_bucket(resolution, since):
+        """
+        Get the start of the oldest stored bucket of a tier from a given time.
+        
+        Args:
+            resolution (int): Bucket width in seconds.
+            since (datetime): Inclusive lower bound.
+        
+        Returns:
+            datetime: Start of the bucket, or None if there is none.
+        """
+        return db.session.query(db.func.min(FanUsage.bucket_start)) \
+                         .filter(FanUsage.resolution == resolution, FanUsage.bucket_start >= since) \
+                         .scalar()
+    
+    @staticmethod
+    def totals(resolution, start, end, device_ids=None):
+        """
+        Sum the stored buckets of a tier within a time range per device.
+        
+        Args:
+            resolution (int): Bucket width in seconds.
+            start (datetime): Inclusive start, aligned to the tier.
+            end (datetime): Exclusive end, aligned to the tier.
+            device_ids (list, optional): Devices to include, or None for all.
+        
+        Returns:
+            list: Rows with ``device_id``, ``on_seconds``,
+            ``observed_seconds`` and ``toggles``.
+        """
+        query = db.session.query(FanUsage.device_id,
+                                 db.func.sum(FanUsage.on_seconds).label('on_seconds'),
+                                 db.func.sum(FanUsage.observed_seconds).label('observed_seconds'),
+                                 db.func.sum(FanUsage.toggles).label('toggles')) \
+                          .filter(FanUsage.resolution == resolution,
+                                  FanUsage.bucket_start >= start,
+                                  FanUsage.bucket_start < end)
+        if device_ids is not None:
+            query = query.filter(FanUsage.device_id.in_(device_ids))
+        
+        return query.group_by(FanUsage.device_id).all()
\ No newline at end of file
@@ -0,0 +1,109 @@
+"""
+Sensor Anomaly model for the Exhaust Fan IoT System.
+"""
+
+from database import db
+from models.device import Device
+
+class SensorAnomaly(db.Model):
+    """Database model for anomaly episodes detected in device readings."""
+    
+    __tablename__ = 'sensor_anomalies'
+    __table_args__ = (
+        # Serves per-device episode history without a scan or sort
+        db.Index('ix_sensor_anomalies_device_started', 'device_id', 'started_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    device_id = db.Column(db.String(50), db.ForeignKey('devices.id'), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # 'flatline', 'spike', 'drift', 'range'
+    started_at = db.Column(db.DateTime, nullable=False)
+    ended_at = db.Column(db.DateTime, index=True)  # empty while the episode is active
+    temperature = db.Column(db.Float)  # offending reading, or the window median for flatline/drift
+    offset = db.Column(db.Float)  # drift only: difference to the location median
+    
+    def __repr__(self):
+        return f'<SensorAnomaly {self.kind} for device {self.device_id}>'
+    
+    def to_dict(self):
+        """Convert anomaly episode to dictionary representation."""
+        return {
+            'id': self.id,
+            'device_id': self.device_id,
+            'kind': self.kind,
+            'started_at': self.started_at.isoformat(),
+            'ended_at': self.ended_at.isoformat() if self.ended_at else None,
+            'active': self.ended_at is None,
+            'temperature': self.temperature,
+            'offset': self.offset
+        }
+    
+    @staticmethod
+    def record_transitions(opened, closed, ended_at):
+        """
+        Open and close many anomaly episodes in a single transaction.
+        
+        Args:
+            opened (list): List of dicts with ``device_id``, ``kind``,
+                ``started_at``, ``temperature`` and ``offset`` keys.
+            closed (list): ``(device_id, kind)`` pairs whose active episode ended.
+            ended_at (datetime): End time of the closed episodes.
+        
+        Returns:
+            int: Number of episodes opened and closed.
+        """
+        if not opened and not closed:
+            return 0
+        
+        table = SensorAnomaly.__table__
+        if opened:
+            db.session.execute(table.insert(), opened)
+        if closed:
+            stmt = table.update().where(db.and_(
+                table.c.device_id == db.bindparam('b_device_id'),
+                table.c.kind == db.bindparam('b_kind'),
+                table.c.ended_at.is_(None)
+            )).values(ended_at=ended_at)
+            db.session.execute(stmt, [{'b_device_id': device_id, 'b_kind': kind}
+                                      for device_id, kind in closed])
+        db.session.commit()
+        
+        return len(opened) + len(closed)
+    
+    @staticmethod
+    def get_active(location=None, kind=None):
+        """
+        Get the active anomaly episodes of the fleet.
+        
+        Args:
+            location (str, optional): Only devices at this location.
+            kind (str, optional): Only episodes of this kind.
+        
+        Returns:
+            list: Active episodes, oldest first.
+        """
+        query = SensorAnomaly.query.filter(SensorAnomaly.ended_at.is_(None))
+        if location is not None:
+            query = query.join(Device, Device.id == SensorAnomaly.device_id) \
+                         .filter(Device.location == location)
+        if kind is not None:
+            query = query.filter(SensorAnomaly.kind == kind)
+        
+        return query.order_by(SensorAnomaly.started_at).all()
+    
+    @staticmethod
+    def get_recent(device_id, limit=50):
+        """
+        Get recent anomaly episodes of a device.
+        
+        Args:
+            device_id (str): The device ID.
+            limit (int): Maximum number of episodes to return.
+        
+        Returns:
+            list: Episodes, newest first.
+        """
+        return SensorAnomaly.query.filter_by(device_id=device_id) \
+                                  .order_by(SensorAnomaly.started_at.desc()) \
+                                  .limit(limit) \
+                                  .all()
\ No newline at end of file
@@ -4,18 +4,31 @@ Sensor Data model for the Exhaust Fan IoT System.
 
 from datetime import datetime
 from database import db
+from storage import storage
+from utils.pagination import keyset_page
 
 class SensorData(db.Model):
     """Database model for sensor data from exhaust fan devices."""
     
     __tablename__ = 'sensor_data'
+    __table_args__ = (
+        # Serves per-device recent-data queries without a scan or sort
+        db.Index('ix_sensor_data_device_timestamp', 'device_id', 'timestamp'),
+        # Rejects redelivered readings; includes the partition column since
+        # unique indexes on partitioned PostgreSQL tables must
+        db.Index('ux_sensor_data_device_event', 'device_id', 'device_timestamp', 'timestamp', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     device_id = db.Column(db.String(50), db.ForeignKey('devices.id'), nullable=False)
     temperature = db.Column(db.Float, nullable=False)
     fan_status = db.Column(db.Boolean, nullable=False)
     auto_mode = db.Column(db.Boolean, nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # event time
+    # Device clock in ms since the epoch; empty when the device clock was not usable
+    device_timestamp = db.Column(db.BigInteger)
+    # Anomaly kinds the reading was flagged with, comma-separated ('spike', 'flatline,drift')
+    anomaly = db.Column(db.String(50))
     
     def __repr__(self):
         return f'<SensorData {self.id} for device {self.device_id}>'
@@ -28,7 +41,9 @@ class SensorData(db.Model):
             'temperature': self.temperature,
             'fan_status': self.fan_status,
             'auto_mode': self.auto_mode,
-            'timestamp': self.timestamp.isoformat()
+            'timestamp': self.timestamp.isoformat(),
+            'device_timestamp': self.device_timestamp,
+            'anomaly': self.anomaly
         }
     
     @staticmethod
@@ -57,6 +72,53 @@ class SensorData(db.Model):
         
         return sensor_data
     
+    @staticmethod
+    def add_sensor_readings(readings):
+        """
+        Add many sensor readings with a single bulk insert.
+        
+        Goes through the storage backend's bulk path (``COPY`` on
+        PostgreSQL). Readings already stored under the same device timestamp
+        are skipped. The caller is responsible for committing the session, so
+        the insert can share a transaction with the matching device updates.
+        
+        Args:
+            readings (list): List of dicts with ``device_id``, ``temperature``,
+                ``fan_status``, ``auto_mode``, ``timestamp`` and optionally
+                ``device_timestamp`` and ``anomaly`` keys.
+        
+        Returns:
+            int: Number of rows submitted.
+        """
+        return storage.bulk_insert(SensorData, readings, ignore_conflicts=True)
+    
+    @staticmethod
+    def existing_event_keys(readings):
+        """
+        Find which readings are already stored.
+        
+        Args:
+            readings (list): Reading dicts with ``device_id``,
+                ``device_timestamp`` and ``timestamp`` keys.
+        
+        Returns:
+            set: ``(device_id, device_timestamp)`` pairs already in the table.
+        """
+        keys = {(reading['device_id'], reading['device_timestamp']) for reading in readings
+                if reading.get('device_timestamp') is not None}
+        if not keys:
+            return set()
+        
+        # The time bounds let partitioned tables skip unrelated partitions
+        times = [reading['timestamp'] for reading in readings]
+        rows = db.session.query(SensorData.device_id, SensorData.device_timestamp) \
+                         .filter(SensorData.device_id.in_({key[0] for key in keys}),
+                                 SensorData.device_timestamp.in_({key[1] for key in keys}),
+                                 SensorData.timestamp.between(min(times), max(times))) \
+                         .all()
+        
+        return {tuple(row) for row in rows} & keys
+    
     @staticmethod
     def get_recent_data(device_id, limit=100):
         """
@@ -72,4 +134,22 @@ class SensorData(db.Model):
         return SensorData.query.filter_by(device_id=device_id) \
                               .order_by(SensorData.timestamp.desc()) \
                               .limit(limit) \
-                              .all()
\ No newline at end of file
+                              .all()
+    
+    @staticmethod
+    def get_page(device_id, start=None, end=None, cursor=None, limit=100):
+        """
+        Get one page of sensor data for a device, newest first.
+        
+        Args:
+            device_id (str): The device ID.
+            start (datetime, optional): Inclusive lower time bound.
+            end (datetime, optional): Exclusive upper time bound.
+            cursor (str, optional): Cursor returned with the previous page.
+            limit (int): Maximum number of records to return.
+            
+        Returns:
+            tuple: (list of sensor data records, next cursor or None).
+        """
+        return keyset_page(SensorData.query.filter_by(device_id=device_id), SensorData,
+                           start=start, end=end, cursor=cursor, limit=limit)
\ No newline at end of file
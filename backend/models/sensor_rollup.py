@@ -0,0 +1,132 @@
+"""
+Sensor Rollup model for the Exhaust Fan IoT System.
+"""
+
+from sqlalchemy import case
+from database import db
+
+def _dialect_insert(table):
+    """Build an INSERT supporting ON CONFLICT for the configured database."""
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    
+    return insert(table)
+
+class SensorRollup(db.Model):
+    """Database model for time-bucketed sensor data aggregates."""
+    
+    __tablename__ = 'sensor_rollups'
+    __table_args__ = (
+        # Lets retention prune a whole tier by age
+        db.Index('ix_sensor_rollups_resolution_bucket', 'resolution', 'bucket_start'),
+    )
+
+    device_id = db.Column(db.String(50), db.ForeignKey('devices.id'), primary_key=True)
+    resolution = db.Column(db.Integer, primary_key=True)  # Bucket width in seconds
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    sample_count = db.Column(db.Integer, nullable=False)
+    temperature_min = db.Column(db.Float, nullable=False)
+    temperature_max = db.Column(db.Float, nullable=False)
+    temperature_sum = db.Column(db.Float, nullable=False)
+    fan_on_count = db.Column(db.Integer, nullable=False)
+    
+    def __repr__(self):
+        return f'<SensorRollup {self.resolution}s {self.bucket_start} for device {self.device_id}>'
+    
+    def to_dict(self):
+        """Convert sensor rollup to dictionary representation."""
+        return {
+            'bucket_start': self.bucket_start.isoformat(),
+            'resolution': self.resolution,
+            'sample_count': self.sample_count,
+            'temperature_min': self.temperature_min,
+            'temperature_max': self.temperature_max,
+            'temperature_avg': self.temperature_sum / self.sample_count,
+            'fan_duty_cycle': self.fan_on_count / self.sample_count
+        }
+    
+    @staticmethod
+    def upsert_buckets(buckets):
+        """
+        Merge partial aggregates into the stored buckets.
+        
+        Existing buckets have their counts and sums added and their min/max
+        widened, so readings can be rolled up incrementally. The caller is
+        responsible for committing the session.
+        
+        Args:
+            buckets (list): List of dicts with the column values of each
+                partial bucket.
+        
+        Returns:
+            int: Number of buckets written.
+        """
+        if not buckets:
+            return 0
+        
+        table = SensorRollup.__table__
+        stmt = _dialect_insert(table)
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.device_id, table.c.resolution, table.c.bucket_start],
+            set_={
+                'sample_count': table.c.sample_count + excluded.sample_count,
+                'temperature_sum': table.c.temperature_sum + excluded.temperature_sum,
+                'fan_on_count': table.c.fan_on_count + excluded.fan_on_count,
+                'temperature_min': case(
+                    (excluded.temperature_min < table.c.temperature_min, excluded.temperature_min),
+                    else_=table.c.temperature_min
+                ),
+                'temperature_max': case(
+                    (excluded.temperature_max > table.c.temperature_max, excluded.temperature_max),
+                    else_=table.c.temperature_max
+                )
+            }
+        )
+        
+        db.session.execute(stmt, buckets)
+        return len(buckets)
+    
+    @staticmethod
+    def insert_missing(buckets):
+        """
+        Insert buckets that do not exist yet, leaving existing ones untouched.
+        
+        Used to backfill aggregates for data written before rollups existed.
+        The caller is responsible for committing the session.
+        
+        Args:
+            buckets (list): List of dicts with the column values of each bucket.
+        
+        Returns:
+            int: Number of buckets submitted.
+        """
+        if not buckets:
+            return 0
+        
+        stmt = _dialect_insert(SensorRollup.__table__).on_conflict_do_nothing()
+        db.session.execute(stmt, buckets)
+        return len(buckets)
+    
+    @staticmethod
+    def get_series(device_id, resolution, start, end):
+        """
+        Get the buckets of one resolution for a device within a time range.
+        
+        Args:
+            device_id (str): The device ID.
+            resolution (int): Bucket width in seconds.
+            start (datetime): Inclusive range start.
+            end (datetime): Exclusive range end.
+        
+        Returns:
+            list: List of sensor rollup records, oldest first.
+        """
+        return SensorRollup.query.filter(SensorRollup.device_id == device_id,
+                                         SensorRollup.resolution == resolution,
+                                         SensorRollup.bucket_start >= start,
+                                         SensorRollup.bucket_start < end) \
+                                 .order_by(SensorRollup.bucket_start) \
+                                 .all()
@@ -2,22 +2,28 @@
 MQTT client for the Exhaust Fan IoT System backend.
 """
 
+import time
 from flask import current_app
 from flask_mqtt import Mqtt
+import metrics
 
 # Initialize Flask-MQTT
 mqtt_client = Mqtt()
 
-def publish_control_command(device_id, command):
+def publish_control_command(device_id, command, qos=0):
     """
     Publish a control command to a specific device.
     
+    Success only means the client accepted the message for sending; the
+    broker's acknowledgement is reported later through ``on_publish``.
+    
     Args:
         device_id (str): The ID of the device to control.
         command (dict): The command to send (as a dictionary).
+        qos (int): MQTT quality of service level.
     
     Returns:
-        bool: True if publish was successful, False otherwise.
+        tuple: (True if publish was successful, MQTT message ID or None).
     """
     import json
     
@@ -29,10 +35,35 @@ def publish_control_command(device_id, command):
         topic = f'control/{device_id}'
         
         # Publish the message
-        result = mqtt_client.publish(topic, payload)
+        started = time.perf_counter()
+        result, mid = mqtt_client.publish(topic, payload, qos=qos)
+        metrics.publish_duration.observe(time.perf_counter() - started)
         
         # Check if publish was successful
-        return result[0] == 0
+        success = result == 0
+        metrics.publish_total.inc(result='success' if success else 'failure')
+        return success, mid
     except Exception as e:
+        metrics.publish_total.inc(result='failure')
         current_app.logger.error(f'Error publishing MQTT message: {str(e)}')
+        return False, None
+
+def publish_telemetry(event):
+    """
+    Relay a processed device reading to the web workers' telemetry hubs.
+    
+    Args:
+        event (dict): The telemetry event, including ``device_id``.
+    
+    Returns:
+        bool: True if publish was successful, False otherwise.
+    """
+    import json
+    
+    try:
+        # Live data is best effort; a lost event is superseded by the next one
+        result = mqtt_client.publish(f"telemetry/{event['device_id']}", json.dumps(event), qos=0)
+        return result[0] == 0
+    except Exception as e:
+        current_app.logger.error(f'Error publishing telemetry: {str(e)}')
         return False
\ No newline at end of file
@@ -4,4 +4,6 @@ Package initialization for the routes module.
 
 # Import routes so they can be imported from the routes package
 from routes.device_routes import device_bp
-from routes.control_routes import control_bp
\ No newline at end of file
+from routes.control_routes import control_bp
+from routes.analytics_routes import analytics_bp
+from routes.schedule_routes import schedule_bp
\ No newline at end of file
@@ -0,0 +1,88 @@
+"""
+API routes for fleet analytics in the Exhaust Fan IoT System.
+"""
+
+from datetime import datetime
+from flask import Blueprint, jsonify, request, current_app
+from services.device_service import resolve_device_targets
+from services.fan_usage_service import get_fan_usage
+from services.liveness_service import get_availability
+from utils.time_utils import parse_timestamp
+
+# Create Blueprint
+analytics_bp = Blueprint('analytics_routes', __name__)
+
+def _range_and_targets(default_range):
+    """
+    Parse the time range and target devices of an analytics request.
+    
+    ``to`` defaults to now and ``from`` to ``default_range`` before it;
+    ``device_id`` (repeated or comma-separated) or ``location`` narrow the
+    devices, the whole fleet by default.
+    
+    Returns:
+        tuple: (start, end, device IDs or None, error message or None).
+    """
+    try:
+        end = parse_timestamp(request.args.get('to')) or datetime.utcnow()
+        start = parse_timestamp(request.args.get('from')) or end - default_range
+    except ValueError:
+        return None, None, None, 'Invalid from or to value'
+    
+    if start >= end:
+        return None, None, None, 'Invalid time range'
+    
+    device_ids = [device_id.strip()
+                  for value in request.args.getlist('device_id')
+                  for device_id in value.split(',') if device_id.strip()]
+    location = request.args.get('location')
+    if device_ids or location is not None:
+        device_ids, _ = resolve_device_targets(device_ids or None, location)
+    else:
+        device_ids = None
+    
+    return start, end, device_ids, None
+
+@analytics_bp.route('/fan-usage', methods=['GET'])
+def get_fan_usage_summary():
+    """Get fan run time, toggles and estimated energy per device and location."""
+    try:
+        start, end, device_ids, error = _range_and_targets(current_app.config['FAN_USAGE_DEFAULT_RANGE'])
+        
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        usage = get_fan_usage(start, end, device_ids)
+        
+        return jsonify(dict(usage, success=True, start=start.isoformat(), end=end.isoformat()))
+    except Exception as e:
+        current_app.logger.error(f"Error computing fan usage: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to compute fan usage'
+        }), 500
+
+@analytics_bp.route('/availability', methods=['GET'])
+def get_availability_summary():
+    """Get online state, availability and outages per device and location."""
+    try:
+        start, end, device_ids, error = _range_and_targets(current_app.config['AVAILABILITY_DEFAULT_RANGE'])
+        
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        availability = get_availability(start, end, device_ids)
+        
+        return jsonify(dict(availability, success=True, start=start.isoformat(), end=end.isoformat()))
+    except Exception as e:
+        current_app.logger.error(f"Error computing device availability: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to compute device availability'
+        }), 500
\ No newline at end of file
@@ -6,12 +6,67 @@ from flask import Blueprint, jsonify, request, current_app
 from services.device_service import (
     get_device_status,
     send_fan_control,
-    send_mode_control
+    send_mode_control,
+    send_bulk_fan_control,
+    send_bulk_mode_control,
+    resolve_device_targets
 )
+from models.control_history import ControlHistory
 
 # Create Blueprint
 control_bp = Blueprint('control_routes', __name__)
 
+def _bulk_targets(data):
+    """
+    Resolve the target devices of a bulk control request.
+    
+    Exactly one of ``device_ids`` (list), ``location`` (str) or
+    ``all`` (true) must be given.
+    
+    Returns:
+        tuple: (device IDs, unknown device IDs, error message or None).
+    """
+    selectors = [key for key in ('device_ids', 'location', 'all') if data.get(key) is not None]
+    
+    if len(selectors) != 1:
+        return None, None, 'Provide exactly one of device_ids, location or all'
+    
+    if 'device_ids' in selectors:
+        device_ids = data['device_ids']
+        if not isinstance(device_ids, list) or not device_ids or \
+                not all(isinstance(device_id, str) for device_id in device_ids):
+            return None, None, 'device_ids must be a non-empty list of device IDs'
+        device_ids, unknown = resolve_device_targets(device_ids=list(dict.fromkeys(device_ids)))
+    elif 'location' in selectors:
+        device_ids, unknown = resolve_device_targets(location=data['location'])
+    else:
+        if data['all'] is not True:
+            return None, None, 'all must be true'
+        device_ids, unknown = resolve_device_targets()
+    
+    return device_ids, unknown, None
+
+def _bulk_response(results, unknown, value_key, value):
+    """Build the per-device response of a bulk control request."""
+    devices = [
+        {'device_id': device_id, 'success': bool(command_id),
+         **({'command_id': command_id} if command_id else {'error': 'Failed to send control command'})}
+        for device_id, command_id in results.items()
+    ]
+    devices += [
+        {'device_id': device_id, 'success': False, 'error': 'Device not found'}
+        for device_id in unknown
+    ]
+    sent = sum(1 for command_id in results.values() if command_id)
+    
+    return jsonify({
+        'success': sent == len(devices),
+        value_key: value,
+        'sent': sent,
+        'failed': len(devices) - sent,
+        'results': devices
+    })
+
 @control_bp.route('/<device_id>/fan', methods=['POST'])
 def control_fan(device_id):
     """Control fan status for a specific device."""
@@ -52,10 +107,10 @@ def control_fan(device_id):
                 'error': 'Device not found'
             }), 404
         
-        # Send control command
-        success = send_fan_control(device_id, fan_status, source)
+        # Queue control command
+        command_id = send_fan_control(device_id, fan_status, source)
         
-        if not success:
+        if not command_id:
             return jsonify({
                 'success': False,
                 'error': 'Failed to send control command'
@@ -64,7 +119,9 @@ def control_fan(device_id):
         return jsonify({
             'success': True,
             'device_id': device_id,
-            'fan_status': fan_status
+            'fan_status': fan_status,
+            'command_id': command_id,
+            'status': 'pending'
         })
     except Exception as e:
         current_app.logger.error(f"Error controlling fan for device {device_id}: {str(e)}")
@@ -113,10 +170,10 @@ def control_mode(device_id):
                 'error': 'Device not found'
             }), 404
         
-        # Send control command
-        success = send_mode_control(device_id, auto_mode, source)
+        # Queue control command
+        command_id = send_mode_control(device_id, auto_mode, source)
         
-        if not success:
+        if not command_id:
             return jsonify({
                 'success': False,
                 'error': 'Failed to send mode command'
@@ -125,11 +182,144 @@ def control_mode(device_id):
         return jsonify({
             'success': True,
             'device_id': device_id,
-            'auto_mode': auto_mode
+            'auto_mode': auto_mode,
+            'command_id': command_id,
+            'status': 'pending'
         })
     except Exception as e:
         current_app.logger.error(f"Error controlling mode for device {device_id}: {str(e)}")
         return jsonify({
             'success': False,
             'error': 'Failed to control mode'
+        }), 500
+
+@control_bp.route('/bulk/fan', methods=['POST'])
+def control_fan_bulk():
+    """Control fan status for a list of devices, a location or all devices."""
+    try:
+        data = request.get_json()
+        
+        if not data or 'status' not in data:
+            return jsonify({
+                'success': False,
+                'error': 'No status provided'
+            }), 400
+        
+        # Get desired fan status (ON/OFF)
+        status = data['status']
+        
+        # Validate status value
+        if not isinstance(status, bool) and status not in ('on', 'off', True, False, 0, 1):
+            return jsonify({
+                'success': False,
+                'error': 'Invalid status value'
+            }), 400
+        
+        # Convert string status to boolean
+        fan_status = status == 'on' or status == 1 or status is True
+        
+        # Get source of command (default: "app")
+        source = data.get('source', 'app')
+        
+        # Resolve target devices
+        device_ids, unknown, error = _bulk_targets(data)
+        
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        if not device_ids and not unknown:
+            return jsonify({
+                'success': False,
+                'error': 'No matching devices'
+            }), 404
+        
+        # Send control commands
+        results = send_bulk_fan_control(device_ids, fan_status, source)
+        
+        return _bulk_response(results, unknown, 'fan_status', fan_status)
+    except Exception as e:
+        current_app.logger.error(f"Error sending bulk fan control: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to control fans'
+        }), 500
+
+@control_bp.route('/bulk/mode', methods=['POST'])
+def control_mode_bulk():
+    """Control operating mode for a list of devices, a location or all devices."""
+    try:
+        data = request.get_json()
+        
+        if not data or 'mode' not in data:
+            return jsonify({
+                'success': False,
+                'error': 'No mode provided'
+            }), 400
+        
+        # Get desired mode (AUTO/MANUAL)
+        mode = data['mode']
+        
+        # Validate mode value
+        if not isinstance(mode, bool) and mode not in ('auto', 'manual', True, False, 0, 1):
+            return jsonify({
+                'success': False,
+                'error': 'Invalid mode value'
+            }), 400
+        
+        # Convert string mode to boolean
+        auto_mode = mode == 'auto' or mode == 1 or mode is True
+        
+        # Get source of command (default: "app")
+        source = data.get('source', 'app')
+        
+        # Resolve target devices
+        device_ids, unknown, error = _bulk_targets(data)
+        
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        if not device_ids and not unknown:
+            return jsonify({
+                'success': False,
+                'error': 'No matching devices'
+            }), 404
+        
+        # Send control commands
+        results = send_bulk_mode_control(device_ids, auto_mode, source)
+        
+        return _bulk_response(results, unknown, 'auto_mode', auto_mode)
+    except Exception as e:
+        current_app.logger.error(f"Error sending bulk mode control: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to control modes'
+        }), 500
+
+@control_bp.route('/commands/<command_id>', methods=['GET'])
+def get_command(command_id):
+    """Get the delivery status of a control command."""
+    try:
+        record = ControlHistory.get_by_command_id(command_id)
+        
+        if not record:
+            return jsonify({
+                'success': False,
+                'error': 'Command not found'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'command': record.to_dict()
+        })
+    except Exception as e:
+        current_app.logger.error(f"Error getting control command {command_id}: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to get control command'
         }), 500
\ No newline at end of file
@@ -2,38 +2,216 @@
 API routes for device management in the Exhaust Fan IoT System.
 """
 
-from flask import Blueprint, jsonify, request, current_app
+from datetime import datetime
+from flask import Blueprint, Response, jsonify, request, current_app, stream_with_context
 from services.device_service import (
     get_device_status,
-    get_all_devices,
+    get_device_status_versioned,
+    get_all_devices_versioned,
     update_device_info
 )
+from services.rollup_service import get_rollup_series, parse_resolution
+from services.export_service import EXPORT_FORMATS, generate_export
+from services.telemetry_service import telemetry_hub
+from utils.time_utils import parse_timestamp
+from utils.http_cache import response_cache, conditional_response
 from models.sensor_data import SensorData
 from models.control_history import ControlHistory
+from models.sensor_anomaly import SensorAnomaly
+from models.device_outage import DeviceOutage
+from services.anomaly_service import KINDS as ANOMALY_KINDS
 
 # Create Blueprint
 device_bp = Blueprint('device_routes', __name__)
 
+EXPORT_MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+def _device_ids_arg():
+    """Collect device IDs from repeated or comma-separated ``device_id`` parameters."""
+    return [device_id.strip()
+            for value in request.args.getlist('device_id')
+            for device_id in value.split(',') if device_id.strip()]
+
+def _stream_response(device_ids):
+    """Build a Server-Sent Events response of live readings."""
+    subscription = telemetry_hub.subscribe(device_ids)
+    
+    if subscription is None:
+        return jsonify({
+            'success': False,
+            'error': 'Too many stream clients'
+        }), 503
+    
+    response = Response(
+        telemetry_hub.stream(subscription),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # The stream only unsubscribes once started; a client that leaves earlier
+    # is released when the server closes the response
+    response.call_on_close(lambda: telemetry_hub.unsubscribe(subscription))
+    return response
+
+def _export_response(device_ids):
+    """Build a streaming export response from the request's query parameters."""
+    fmt = request.args.get('format', default='ndjson').lower()
+    compress = request.args.get('gzip', default='false').lower() in ('1', 'true', 'yes')
+    
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({
+            'success': False,
+            'error': f"Invalid format, expected one of: {', '.join(EXPORT_FORMATS)}"
+        }), 400
+    
+    try:
+        start = parse_timestamp(request.args.get('from'))
+        end = parse_timestamp(request.args.get('to'))
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'Invalid from or to value'
+        }), 400
+    
+    filename = f"sensor-data-{'-'.join(device_ids) if device_ids else 'all'}.{fmt}"
+    mimetype = EXPORT_MIMETYPES[fmt]
+    if compress:
+        filename += '.gz'
+        mimetype = 'application/gzip'
+    
+    # stream_with_context keeps the app context (and its session) alive while streaming
+    chunks = generate_export(device_ids, start, end, fmt, compress,
+                             current_app.config['EXPORT_BATCH_SIZE'])
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
 @device_bp.route('/', methods=['GET'])
 def get_devices():
     """Get all registered devices."""
     try:
-        devices = get_all_devices()
+        cached = response_cache.get('devices')
+        
+        if cached is None:
+            version, devices = get_all_devices_versioned()
+            cached = response_cache.put('devices', version, {
+                'success': True,
+                'devices': devices
+            })
+        
+        return conditional_response(cached)
+    except Exception as e:
+        current_app.logger.error(f"Error getting devices: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to retrieve devices'
+        }), 500
+
+@device_bp.route('/export', methods=['GET'])
+def export_sensor_data():
+    """Stream sensor data of several or all devices as NDJSON or CSV."""
+    try:
+        return _export_response(_device_ids_arg() or None)
+    except Exception as e:
+        current_app.logger.error(f"Error exporting sensor data: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to export sensor data'
+        }), 500
+
+@device_bp.route('/stream', methods=['GET'])
+def stream_devices():
+    """Stream live readings of several or all devices as Server-Sent Events."""
+    try:
+        return _stream_response(_device_ids_arg() or None)
+    except Exception as e:
+        current_app.logger.error(f"Error opening telemetry stream: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to open telemetry stream'
+        }), 500
+
+@device_bp.route('/anomalies', methods=['GET'])
+def get_active_anomalies():
+    """Get the active sensor anomalies of the fleet."""
+    try:
+        kind = request.args.get('kind')
+        if kind is not None and kind not in {name for _, name in ANOMALY_KINDS}:
+            return jsonify({
+                'success': False,
+                'error': f"Invalid kind, expected one of: {', '.join(name for _, name in ANOMALY_KINDS)}"
+            }), 400
+        
+        anomalies = SensorAnomaly.get_active(request.args.get('location'), kind)
+        
         return jsonify({
             'success': True,
-            'devices': devices
+            'count': len(anomalies),
+            'anomalies': [anomaly.to_dict() for anomaly in anomalies]
         })
     except Exception as e:
-        current_app.logger.error(f"Error getting devices: {str(e)}")
+        current_app.logger.error(f"Error getting sensor anomalies: {str(e)}")
         return jsonify({
             'success': False,
-            'error': 'Failed to retrieve devices'
+            'error': 'Failed to retrieve sensor anomalies'
+        }), 500
+
+@device_bp.route('/offline', methods=['GET'])
+def get_offline_devices():
+    """Get the devices that stopped reporting, with their outages."""
+    try:
+        outages = DeviceOutage.get_active(request.args.get('location'))
+        
+        return jsonify({
+            'success': True,
+            'count': len(outages),
+            'outages': [outage.to_dict() for outage in outages]
+        })
+    except Exception as e:
+        current_app.logger.error(f"Error getting offline devices: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to retrieve offline devices'
         }), 500
 
 @device_bp.route('/<device_id>', methods=['GET'])
 def get_device(device_id):
     """Get a specific device by ID."""
     try:
+        key = f'device:{device_id}'
+        cached = response_cache.get(key)
+        
+        if cached is None:
+            version, device = get_device_status_versioned(device_id)
+            
+            if not device:
+                return jsonify({
+                    'success': False,
+                    'error': 'Device not found'
+                }), 404
+            
+            cached = response_cache.put(key, version, {
+                'success': True,
+                'device': device
+            })
+        
+        return conditional_response(cached)
+    except Exception as e:
+        current_app.logger.error(f"Error getting device {device_id}: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to retrieve device'
+        }), 500
+
+@device_bp.route('/<device_id>/stream', methods=['GET'])
+def stream_device(device_id):
+    """Stream live readings of a specific device as Server-Sent Events."""
+    try:
+        # Get device
         device = get_device_status(device_id)
         
         if not device:
@@ -42,15 +220,12 @@ def get_device(device_id):
                 'error': 'Device not found'
             }), 404
         
-        return jsonify({
-            'success': True,
-            'device': device
-        })
+        return _stream_response([device_id])
     except Exception as e:
-        current_app.logger.error(f"Error getting device {device_id}: {str(e)}")
+        current_app.logger.error(f"Error opening telemetry stream for device {device_id}: {str(e)}")
         return jsonify({
             'success': False,
-            'error': 'Failed to retrieve device'
+            'error': 'Failed to open telemetry stream'
         }), 500
 
 @device_bp.route('/<device_id>', methods=['PUT'])
@@ -68,7 +243,38 @@ def update_device(device_id):
         name = data.get('name')
         location = data.get('location')
         
-        updated_device = update_device_info(device_id, name, location)
+        # Per-device automation thresholds; null restores the default
+        thresholds = {
+            key: data[key] for key in ('temperature_threshold', 'temperature_hysteresis')
+            if key in data
+        }
+        
+        for value in thresholds.values():
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+                return jsonify({
+                    'success': False,
+                    'error': 'Invalid threshold value'
+                }), 400
+        
+        if (thresholds.get('temperature_hysteresis') or 0) < 0:
+            return jsonify({
+                'success': False,
+                'error': 'Invalid threshold value'
+            }), 400
+        
+        # Rated fan power for energy estimates; null restores the default
+        overrides = dict(thresholds)
+        if 'fan_power' in data:
+            fan_power = data['fan_power']
+            if fan_power is not None and (isinstance(fan_power, bool) or
+                                          not isinstance(fan_power, (int, float)) or fan_power < 0):
+                return jsonify({
+                    'success': False,
+                    'error': 'Invalid fan power value'
+                }), 400
+            overrides['fan_power'] = fan_power
+        
+        updated_device = update_device_info(device_id, name, location, overrides)
         
         if not updated_device:
             return jsonify({
@@ -76,6 +282,9 @@ def update_device(device_id):
                 'error': 'Device not found'
             }), 404
         
+        # Don't serve the old representation for the rest of the TTL
+        response_cache.clear()
+        
         return jsonify({
             'success': True,
             'device': updated_device
@@ -89,10 +298,21 @@ def update_device(device_id):
 
 @device_bp.route('/<device_id>/sensor-data', methods=['GET'])
 def get_device_sensor_data(device_id):
-    """Get sensor data for a specific device."""
+    """Get a page of sensor data for a specific device, newest first."""
     try:
         # Get query parameters
         limit = request.args.get('limit', default=100, type=int)
+        limit = max(1, min(limit, current_app.config['MAX_PAGE_SIZE']))
+        cursor = request.args.get('cursor')
+        
+        try:
+            start = parse_timestamp(request.args.get('from'))
+            end = parse_timestamp(request.args.get('to'))
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Invalid from or to value'
+            }), 400
         
         # Get device
         device = get_device_status(device_id)
@@ -104,12 +324,19 @@ def get_device_sensor_data(device_id):
             }), 404
         
         # Get sensor data
-        sensor_data = SensorData.get_recent_data(device_id, limit)
+        try:
+            sensor_data, next_cursor = SensorData.get_page(device_id, start, end, cursor, limit)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Invalid cursor'
+            }), 400
         
         return jsonify({
             'success': True,
             'device_id': device_id,
-            'sensor_data': [data.to_dict() for data in sensor_data]
+            'sensor_data': [data.to_dict() for data in sensor_data],
+            'next_cursor': next_cursor
         })
     except Exception as e:
         current_app.logger.error(f"Error getting sensor data for device {device_id}: {str(e)}")
@@ -118,12 +345,98 @@ def get_device_sensor_data(device_id):
             'error': 'Failed to retrieve sensor data'
         }), 500
 
+@device_bp.route('/<device_id>/sensor-data/rollup', methods=['GET'])
+def get_device_sensor_rollup(device_id):
+    """Get aggregated sensor history for a specific device."""
+    try:
+        # Get query parameters
+        try:
+            end = parse_timestamp(request.args.get('to')) or datetime.utcnow()
+            start = parse_timestamp(request.args.get('from')) or \
+                end - current_app.config['ROLLUP_DEFAULT_RANGE']
+            resolution = parse_resolution(request.args.get('resolution'))
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Invalid from, to or resolution value'
+            }), 400
+        
+        max_points = min(
+            request.args.get('max_points', default=current_app.config['ROLLUP_MAX_POINTS'], type=int),
+            current_app.config['ROLLUP_MAX_POINTS']
+        )
+        
+        if start >= end or max_points <= 0:
+            return jsonify({
+                'success': False,
+                'error': 'Invalid time range'
+            }), 400
+        
+        # Get device
+        device = get_device_status(device_id)
+        
+        if not device:
+            return jsonify({
+                'success': False,
+                'error': 'Device not found'
+            }), 404
+        
+        # Get aggregated sensor data from the best-fitting rollup tier
+        chosen, buckets = get_rollup_series(device_id, start, end, max_points, resolution)
+        
+        return jsonify({
+            'success': True,
+            'device_id': device_id,
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'resolution': chosen,
+            'buckets': buckets
+        })
+    except Exception as e:
+        current_app.logger.error(f"Error getting sensor rollup for device {device_id}: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to retrieve sensor rollup'
+        }), 500
+
+@device_bp.route('/<device_id>/sensor-data/export', methods=['GET'])
+def export_device_sensor_data(device_id):
+    """Stream the sensor data of a specific device as NDJSON or CSV."""
+    try:
+        # Get device
+        device = get_device_status(device_id)
+        
+        if not device:
+            return jsonify({
+                'success': False,
+                'error': 'Device not found'
+            }), 404
+        
+        return _export_response([device_id])
+    except Exception as e:
+        current_app.logger.error(f"Error exporting sensor data for device {device_id}: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to export sensor data'
+        }), 500
+
 @device_bp.route('/<device_id>/control-history', methods=['GET'])
 def get_device_control_history(device_id):
-    """Get control history for a specific device."""
+    """Get a page of control history for a specific device, newest first."""
     try:
         # Get query parameters
         limit = request.args.get('limit', default=50, type=int)
+        limit = max(1, min(limit, current_app.config['MAX_PAGE_SIZE']))
+        cursor = request.args.get('cursor')
+        
+        try:
+            start = parse_timestamp(request.args.get('from'))
+            end = parse_timestamp(request.args.get('to'))
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Invalid from or to value'
+            }), 400
         
         # Get device
         device = get_device_status(device_id)
@@ -135,16 +448,84 @@ def get_device_control_history(device_id):
             }), 404
         
         # Get control history
-        control_history = ControlHistory.get_recent_history(device_id, limit)
+        try:
+            control_history, next_cursor = ControlHistory.get_page(device_id, start, end, cursor, limit)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Invalid cursor'
+            }), 400
         
         return jsonify({
             'success': True,
             'device_id': device_id,
-            'control_history': [history.to_dict() for history in control_history]
+            'control_history': [history.to_dict() for history in control_history],
+            'next_cursor': next_cursor
         })
     except Exception as e:
         current_app.logger.error(f"Error getting control history for device {device_id}: {str(e)}")
         return jsonify({
             'success': False,
             'error': 'Failed to retrieve control history'
+        }), 500
+
+@device_bp.route('/<device_id>/anomalies', methods=['GET'])
+def get_device_anomalies(device_id):
+    """Get recent sensor anomaly episodes of a specific device, newest first."""
+    try:
+        limit = request.args.get('limit', default=50, type=int)
+        limit = max(1, min(limit, current_app.config['MAX_PAGE_SIZE']))
+        
+        # Get device
+        device = get_device_status(device_id)
+        
+        if not device:
+            return jsonify({
+                'success': False,
+                'error': 'Device not found'
+            }), 404
+        
+        anomalies = SensorAnomaly.get_recent(device_id, limit)
+        
+        return jsonify({
+            'success': True,
+            'device_id': device_id,
+            'anomalies': [anomaly.to_dict() for anomaly in anomalies]
+        })
+    except Exception as e:
+        current_app.logger.error(f"Error getting sensor anomalies for device {device_id}: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to retrieve sensor anomalies'
+        }), 500
+
+@device_bp.route('/<device_id>/outages', methods=['GET'])
+def get_device_outages(device_id):
+    """Get recent outages of a specific device, newest first."""
+    try:
+        limit = request.args.get('limit', default=50, type=int)
+        limit = max(1, min(limit, current_app.config['MAX_PAGE_SIZE']))
+        
+        # Get device
+        device = get_device_status(device_id)
+        
+        if not device:
+            return jsonify({
+                'success': False,
+                'error': 'Device not found'
+            }), 404
+        
+        outages = DeviceOutage.get_recent(device_id, limit)
+        
+        return jsonify({
+            'success': True,
+            'device_id': device_id,
+            'online': not outages or outages[0].ended_at is not None,
+            'outages': [outage.to_dict() for outage in outages]
+        })
+    except Exception as e:
+        current_app.logger.error(f"Error getting outages for device {device_id}: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to retrieve device outages'
         }), 500
\ No newline at end of file
@@ -0,0 +1,226 @@
+"""
+API routes for control schedules in the Exhaust Fan IoT System.
+"""
+
+from datetime import datetime
+from flask import Blueprint, jsonify, request, current_app
+from models.device import Device
+from services.schedule_service import (
+    get_schedules,
+    get_schedule,
+    create_schedule,
+    update_schedule,
+    delete_schedule
+)
+
+# Create Blueprint
+schedule_bp = Blueprint('schedule_routes', __name__)
+
+def _parse_time(value):
+    """Parse an ``HH:MM`` wall-clock time; raises ValueError if invalid."""
+    if not isinstance(value, str):
+        raise ValueError(value)
+    return datetime.strptime(value, '%H:%M').time()
+
+def _schedule_fields(data, creating):
+    """
+    Validate a schedule request body and map it to column values.
+    
+    The command is given like on the control endpoints, as exactly one of
+    ``status`` ('on'/'off') or ``mode`` ('auto'/'manual'), and the target
+    as one of ``device_id`` or ``location``; both are required when
+    creating. ``start`` and ``end`` are ``HH:MM`` times and ``days`` a list
+    of weekdays (Monday = 0).
+    
+    Returns:
+        tuple: (dict of column values, error message or None).
+    """
+    fields = {}
+    
+    if 'name' in data:
+        if data['name'] is not None and not isinstance(data['name'], str):
+            return None, 'Invalid name value'
+        fields['name'] = data['name']
+    
+    targets = [key for key in ('device_id', 'location') if data.get(key) is not None]
+    if len(targets) > 1 or (creating and not targets):
+        return None, 'Provide exactly one of device_id or location'
+    if targets:
+        target = data[targets[0]]
+        if not isinstance(target, str) or not target:
+            return None, f'Invalid {targets[0]} value'
+        if targets[0] == 'device_id' and not Device.query.get(target):
+            return None, 'Device not found'
+        fields[targets[0]] = target
+    
+    commands = [key for key in ('status', 'mode') if key in data]
+    if len(commands) > 1 or (creating and not commands):
+        return None, 'Provide exactly one of status or mode'
+    if 'status' in data:
+        status = data['status']
+        if not isinstance(status, bool) and status not in ('on', 'off', True, False, 0, 1):
+            return None, 'Invalid status value'
+        fields['command_type'] = 'fan_control'
+        fields['command_value'] = 'on' if status == 'on' or status == 1 or status is True else 'off'
+    elif 'mode' in data:
+        mode = data['mode']
+        if not isinstance(mode, bool) and mode not in ('auto', 'manual', True, False, 0, 1):
+            return None, 'Invalid mode value'
+        fields['command_type'] = 'mode_change'
+        fields['command_value'] = 'auto' if mode == 'auto' or mode == 1 or mode is True else 'manual'
+    
+    if creating and 'start' not in data:
+        return None, 'No start time provided'
+    try:
+        if 'start' in data:
+            fields['start_time'] = _parse_time(data['start'])
+        if 'end' in data:
+            fields['end_time'] = _parse_time(data['end']) if data['end'] is not None else None
+    except ValueError:
+        return None, 'Invalid time value, expected HH:MM'
+    
+    if 'days' in data:
+        days = data['days']
+        if not isinstance(days, list) or not days or \
+                not all(isinstance(day, int) and not isinstance(day, bool) and 0 <= day <= 6 for day in days):
+            return None, 'days must be a non-empty list of weekdays from 0 (Monday) to 6'
+        fields['weekdays'] = ''.join(str(day) for day in sorted(set(days)))
+    
+    if 'enabled' in data:
+        if not isinstance(data['enabled'], bool):
+            return None, 'Invalid enabled value'
+        fields['enabled'] = data['enabled']
+    
+    return fields, None
+
+@schedule_bp.route('/', methods=['GET'])
+def get_schedule_list():
+    """Get all control schedules with their next firing."""
+    try:
+        schedules = get_schedules()
+        
+        return jsonify({
+            'success': True,
+            'schedules': schedules
+        })
+    except Exception as e:
+        current_app.logger.error(f"Error getting schedules: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to get schedules'
+        }), 500
+
+@schedule_bp.route('/', methods=['POST'])
+def add_schedule():
+    """Create a control schedule for a device or location."""
+    try:
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({
+                'success': False,
+                'error': 'No data provided'
+            }), 400
+        
+        fields, error = _schedule_fields(data, creating=True)
+        
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        schedule = create_schedule(fields)
+        
+        return jsonify({
+            'success': True,
+            'schedule': schedule
+        }), 201
+    except Exception as e:
+        current_app.logger.error(f"Error creating schedule: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to create schedule'
+        }), 500
+
+@schedule_bp.route('/<int:schedule_id>', methods=['GET'])
+def get_schedule_details(schedule_id):
+    """Get a control schedule with its next firing."""
+    try:
+        schedule = get_schedule(schedule_id)
+        
+        if not schedule:
+            return jsonify({
+                'success': False,
+                'error': 'Schedule not found'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'schedule': schedule
+        })
+    except Exception as e:
+        current_app.logger.error(f"Error getting schedule {schedule_id}: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to get schedule'
+        }), 500
+
+@schedule_bp.route('/<int:schedule_id>', methods=['PUT'])
+def edit_schedule(schedule_id):
+    """Update a control schedule."""
+    try:
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({
+                'success': False,
+                'error': 'No data provided'
+            }), 400
+        
+        fields, error = _schedule_fields(data, creating=False)
+        
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        schedule = update_schedule(schedule_id, fields)
+        
+        if not schedule:
+            return jsonify({
+                'success': False,
+                'error': 'Schedule not found'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'schedule': schedule
+        })
+    except Exception as e:
+        current_app.logger.error(f"Error updating schedule {schedule_id}: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to update schedule'
+        }), 500
+
+@schedule_bp.route('/<int:schedule_id>', methods=['DELETE'])
+def remove_schedule(schedule_id):
+    """Delete a control schedule."""
+    try:
+        if not delete_schedule(schedule_id):
+            return jsonify({
+                'success': False,
+                'error': 'Schedule not found'
+            }), 404
+        
+        return jsonify({
+            'success': True
+        })
+    except Exception as e:
+        current_app.logger.error(f"Error deleting schedule {schedule_id}: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to delete schedule'
+        }), 500
\ No newline at end of file
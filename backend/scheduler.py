@@ -0,0 +1,152 @@
+"""
+Background job scheduler for the Exhaust Fan IoT System.
+
+Maintenance jobs must run in exactly one process, so the scheduler is only
+started by the process that consumes device messages (ingest.py, or app.py
+when it subscribes to device topics itself).
+"""
+
+import atexit
+from datetime import datetime
+from apscheduler.schedulers.background import BackgroundScheduler
+from services.retention_service import run_retention_job
+from storage import storage, run_storage_maintenance
+from services.automation_service import automation_engine, refresh_automation_thresholds
+from services.command_service import run_stale_command_job
+from services.reconcile_service import state_reconciler, run_reconcile_job
+from services.anomaly_service import anomaly_detector, run_anomaly_job
+from services.fan_usage_service import run_fan_usage_job
+from services.schedule_service import schedule_engine, run_schedule_job
+from services.liveness_service import liveness_tracker, run_liveness_job
+
+# Initialize APScheduler
+scheduler = BackgroundScheduler(daemon=True)
+
+def start_scheduler(app):
+    """
+    Register the periodic maintenance jobs and start the scheduler.
+    
+    Args:
+        app (Flask): The Flask application.
+    """
+    if scheduler.running:
+        return
+    
+    scheduler.add_job(
+        run_retention_job,
+        'interval',
+        seconds=app.config['RETENTION_JOB_INTERVAL'],
+        args=[app],
+        id='retention',
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
+    )
+    
+    # WAL checkpoints, upcoming time partitions and similar backend housekeeping
+    scheduler.add_job(
+        run_storage_maintenance,
+        'interval',
+        seconds=storage.maintenance_interval,
+        args=[app],
+        id='storage-maintenance',
+        next_run_time=datetime.now(),
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
+    )
+    
+    # Fail commands left pending by a worker that exited before resolving them
+    scheduler.add_job(
+        run_stale_command_job,
+        'interval',
+        seconds=app.config['COMMAND_STALE_JOB_INTERVAL'],
+        args=[app],
+        id='stale-commands',
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
+    )
+    
+    # Store fan run time of closed buckets for the analytics API
+    scheduler.add_job(
+        run_fan_usage_job,
+        'interval',
+        seconds=app.config['FAN_USAGE_JOB_INTERVAL'],
+        args=[app],
+        id='fan-usage',
+        next_run_time=datetime.now(),
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
+    )
+    
+    if state_reconciler.enabled:
+        # Re-issue commands devices have not confirmed by their deadline
+        scheduler.add_job(
+            run_reconcile_job,
+            'interval',
+            seconds=app.config['RECONCILE_INTERVAL'],
+            args=[app],
+            id='reconcile',
+            max_instances=1,
+            coalesce=True,
+            replace_existing=True
+        )
+    
+    if anomaly_detector.enabled:
+        # Evaluate the sensor windows of the whole fleet
+        scheduler.add_job(
+            run_anomaly_job,
+            'interval',
+            seconds=app.config['ANOMALY_INTERVAL'],
+            args=[app],
+            id='anomaly-detection',
+            max_instances=1,
+            coalesce=True,
+            replace_existing=True
+        )
+    
+    if liveness_tracker.enabled:
+        # Take devices that missed their report deadline offline
+        scheduler.add_job(
+            run_liveness_job,
+            'interval',
+            seconds=app.config['LIVENESS_CHECK_INTERVAL'],
+            args=[app],
+            id='liveness',
+            max_instances=1,
+            coalesce=True,
+            replace_existing=True
+        )
+    
+    if schedule_engine.enabled:
+        # Fire stored control schedules; each firing is claimed in the database
+        scheduler.add_job(
+            run_schedule_job,
+            'interval',
+            seconds=app.config['SCHEDULE_INTERVAL'],
+            args=[app],
+            id='control-schedules',
+            next_run_time=datetime.now(),
+            max_instances=1,
+            coalesce=True,
+            replace_existing=True
+        )
+    
+    if automation_engine.enabled:
+        # Load per-device thresholds now and pick up API changes periodically
+        scheduler.add_job(
+            refresh_automation_thresholds,
+            'interval',
+            seconds=app.config['AUTOMATION_REFRESH_INTERVAL'],
+            args=[app],
+            id='automation-thresholds',
+            next_run_time=datetime.now(),
+            max_instances=1,
+            coalesce=True,
+            replace_existing=True
+        )
+    
+    scheduler.start()
+    atexit.register(lambda: scheduler.shutdown(wait=False))
\ No newline at end of file
@@ -0,0 +1,102 @@
+"""
+Fleet anomaly detection benchmark for the Exhaust Fan IoT System.
+
+Builds full windows of simulated readings for fleets of increasing size
+(devices grouped into locations, with a share of frozen and drifting
+sensors) and reports the cost of the array computation of one evaluation
+cycle of services/anomaly_service.py and of the per-reading check done on
+ingest. The episode writes of a cycle depend on the database and are not
+included.
+"""
+
+import time
+import logging
+import argparse
+import numpy as np
+
+from bench_common import percentile, save_results
+from services.anomaly_service import FleetAnomalyDetector, FLATLINE, DRIFT
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def build_fleet(devices, window, per_location, seed=1):
+    """Build full windows, location codes and the expected flags of a fleet."""
+    rng = np.random.default_rng(seed)
+    locations = np.arange(devices) // per_location
+    values = 28.0 + locations[:, None] % 7 + rng.normal(0.0, 0.3, (devices, window)).round(1)
+    
+    expected = np.zeros(devices, dtype=np.uint8)
+    frozen = rng.random(devices) < 0.01
+    values[frozen] = values[frozen, :1]
+    expected[frozen] = FLATLINE
+    drifting = ~frozen & (rng.random(devices) < 0.01)
+    values[drifting] += 8.0
+    expected[drifting] = DRIFT
+    
+    return values, np.full(devices, window, dtype=np.int64), locations, expected
+
+def run_case(devices, window, per_location, rounds):
+    """Benchmark one fleet size."""
+    detector = FleetAnomalyDetector()
+    detector.enabled = True
+    values, counts, locations, expected = build_fleet(devices, window, per_location)
+    
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        result = detector.detect(values, counts, locations)
+        samples.append(time.perf_counter() - started)
+    
+    # Check that the planted anomalies are what was found
+    found = result['flags']
+    missed = int(np.count_nonzero((expected != 0) & (found == 0)))
+    spurious = int(np.count_nonzero((expected == 0) & (found != 0)))
+    
+    # Per-reading ingest check, feeding the same windows reading by reading
+    readings = [(f'fan_{number}', temperature) for column in values.T.tolist()
+                for number, temperature in enumerate(column)]
+    started = time.perf_counter_ns()
+    for device_id, temperature in readings:
+        detector.observe(device_id, temperature)
+    observe_ns = (time.perf_counter_ns() - started) / len(readings)
+    
+    return {
+        'devices': devices,
+        'window': window,
+        'cycle_ms_p50': round(percentile(samples, 0.5) * 1000, 3),
+        'cycle_ms_max': round(max(samples) * 1000, 3),
+        'observe_ns_per_reading': round(observe_ns, 1),
+        'planted': int(np.count_nonzero(expected)),
+        'missed': missed,
+        'spurious': spurious
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark fleet anomaly detection cycles.')
+    parser.add_argument('--devices', type=int, nargs='+', default=[100, 1000, 5000, 10000],
+                        help='Fleet sizes to benchmark')
+    parser.add_argument('--window', type=int, default=30, help='Readings per device window')
+    parser.add_argument('--per-location', type=int, default=20, help='Devices per location')
+    parser.add_argument('--rounds', type=int, default=50, help='Timed cycles per fleet size')
+    parser.add_argument('--output', type=str, help='Write results as JSON to this file')
+    args = parser.parse_args()
+    
+    results = []
+    for devices in args.devices:
+        result = run_case(devices, args.window, args.per_location, args.rounds)
+        results.append(result)
+        logger.info(
+            f"{devices:>6} devices | cycle p50 {result['cycle_ms_p50']} ms, max {result['cycle_ms_max']} ms | "
+            f"observe {result['observe_ns_per_reading']} ns | "
+            f"planted {result['planted']}, missed {result['missed']}, spurious {result['spurious']}"
+        )
+    
+    if args.output:
+        save_results(args.output, {'benchmark': 'anomaly', 'window': args.window,
+                                   'rounds': args.rounds, 'results': results})
+        logger.info(f"Results written to {args.output}")
\ No newline at end of file
@@ -0,0 +1,83 @@
+"""
+Shared helpers for the Exhaust Fan IoT System benchmark scripts.
+"""
+
+import os
+import sys
+import json
+import subprocess
+
+# Add the parent directory to the path so we can import the backend modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from config import Config
+from database import db, upgrade_schema
+from storage import storage
+
+def create_bench_app(database_uri, **overrides):
+    """
+    Create a Flask app bound to a scratch database, without MQTT.
+    
+    Args:
+        database_uri (str): SQLAlchemy database URI to benchmark against.
+        **overrides: Extra config values.
+        
+    Returns:
+        Flask: The configured application with its schema created.
+    """
+    app = Flask('exhaust_fan_bench')
+    app.config.from_object(Config)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    app.config.update(overrides)
+    db.init_app(app)
+    storage.init_app(app)
+    
+    # Register all models before creating the schema
+    import models  # noqa: F401
+    
+    with app.app_context():
+        upgrade_schema()
+    
+    return app
+
+def percentile(values, fraction):
+    """
+    Get a percentile from a list of samples (nearest-rank).
+    
+    Args:
+        values (list): Samples.
+        fraction (float): Percentile as a fraction, e.g. 0.99.
+        
+    Returns:
+        float: The percentile value, or None for an empty list.
+    """
+    if not values:
+        return None
+    
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+def git_revision():
+    """Get the current commit hash, or None outside a git checkout."""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def save_results(path, results):
+    """
+    Write benchmark results as JSON, tagged with the current commit.
+    
+    Args:
+        path (str): Output file path.
+        results (dict): Benchmark results.
+    """
+    results = dict(results, revision=git_revision())
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, default=str)
\ No newline at end of file
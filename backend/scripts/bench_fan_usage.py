@@ -0,0 +1,158 @@
+"""
+Fan usage analytics benchmark for the Exhaust Fan IoT System.
+
+Fills a scratch SQLite database with a fleet's readings every 30 seconds
+for the last few hours and synthetic stored fan usage buckets for the
+month before them (five-minute buckets only for the last day, as the
+queries below only touch that tier at their edges). It then runs the
+scheduler job until it has caught up on the readings, timing each run,
+and times get_fan_usage over the last day and over the whole month for the
+whole fleet, the query behind GET /api/analytics/fan-usage. The ranges
+start mid-bucket and end now, so they combine all tiers with raw readings
+at both edges.
+"""
+
+import os
+import time
+import random
+import logging
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+from bench_common import create_bench_app, percentile, save_results
+from database import db
+from models.device import Device
+from models.sensor_data import SensorData
+from models.fan_usage import FanUsage
+from services.fan_usage_service import FAN_USAGE_RESOLUTIONS, get_fan_usage, store_closed_buckets
+from utils.time_utils import bucket_start
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def fill_buckets(device_ids, resolution, start, end):
+    """Insert synthetic buckets of one tier for every device."""
+    buckets = []
+    width = timedelta(seconds=resolution)
+    while start < end:
+        for device_id in device_ids:
+            buckets.append({'device_id': device_id, 'resolution': resolution, 'bucket_start': start,
+                            'on_seconds': random.uniform(0, resolution), 'observed_seconds': float(resolution),
+                            'toggles': random.randint(0, 10)})
+        if len(buckets) >= 50000:
+            FanUsage.add_buckets(buckets)
+            buckets = []
+        start += width
+    FanUsage.add_buckets(buckets)
+
+def fill_tables(device_count, days, raw_hours, now):
+    """Insert raw readings for the last hours and stored buckets before them."""
+    device_ids = [f'exhaust_fan_{i}' for i in range(device_count)]
+    db.session.bulk_insert_mappings(Device, [
+        {'id': device_id, 'name': Device.default_name(device_id), 'location': f'Greenhouse {i % 10}'}
+        for i, device_id in enumerate(device_ids)
+    ])
+    
+    raw_start = bucket_start(now - timedelta(hours=raw_hours), 3600)
+    readings = []
+    for device_id in device_ids:
+        timestamp = raw_start + timedelta(seconds=random.uniform(0, 30))
+        fan_on = False
+        while timestamp < now:
+            if random.random() < 0.02:
+                fan_on = not fan_on
+            readings.append({'device_id': device_id, 'temperature': 30.0, 'fan_status': fan_on,
+                             'auto_mode': True, 'timestamp': timestamp})
+            timestamp += timedelta(seconds=30)
+        if len(readings) >= 50000:
+            SensorData.add_sensor_readings(readings)
+            readings = []
+    SensorData.add_sensor_readings(readings)
+    
+    month_start = bucket_start(raw_start - timedelta(days=days), 86400)
+    fill_buckets(device_ids, FAN_USAGE_RESOLUTIONS[0], raw_start - timedelta(days=1), raw_start)
+    fill_buckets(device_ids, 3600, month_start, raw_start)
+    fill_buckets(device_ids, 86400, month_start, bucket_start(raw_start, 86400))
+    db.session.commit()
+    
+    return month_start
+
+def time_query(start, end, repeat):
+    """Time get_fan_usage for a range; return per-query costs in ms."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        usage = get_fan_usage(start, end)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples, usage
+
+def run_size(device_count, days, raw_hours, repeat):
+    """Benchmark one fleet size."""
+    path = tempfile.mktemp(suffix='.db', prefix='bench_fan_usage_')
+    app = create_bench_app(f'sqlite:///{path}')
+    now = datetime.utcnow()
+    
+    try:
+        with app.app_context():
+            month_start = fill_tables(device_count, days, raw_hours, now)
+            db.session.execute(db.text('ANALYZE'))
+            raw_rows = SensorData.query.count()
+            
+            job_samples = []
+            while True:
+                started = time.perf_counter()
+                stored = store_closed_buckets(now)
+                if not stored:
+                    break
+                job_samples.append((time.perf_counter() - started) * 1000)
+            stored_buckets = FanUsage.query.count()
+            
+            offset = timedelta(minutes=7, seconds=30)
+            day_samples, _ = time_query(now - timedelta(days=1) + offset, now, repeat)
+            month_samples, usage = time_query(month_start + offset, now, repeat)
+            db.session.remove()
+    finally:
+        os.remove(path)
+    
+    return {
+        'devices': device_count,
+        'days': days,
+        'stored_buckets': stored_buckets,
+        'raw_rows': raw_rows,
+        'job_runs': len(job_samples),
+        'job_max_ms': round(max(job_samples, default=0.0), 1),
+        'day_p50_ms': round(percentile(day_samples, 0.5), 1),
+        'month_p50_ms': round(percentile(month_samples, 0.5), 1),
+        'month_p99_ms': round(percentile(month_samples, 0.99), 1),
+        'fleet_on_hours': usage['totals']['on_hours']
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark fleet fan usage range queries.')
+    parser.add_argument('--devices', type=int, nargs='+', default=[100, 1000], help='Fleet sizes to benchmark')
+    parser.add_argument('--days', type=int, default=30, help='Days of stored buckets')
+    parser.add_argument('--raw-hours', type=int, default=2, help='Hours of raw readings not stored yet')
+    parser.add_argument('--repeat', type=int, default=10, help='Queries per measurement')
+    parser.add_argument('--output', type=str, help='Write results as JSON to this file')
+    args = parser.parse_args()
+    
+    results = []
+    for devices in args.devices:
+        logger.info(f"Benchmarking {devices} devices...")
+        result = run_size(devices, args.days, args.raw_hours, args.repeat)
+        results.append(result)
+        logger.info(
+            f"{devices:>6} devices | {result['stored_buckets']} buckets, {result['raw_rows']} raw rows | "
+            f"job {result['job_runs']} runs, max {result['job_max_ms']} ms | day p50 {result['day_p50_ms']} ms | "
+            f"month p50 {result['month_p50_ms']} ms, p99 {result['month_p99_ms']} ms"
+        )
+    
+    if args.output:
+        save_results(args.output, {'benchmark': 'fan_usage', 'days': args.days,
+                                   'raw_hours': args.raw_hours, 'results': results})
+        logger.info(f"Results written to {args.output}")
\ No newline at end of file
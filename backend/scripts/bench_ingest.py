@@ -0,0 +1,357 @@
+"""
+Ingest throughput and latency benchmark for the Exhaust Fan IoT System.
+
+Simulates a fleet of devices sending messages in the ESP32 format (see
+test_mqtt.py) and drives process_device_message either directly or through
+an MQTT broker: a local stand-in (mqtt_stub_broker.py) unless --broker is
+given. Reports the achieved message rate, ingest-to-commit latency
+percentiles and database growth.
+
+Traffic patterns:
+    steady  every device publishes once per interval, evenly spread
+    bursty  every device publishes within the first --burst-window
+            seconds of each interval
+    storm   steady traffic, plus at --storm-at all publisher connections
+            drop and every device reconnects and publishes its status at
+            once, as the firmware does in reconnect()
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import tempfile
+import threading
+import subprocess
+from types import SimpleNamespace
+from datetime import datetime
+import paho.mqtt.client as mqtt
+
+from bench_common import create_bench_app, percentile, save_results
+from test_mqtt import build_device_payload
+from mqtt_stub_broker import StubBroker
+from database import db
+from models.device import Device
+from models.sensor_data import SensorData
+from models.sensor_rollup import SensorRollup
+from services.device_cache import device_cache
+from services.ingest_service import ingest_buffer
+from services.device_service import process_device_message
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+MODES = ('inprocess', 'broker')
+PATTERNS = ('steady', 'bursty', 'storm')
+
+# Schedule marker for dropping and re-opening the publisher connections
+RECONNECT = None
+
+class CommitRecorder:
+    """Ingest buffer listener collecting per-reading ingest-to-commit latency."""
+    
+    def __init__(self):
+        self.latencies = []
+        self.commit_durations = []
+        self.committed = 0
+        self.last_commit = None
+        self._lock = threading.Lock()
+    
+    def __call__(self, batch, duration):
+        now = datetime.utcnow()
+        with self._lock:
+            self.latencies.extend((now - reading['timestamp']).total_seconds() * 1000
+                                  for reading in batch)
+            self.commit_durations.append(duration * 1000)
+            self.committed += len(batch)
+            self.last_commit = time.perf_counter()
+
+def build_schedule(device_ids, pattern, interval, duration, burst_window, storm_at):
+    """
+    Build the send schedule of a run.
+    
+    Args:
+        device_ids (list): Simulated device IDs.
+        pattern (str): One of ``PATTERNS``.
+        interval (float): Seconds between two messages of the same device.
+        duration (float): Length of the run in seconds.
+        burst_window (float): Spread of a burst (bursty and storm patterns).
+        storm_at (float): Offset of the reconnect storm in seconds.
+    
+    Returns:
+        list: (offset in seconds, device ID or ``RECONNECT``) tuples in order.
+    """
+    events = []
+    count = len(device_ids)
+    start = 0.0
+    
+    while start < duration:
+        for index, device_id in enumerate(device_ids):
+            if pattern == 'bursty':
+                offset = start + random.uniform(0, burst_window)
+            else:
+                offset = start + interval * index / count
+            if offset < duration:
+                events.append((offset, device_id))
+        start += interval
+    
+    if pattern == 'storm':
+        events.append((storm_at, RECONNECT))
+        events.extend((storm_at + random.uniform(0, burst_window), device_id)
+                      for device_id in device_ids)
+    
+    # Reconnects sort before the messages sent at the same instant
+    events.sort(key=lambda event: (event[0], event[1] is not RECONNECT))
+    return events
+
+def run_schedule(events, send, reconnect):
+    """
+    Replay a schedule against a send function in real time.
+    
+    Returns:
+        tuple: (messages sent, seconds taken, seconds behind schedule at the end).
+    """
+    started = time.perf_counter()
+    sent = 0
+    
+    for offset, device_id in events:
+        delay = started + offset - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        if device_id is RECONNECT:
+            reconnect()
+            continue
+        send(device_id)
+        sent += 1
+    
+    finished = time.perf_counter()
+    lag = max(0.0, finished - started - (events[-1][0] if events else 0.0))
+    return sent, finished - started, lag
+
+def database_size(path):
+    """Size in bytes of a SQLite database including its WAL files."""
+    return sum(os.path.getsize(path + suffix) for suffix in ('', '-wal', '-shm')
+               if os.path.exists(path + suffix))
+
+def device_message(device_id):
+    """Build a simulated MQTT message object for a device."""
+    return SimpleNamespace(topic=f'device/{device_id}',
+                           payload=build_device_payload(device_id).encode('utf-8'))
+
+def drive_inprocess(app, events):
+    """Call process_device_message directly, as the MQTT callback would."""
+    with app.app_context():
+        return run_schedule(events, lambda device_id: process_device_message(device_message(device_id)),
+                            lambda: None)
+
+def drive_broker(app, events, broker_address, connections, qos, timeout):
+    """Publish through a broker to a subscriber that runs process_device_message."""
+    host, port = broker_address
+    received = [0]
+    
+    def on_message(client, userdata, message):
+        with app.app_context():
+            process_device_message(message)
+        received[0] += 1
+    
+    consumer = mqtt.Client(client_id='exhaust_fan_bench_ingest')
+    consumer.on_message = on_message
+    consumer.on_connect = lambda client, userdata, flags, rc: client.subscribe('device/#', qos=1)
+    consumer.connect(host, port)
+    consumer.loop_start()
+    
+    def connect_publishers():
+        clients = []
+        for _ in range(connections):
+            client = mqtt.Client()
+            # Tolerate the unacknowledged backlog of a burst
+            client.max_inflight_messages_set(1000)
+            client.max_queued_messages_set(0)
+            client.connect(host, port)
+            client.loop_start()
+            clients.append(client)
+        return clients
+    
+    publishers = connect_publishers()
+    time.sleep(0.5)
+    
+    def send(device_id):
+        client = publishers[hash(device_id) % len(publishers)]
+        client.publish(f'device/{device_id}', build_device_payload(device_id), qos=qos)
+    
+    def reconnect():
+        for client in publishers:
+            client.disconnect()
+            client.loop_stop()
+        publishers[:] = connect_publishers()
+    
+    try:
+        sent, elapsed, lag = run_schedule(events, send, reconnect)
+        
+        # Wait for the subscriber to catch up with everything published
+        deadline = time.perf_counter() + timeout
+        while received[0] < sent and time.perf_counter() < deadline:
+            time.sleep(0.05)
+        if received[0] < sent:
+            logger.warning(f"Subscriber received {received[0]} of {sent} messages")
+    finally:
+        for client in publishers + [consumer]:
+            client.disconnect()
+            client.loop_stop()
+    
+    return sent, elapsed, lag
+
+def run_benchmark(args):
+    """Run one mode and pattern and return its results."""
+    path = tempfile.mktemp(suffix='.db', prefix='bench_ingest_')
+    app = create_bench_app(f'sqlite:///{path}')
+    # Per-message INFO logging would dominate the measurement
+    app.logger.setLevel(logging.WARNING)
+    device_ids = [f'bench_fan_{i}' for i in range(args.devices)]
+    events = build_schedule(device_ids, args.pattern, args.interval, args.duration,
+                            args.burst_window, args.storm_at)
+    
+    recorder = CommitRecorder()
+    device_cache.init_app(app)
+    ingest_buffer.add_listener(recorder)
+    ingest_buffer.init_app(app)
+    
+    broker = None
+    size_before = database_size(path)
+    started = time.perf_counter()
+    
+    try:
+        if args.mode == 'inprocess':
+            sent, elapsed, lag = drive_inprocess(app, events)
+        else:
+            if args.broker:
+                host, _, port = args.broker.partition(':')
+                broker_address = (host, int(port or 1883))
+            else:
+                broker = StubBroker().start()
+                broker_address = broker.address
+            sent, elapsed, lag = drive_broker(app, events, broker_address, args.connections,
+                                              args.qos, args.timeout)
+        
+        # Flush everything still buffered
+        ingest_buffer.stop()
+        
+        with app.app_context():
+            rows = {
+                'devices': Device.query.count(),
+                'sensor_data': SensorData.query.count(),
+                'sensor_rollups': SensorRollup.query.count()
+            }
+            db.session.remove()
+        size_after = database_size(path)
+    finally:
+        if broker is not None:
+            broker.stop()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    
+    total = (recorder.last_commit or time.perf_counter()) - started
+    return {
+        'mode': args.mode,
+        'pattern': args.pattern,
+        'devices': args.devices,
+        'interval': args.interval,
+        'duration': args.duration,
+        'offered_rate': round(sent / args.duration, 1),
+        'messages_sent': sent,
+        'messages_committed': recorder.committed,
+        'send_seconds': round(elapsed, 3),
+        'schedule_lag_seconds': round(lag, 3),
+        'throughput_msgs_per_s': round(recorder.committed / total, 1) if total else None,
+        'ingest_to_commit_ms': {
+            'p50': round(percentile(recorder.latencies, 0.5) or 0, 2),
+            'p99': round(percentile(recorder.latencies, 0.99) or 0, 2),
+            'max': round(max(recorder.latencies, default=0), 2)
+        },
+        'commit_ms': {
+            'batches': len(recorder.commit_durations),
+            'p50': round(percentile(recorder.commit_durations, 0.5) or 0, 2),
+            'p99': round(percentile(recorder.commit_durations, 0.99) or 0, 2)
+        },
+        'db': {
+            'bytes_before': size_before,
+            'bytes_after': size_after,
+            'bytes_per_reading': round((size_after - size_before) / max(recorder.committed, 1), 1),
+            'rows': rows
+        }
+    }
+
+def run_all_modes():
+    """Run every mode in a fresh interpreter, since the ingest singletons are per process."""
+    results = []
+    for mode in MODES:
+        with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+            output = f.name
+        subprocess.run([sys.executable, os.path.abspath(__file__)] +
+                       strip_options(sys.argv[1:], ('--mode', '--output')) +
+                       ['--mode', mode, '--output', output], check=True)
+        with open(output) as f:
+            results.extend(json.load(f)['results'])
+        os.remove(output)
+    return results
+
+def strip_options(argv, names):
+    """Remove options (and their values) from an argument list."""
+    stripped = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+            continue
+        name = arg.split('=', 1)[0]
+        if name in names:
+            skip = '=' not in arg
+            continue
+        stripped.append(arg)
+    return stripped
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark device message ingestion.')
+    parser.add_argument('--mode', choices=MODES + ('all',), default='inprocess', help='How messages reach process_device_message')
+    parser.add_argument('--pattern', choices=PATTERNS, default='steady', help='Traffic pattern')
+    parser.add_argument('--devices', type=int, default=2000, help='Number of simulated devices')
+    parser.add_argument('--interval', type=float, default=1.0, help='Seconds between messages of one device')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds of traffic to generate')
+    parser.add_argument('--burst-window', type=float, default=0.1, help='Seconds over which a burst or storm is spread')
+    parser.add_argument('--storm-at', type=float, help='Offset of the reconnect storm (default: half the duration)')
+    parser.add_argument('--broker', type=str, help='Use this broker (host[:port]) instead of the local stand-in')
+    parser.add_argument('--connections', type=int, default=4, help='Publisher connections in broker mode')
+    parser.add_argument('--qos', type=int, choices=(0, 1), default=0, help='Publish QoS in broker mode')
+    parser.add_argument('--timeout', type=float, default=60.0, help='Seconds to wait for the subscriber to catch up')
+    parser.add_argument('--output', type=str, help='Write results as JSON to this file')
+    args = parser.parse_args()
+    
+    if args.storm_at is None:
+        args.storm_at = args.duration / 2
+    
+    if args.mode == 'all':
+        results = run_all_modes()
+    else:
+        logger.info(f"Running {args.mode} benchmark: {args.devices} devices, {args.pattern} traffic "
+                    f"every {args.interval}s for {args.duration}s")
+        results = [run_benchmark(args)]
+    
+    for result in results:
+        logger.info(
+            f"{result['mode']:>9} {result['pattern']:>6} | {result['messages_committed']}/{result['messages_sent']} "
+            f"committed | {result['throughput_msgs_per_s']} msgs/s | ingest-to-commit p50 "
+            f"{result['ingest_to_commit_ms']['p50']} ms, p99 {result['ingest_to_commit_ms']['p99']} ms | "
+            f"{result['db']['bytes_per_reading']} bytes/reading"
+        )
+    
+    if args.output:
+        save_results(args.output, {'benchmark': 'ingest', 'results': results})
+        logger.info(f"Results written to {args.output}")
\ No newline at end of file
@@ -0,0 +1,121 @@
+"""
+Device liveness tracking benchmark for the Exhaust Fan IoT System.
+
+Feeds fleets of increasing size with one message per device every publish
+interval for a few minutes of simulated time, with a share of devices
+falling silent, and reports the per-message cost of
+LivenessTracker.observe, the cost of the deadline sweep run by each check
+(expire) and, for comparison, the cost of a polling check that scans the
+last-seen time of every device. Recording the transitions depends on the
+database and is not included.
+"""
+
+import time
+import random
+import logging
+import argparse
+from datetime import datetime, timedelta
+
+from bench_common import percentile, save_results
+from services.liveness_service import LivenessTracker
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def run_case(devices, minutes, interval, missed, check_interval, silent_share):
+    """Benchmark one fleet size."""
+    tracker = LivenessTracker()
+    tracker.enabled = True
+    tracker.interval = timedelta(seconds=interval)
+    tracker.missed_intervals = missed
+    
+    device_ids = [f'exhaust_fan_{i}' for i in range(devices)]
+    offsets = [random.uniform(0, interval) for _ in device_ids]
+    silent_after = {device_id: random.uniform(0, minutes * 60) for device_id in device_ids
+                    if random.random() < silent_share}
+    start = datetime(2026, 1, 1)
+    
+    # Every message of the run in arrival order
+    messages = sorted(
+        (offset + interval * k, device_id)
+        for device_id, offset in zip(device_ids, offsets)
+        for k in range(int(minutes * 60 // interval) + 1)
+        if offset + interval * k < silent_after.get(device_id, float('inf'))
+    )
+    messages = [(second, start + timedelta(seconds=second), device_id) for second, device_id in messages]
+    position = 0
+    
+    observe_ns = []
+    sweep_samples = []
+    scan_samples = []
+    went_offline = 0
+    step = 0.0
+    while step < minutes * 60:
+        step += check_interval
+        end = position
+        while end < len(messages) and messages[end][0] < step:
+            end += 1
+        
+        started = time.perf_counter_ns()
+        for _, seen_at, device_id in messages[position:end]:
+            tracker.observe(device_id, seen_at)
+        if end > position:
+            observe_ns.append((time.perf_counter_ns() - started) / (end - position))
+        position = end
+        
+        now = start + timedelta(seconds=step)
+        started = time.perf_counter()
+        offline, _ = tracker.expire(now)
+        sweep_samples.append(time.perf_counter() - started)
+        went_offline += len(offline)
+        
+        # Polling alternative: compare every device's last message to the timeout
+        started = time.perf_counter()
+        cutoff = now - tracker.timeout
+        stale = [device_id for device_id, seen_at in tracker._last_seen.items() if seen_at <= cutoff]
+        scan_samples.append(time.perf_counter() - started)
+    
+    return {
+        'devices': devices,
+        'observe_ns_p50': round(percentile(observe_ns, 0.5), 1),
+        'sweep_ms_p50': round(percentile(sweep_samples, 0.5) * 1000, 3),
+        'sweep_ms_max': round(max(sweep_samples) * 1000, 3),
+        'scan_ms_p50': round(percentile(scan_samples, 0.5) * 1000, 3),
+        'silenced': len(silent_after),
+        'went_offline': went_offline,
+        'still_stale': len(stale),
+        'heap_entries': len(tracker._heap)
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark device liveness tracking.')
+    parser.add_argument('--devices', type=int, nargs='+', default=[1000, 10000, 50000],
+                        help='Fleet sizes to benchmark')
+    parser.add_argument('--minutes', type=int, default=10, help='Simulated minutes per fleet size')
+    parser.add_argument('--interval', type=float, default=30.0, help='Device publish interval in seconds')
+    parser.add_argument('--missed', type=int, default=3, help='Missed intervals before a device is offline')
+    parser.add_argument('--check-interval', type=float, default=5.0, help='Seconds between checks')
+    parser.add_argument('--silent-share', type=float, default=0.05, help='Share of devices that fall silent')
+    parser.add_argument('--output', type=str, help='Write results as JSON to this file')
+    args = parser.parse_args()
+    
+    results = []
+    for devices in args.devices:
+        result = run_case(devices, args.minutes, args.interval, args.missed, args.check_interval,
+                          args.silent_share)
+        results.append(result)
+        logger.info(
+            f"{devices:>6} devices | observe {result['observe_ns_p50']} ns | "
+            f"sweep p50 {result['sweep_ms_p50']} ms, max {result['sweep_ms_max']} ms | "
+            f"scan p50 {result['scan_ms_p50']} ms | silenced {result['silenced']}, "
+            f"offline {result['went_offline']}, heap {result['heap_entries']}"
+        )
+    
+    if args.output:
+        save_results(args.output, {'benchmark': 'liveness', 'interval': args.interval,
+                                   'missed': args.missed, 'results': results})
+        logger.info(f"Results written to {args.output}")
\ No newline at end of file
@@ -0,0 +1,99 @@
+"""
+Device payload decoding micro-benchmark for the Exhaust Fan IoT System.
+
+Decodes the same simulated device reports as JSON (the format of
+test_mqtt.py) and as binary frames (utils/payload_codec.py) through
+decode_device_message, as process_device_message does, and reports the
+decode cost per message and the payload sizes. Messages with and without
+an acknowledged command ID are measured separately, since the ID makes up
+most of a binary frame.
+"""
+
+import json
+import time
+import uuid
+import random
+import logging
+import argparse
+
+from bench_common import percentile, save_results
+from test_mqtt import build_device_payload
+from utils.payload_codec import decode_device_message, encode_binary
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def build_messages(count, devices, with_ack):
+    """Build matching (topic, payload) lists in both encodings."""
+    json_messages = []
+    binary_messages = []
+    for number in range(count):
+        device_id = f'exhaust_fan_{number % devices}'
+        temperature = round(random.uniform(25.0, 40.0), 1)
+        fan_status = temperature > 35.0
+        ack = uuid.uuid4().hex if with_ack else None
+        
+        payload = build_device_payload(device_id, temperature, fan_status, True)
+        if ack:
+            payload = payload[:-1] + f', "ack": "{ack}"}}'
+        json_messages.append((f'device/{device_id}', payload.encode('utf-8')))
+        binary_messages.append((f'device/{device_id}/bin',
+                                encode_binary(temperature, fan_status, True, json.loads(payload)['timestamp'], ack)))
+    
+    return {'json': json_messages, 'binary': binary_messages}
+
+def time_decoding(messages, rounds):
+    """Decode every message once per round; return per-message costs of each round in ns."""
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter_ns()
+        for topic, payload in messages:
+            device_id, data, _ = decode_device_message(topic, payload)
+            # Read the fields the ingest path uses
+            data.get('temperature'), data.get('fan'), data.get('auto'), data.get('ack')
+        samples.append((time.perf_counter_ns() - started) / len(messages))
+    return samples
+
+def run_case(count, devices, rounds, with_ack):
+    """Benchmark both encodings for one message shape."""
+    encodings = build_messages(count, devices, with_ack)
+    result = {'ack': with_ack}
+    
+    for encoding, messages in encodings.items():
+        samples = time_decoding(messages, rounds)
+        result[encoding] = {
+            'ns_per_message_p50': round(percentile(samples, 0.5), 1),
+            'ns_per_message_min': round(min(samples), 1),
+            'bytes_per_message': round(sum(len(payload) for _, payload in messages) / len(messages), 1)
+        }
+    
+    result['speedup'] = round(result['json']['ns_per_message_p50'] / result['binary']['ns_per_message_p50'], 2)
+    return result
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark JSON against binary device payload decoding.')
+    parser.add_argument('--messages', type=int, default=10000, help='Messages per round')
+    parser.add_argument('--devices', type=int, default=100, help='Number of simulated devices')
+    parser.add_argument('--rounds', type=int, default=20, help='Timed rounds per encoding')
+    parser.add_argument('--output', type=str, help='Write results as JSON to this file')
+    args = parser.parse_args()
+    
+    results = []
+    for with_ack in (False, True):
+        result = run_case(args.messages, args.devices, args.rounds, with_ack)
+        results.append(result)
+        logger.info(
+            f"{'with ack' if with_ack else 'no ack':>8} | "
+            f"json {result['json']['ns_per_message_p50']} ns, {result['json']['bytes_per_message']} B | "
+            f"binary {result['binary']['ns_per_message_p50']} ns, {result['binary']['bytes_per_message']} B | "
+            f"{result['speedup']}x faster"
+        )
+    
+    if args.output:
+        save_results(args.output, {'benchmark': 'payload', 'messages': args.messages,
+                                   'rounds': args.rounds, 'results': results})
+        logger.info(f"Results written to {args.output}")
\ No newline at end of file
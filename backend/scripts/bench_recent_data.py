@@ -0,0 +1,147 @@
+"""
+Recent-data query benchmark for the Exhaust Fan IoT System.
+
+Fills a scratch SQLite database with growing amounts of sensor data and
+control history and times SensorData.get_recent_data and
+ControlHistory.get_recent_history with and without the composite
+(device_id, timestamp) indexes. With the indexes the latency should stay
+flat as the tables grow.
+"""
+
+import os
+import time
+import random
+import logging
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+from bench_common import create_bench_app, percentile, save_results
+from database import db
+from models.device import Device
+from models.sensor_data import SensorData
+from models.control_history import ControlHistory
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+COMPOSITE_INDEXES = (
+    ('sensor_data', 'ix_sensor_data_device_timestamp'),
+    ('control_history', 'ix_control_history_device_timestamp'),
+)
+
+def fill_tables(rows, device_count, start):
+    """Insert rows of sensor data and a tenth as much control history."""
+    device_ids = [f'exhaust_fan_{i}' for i in range(device_count)]
+    db.session.bulk_insert_mappings(Device, [
+        {'id': device_id, 'name': Device.default_name(device_id), 'location': 'Bench'}
+        for device_id in device_ids
+    ])
+    
+    batch = []
+    for i in range(rows):
+        batch.append({
+            'device_id': device_ids[i % device_count],
+            'temperature': round(random.uniform(25.0, 40.0), 1),
+            'fan_status': i % 2 == 0,
+            'auto_mode': True,
+            'timestamp': start + timedelta(seconds=30 * (i // device_count))
+        })
+        if len(batch) == 10000:
+            db.session.bulk_insert_mappings(SensorData, batch)
+            batch = []
+    if batch:
+        db.session.bulk_insert_mappings(SensorData, batch)
+    
+    db.session.bulk_insert_mappings(ControlHistory, [
+        {
+            'device_id': device_ids[i % device_count],
+            'command_type': 'fan_control',
+            'command_value': 'on' if i % 2 else 'off',
+            'source': 'app',
+            'timestamp': start + timedelta(seconds=300 * (i // device_count))
+        }
+        for i in range(rows // 10)
+    ])
+    db.session.commit()
+    return device_ids
+
+def time_queries(device_ids, repeat, limit):
+    """Time recent-data and recent-history queries for random devices."""
+    sensor_samples = []
+    history_samples = []
+    
+    for _ in range(repeat):
+        device_id = random.choice(device_ids)
+        
+        started = time.perf_counter()
+        SensorData.get_recent_data(device_id, limit)
+        sensor_samples.append((time.perf_counter() - started) * 1000)
+        
+        started = time.perf_counter()
+        ControlHistory.get_recent_history(device_id, limit)
+        history_samples.append((time.perf_counter() - started) * 1000)
+        
+        # Measure the query, not the identity map
+        db.session.expunge_all()
+    
+    return {
+        'sensor_data_p50_ms': round(percentile(sensor_samples, 0.5), 3),
+        'sensor_data_p99_ms': round(percentile(sensor_samples, 0.99), 3),
+        'control_history_p50_ms': round(percentile(history_samples, 0.5), 3),
+        'control_history_p99_ms': round(percentile(history_samples, 0.99), 3)
+    }
+
+def run_size(rows, device_count, repeat, limit):
+    """Benchmark one table size with and without the composite indexes."""
+    path = tempfile.mktemp(suffix='.db', prefix='bench_recent_')
+    app = create_bench_app(f'sqlite:///{path}')
+    
+    try:
+        with app.app_context():
+            device_ids = fill_tables(rows, device_count, datetime.utcnow() - timedelta(days=365))
+            db.session.execute(db.text('ANALYZE'))
+            
+            indexed = time_queries(device_ids, repeat, limit)
+            
+            for _, index_name in COMPOSITE_INDEXES:
+                db.session.execute(db.text(f'DROP INDEX {index_name}'))
+            db.session.execute(db.text('ANALYZE'))
+            db.session.commit()
+            
+            unindexed = time_queries(device_ids, repeat, limit)
+            db.session.remove()
+    finally:
+        os.remove(path)
+    
+    return {'rows': rows, 'indexed': indexed, 'unindexed': unindexed}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark recent-data queries as tables grow.')
+    parser.add_argument('--sizes', type=str, default='10000,100000,500000', help='Comma-separated sensor_data row counts')
+    parser.add_argument('--devices', type=int, default=50, help='Number of simulated devices')
+    parser.add_argument('--repeat', type=int, default=200, help='Queries per measurement')
+    parser.add_argument('--limit', type=int, default=100, help='Rows requested per query')
+    parser.add_argument('--output', type=str, help='Write results as JSON to this file')
+    args = parser.parse_args()
+    
+    results = []
+    for rows in [int(size) for size in args.sizes.split(',')]:
+        logger.info(f"Benchmarking {rows} rows...")
+        result = run_size(rows, args.devices, args.repeat, args.limit)
+        results.append(result)
+        logger.info(
+            f"{rows:>9} rows | sensor p50 {result['indexed']['sensor_data_p50_ms']} ms indexed, "
+            f"{result['unindexed']['sensor_data_p50_ms']} ms unindexed | "
+            f"history p50 {result['indexed']['control_history_p50_ms']} ms indexed, "
+            f"{result['unindexed']['control_history_p50_ms']} ms unindexed"
+        )
+    
+    if args.output:
+        save_results(args.output, {'benchmark': 'recent_data', 'devices': args.devices,
+                                   'limit': args.limit, 'results': results})
+        logger.info(f"Results written to {args.output}")
@@ -0,0 +1,258 @@
+"""
+Concurrent read/write benchmark for the Exhaust Fan IoT System storage backends.
+
+Starts several writer processes against one database, the way the
+ingestion process and gunicorn workers share it, and has each commit
+batches of sensor readings and control records through the model helpers.
+Reader processes with several threads each (like gthread workers) run the
+recent-data queries the API serves meanwhile. Reports the combined write
+rate, commit and query latency percentiles and how many operations failed
+with ``database is locked`` or similar errors.
+
+Runs against a scratch SQLite file by default; pass --database-uri to
+test a local PostgreSQL/TimescaleDB database instead (its tables are
+created if needed, existing rows are left alone). With --baseline the same
+workload also runs with STORAGE_BACKEND=generic, i.e. without the
+engine-specific tuning, and --profiles compares SQLite tuning profiles.
+A WAL checkpoint runs every --checkpoint-interval seconds, as the
+scheduler does.
+"""
+
+import os
+import time
+import random
+import logging
+import argparse
+import tempfile
+import threading
+import multiprocessing
+from datetime import datetime
+
+from bench_common import create_bench_app, percentile, save_results
+from database import db
+from storage import storage
+from models.device import Device
+from models.sensor_data import SensorData
+from models.control_history import ControlHistory
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DEVICE_COUNT = 50
+
+def device_ids():
+    return [f'bench_fan_{i}' for i in range(DEVICE_COUNT)]
+
+def run_writer(database_uri, overrides, worker, batches, batch_size, results):
+    """Commit batches of readings and report per-commit latencies and errors."""
+    app = create_bench_app(database_uri, **overrides)
+    ids = device_ids()
+    latencies = []
+    errors = 0
+    
+    with app.app_context():
+        for number in range(batches):
+            readings = [{
+                'device_id': random.choice(ids),
+                'temperature': round(random.uniform(25.0, 40.0), 1),
+                'fan_status': random.random() < 0.5,
+                'auto_mode': True,
+                'timestamp': datetime.utcnow()
+            } for _ in range(batch_size)]
+            
+            started = time.perf_counter()
+            try:
+                SensorData.add_sensor_readings(readings)
+                db.session.commit()
+                if number % 10 == 0:
+                    ControlHistory.add_control_records([{
+                        'device_id': random.choice(ids),
+                        'command_type': 'fan_control',
+                        'command_value': 'on',
+                        'source': f'bench-{worker}'
+                    }])
+                latencies.append((time.perf_counter() - started) * 1000)
+            except Exception as e:
+                db.session.rollback()
+                errors += 1
+                logger.debug(f"Writer {worker} commit failed: {str(e)}")
+        
+        db.session.remove()
+    
+    results.put({'role': 'writer', 'latencies': latencies, 'errors': errors})
+
+def run_reader(database_uri, overrides, threads, limit, stop, results):
+    """Query recent data from several threads until stopped."""
+    app = create_bench_app(database_uri, **overrides)
+    ids = device_ids()
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    
+    def query():
+        samples = []
+        with app.app_context():
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    SensorData.get_recent_data(random.choice(ids), limit)
+                    samples.append((time.perf_counter() - started) * 1000)
+                except Exception as e:
+                    with lock:
+                        errors[0] += 1
+                    logger.debug(f"Reader query failed: {str(e)}")
+                finally:
+                    # Return the connection as a request teardown would
+                    db.session.remove()
+        with lock:
+            latencies.extend(samples)
+    
+    workers = [threading.Thread(target=query) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    
+    results.put({'role': 'reader', 'latencies': latencies, 'errors': errors[0]})
+
+def run_checkpoints(app, interval, stop, durations):
+    """Run storage maintenance (the WAL checkpoint) periodically until stopped."""
+    while not stop.wait(interval):
+        started = time.perf_counter()
+        with app.app_context():
+            storage.maintain()
+            db.session.remove()
+        durations.append((time.perf_counter() - started) * 1000)
+
+def latency_summary(latencies):
+    return {
+        'p50': round(percentile(latencies, 0.5) or 0, 2),
+        'p99': round(percentile(latencies, 0.99) or 0, 2),
+        'max': round(max(latencies, default=0), 2)
+    }
+
+def run_benchmark(database_uri, label, overrides, args):
+    """Run the writers and readers against one database and return the combined results."""
+    app = create_bench_app(database_uri, **overrides)
+    with app.app_context():
+        existing = {row.id for row in db.session.query(Device.id)}
+        db.session.bulk_insert_mappings(Device, [
+            {'id': device_id, 'name': Device.default_name(device_id), 'location': 'Bench'}
+            for device_id in device_ids() if device_id not in existing
+        ])
+        db.session.commit()
+        rows_before = SensorData.query.count()
+        backend_name = storage.name
+        db.session.remove()
+    
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    stop = context.Event()
+    writers = [
+        context.Process(target=run_writer, args=(database_uri, overrides, worker, args.batches,
+                                                 args.batch_size, results))
+        for worker in range(args.writers)
+    ]
+    readers = [
+        context.Process(target=run_reader, args=(database_uri, overrides, args.reader_threads,
+                                                 args.limit, stop, results))
+        for _ in range(args.readers)
+    ]
+    checkpoint_durations = []
+    checkpointer = threading.Thread(target=run_checkpoints,
+                                    args=(app, args.checkpoint_interval, stop, checkpoint_durations))
+    
+    started = time.perf_counter()
+    for process in readers + writers:
+        process.start()
+    checkpointer.start()
+    outcomes = [results.get() for _ in writers]
+    elapsed = time.perf_counter() - started
+    
+    stop.set()
+    outcomes.extend(results.get() for _ in readers)
+    for process in readers + writers:
+        process.join()
+    checkpointer.join()
+    
+    with app.app_context():
+        rows_written = SensorData.query.count() - rows_before
+        db.session.remove()
+    
+    write_latencies = [latency for outcome in outcomes if outcome['role'] == 'writer'
+                       for latency in outcome['latencies']]
+    read_latencies = [latency for outcome in outcomes if outcome['role'] == 'reader'
+                      for latency in outcome['latencies']]
+    return {
+        'configuration': label,
+        'backend': backend_name,
+        'writers': args.writers,
+        'readers': args.readers * args.reader_threads,
+        'batch_size': args.batch_size,
+        'commits': len(write_latencies),
+        'failed_commits': sum(outcome['errors'] for outcome in outcomes if outcome['role'] == 'writer'),
+        'rows_written': rows_written,
+        'seconds': round(elapsed, 3),
+        'rows_per_s': round(rows_written / elapsed, 1),
+        'commit_ms': latency_summary(write_latencies),
+        'queries': len(read_latencies),
+        'failed_queries': sum(outcome['errors'] for outcome in outcomes if outcome['role'] == 'reader'),
+        'queries_per_s': round(len(read_latencies) / elapsed, 1),
+        'query_ms': latency_summary(read_latencies),
+        'checkpoint_ms': latency_summary(checkpoint_durations)
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark concurrent writes through the storage backend.')
+    parser.add_argument('--database-uri', type=str, help='Database to write to (default: a scratch SQLite file)')
+    parser.add_argument('--writers', type=int, default=4, help='Number of writer processes')
+    parser.add_argument('--batches', type=int, default=200, help='Commits per writer')
+    parser.add_argument('--batch-size', type=int, default=50, help='Readings per commit')
+    parser.add_argument('--readers', type=int, default=2, help='Number of reader processes')
+    parser.add_argument('--reader-threads', type=int, default=8, help='Query threads per reader process')
+    parser.add_argument('--limit', type=int, default=100, help='Rows requested per query')
+    parser.add_argument('--checkpoint-interval', type=float, default=1.0, help='Seconds between WAL checkpoints')
+    parser.add_argument('--baseline', action='store_true', help='Also run without engine-specific tuning')
+    parser.add_argument('--profiles', type=str, help='Comma-separated SQLite profiles to compare, e.g. default,pi')
+    parser.add_argument('--output', type=str, help='Write results as JSON to this file')
+    args = parser.parse_args()
+    
+    configurations = [('generic', {'STORAGE_BACKEND': 'generic'})] if args.baseline else []
+    if args.profiles:
+        configurations.extend((f'sqlite-{profile}', {'SQLITE_PROFILE': profile})
+                              for profile in args.profiles.split(','))
+    else:
+        configurations.append(('auto', {}))
+    
+    results = []
+    for label, overrides in configurations:
+        path = None
+        database_uri = args.database_uri
+        if database_uri is None:
+            path = tempfile.mktemp(suffix='.db', prefix='bench_storage_')
+            database_uri = f'sqlite:///{path}'
+        
+        try:
+            result = run_benchmark(database_uri, label, overrides, args)
+        finally:
+            if path is not None:
+                for suffix in ('', '-wal', '-shm'):
+                    if os.path.exists(path + suffix):
+                        os.remove(path + suffix)
+        
+        results.append(result)
+        logger.info(
+            f"{label:>14} | {result['writers']} writers, {result['readers']} readers | "
+            f"{result['rows_per_s']} rows/s, commit p50 {result['commit_ms']['p50']} ms, "
+            f"p99 {result['commit_ms']['p99']} ms | {result['queries_per_s']} queries/s, "
+            f"p50 {result['query_ms']['p50']} ms, p99 {result['query_ms']['p99']} ms | "
+            f"{result['failed_commits']} failed commits, {result['failed_queries']} failed queries"
+        )
+    
+    if args.output:
+        save_results(args.output, {'benchmark': 'storage', 'results': results})
+        logger.info(f"Results written to {args.output}")
\ No newline at end of file
@@ -0,0 +1,46 @@
+"""
+Data retention script for the Exhaust Fan IoT System.
+
+Runs the same retention pass as the scheduled job and prints a report.
+"""
+
+import os
+import sys
+import json
+import logging
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from script_common import create_script_app
+from services.retention_service import enforce_retention
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+app = create_script_app()
+
+if __name__ == '__main__':
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Delete sensor data and control history past their retention period.')
+    parser.add_argument('--sensor-days', type=int, help='Override SENSOR_DATA_RETENTION (days)')
+    parser.add_argument('--control-days', type=int, help='Override CONTROL_HISTORY_RETENTION (days)')
+    parser.add_argument('--no-rollup', action='store_true', help='Do not backfill rollups before deleting sensor data')
+    args = parser.parse_args()
+    
+    if args.sensor_days is not None:
+        app.config['SENSOR_DATA_RETENTION'] = args.sensor_days
+    if args.control_days is not None:
+        app.config['CONTROL_HISTORY_RETENTION'] = args.control_days
+    if args.no_rollup:
+        app.config['RETENTION_ROLLUP_BEFORE_DELETE'] = False
+    
+    with app.app_context():
+        report = enforce_retention()
+    
+    logger.info("Retention report: %s", json.dumps(report))
\ No newline at end of file
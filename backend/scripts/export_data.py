@@ -0,0 +1,74 @@
+"""
+Sensor data export script for the Exhaust Fan IoT System.
+
+Streams sensor history to a file or stdout as NDJSON or CSV, optionally
+gzip-compressed, using the same generator as the export endpoints.
+"""
+
+import os
+import sys
+import logging
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from script_common import create_script_app
+from services.export_service import EXPORT_FORMATS, generate_export
+from utils.time_utils import parse_timestamp
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+app = create_script_app()
+
+def export_data(output, device_ids=None, start=None, end=None, fmt='ndjson', compress=False):
+    """
+    Write a sensor data export to a binary file object.
+    
+    Args:
+        output (file): Binary file object to write to.
+        device_ids (list, optional): Devices to include, or None for all.
+        start (datetime, optional): Inclusive lower time bound.
+        end (datetime, optional): Exclusive upper time bound.
+        fmt (str): 'ndjson' or 'csv'.
+        compress (bool): Gzip-compress the output.
+    
+    Returns:
+        int: Number of bytes written.
+    """
+    written = 0
+    with app.app_context():
+        for chunk in generate_export(device_ids, start, end, fmt, compress,
+                                     app.config['EXPORT_BATCH_SIZE']):
+            output.write(chunk)
+            written += len(chunk)
+    return written
+
+if __name__ == '__main__':
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Export sensor data as NDJSON or CSV.')
+    parser.add_argument('--device', action='append', dest='devices', help='Device ID to export (repeatable, default all)')
+    parser.add_argument('--from', dest='start', type=str, help='Start time (ISO 8601 or epoch)')
+    parser.add_argument('--to', dest='end', type=str, help='End time (ISO 8601 or epoch)')
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='ndjson', help='Output format')
+    parser.add_argument('--gzip', action='store_true', help='Gzip-compress the output')
+    parser.add_argument('--output', type=str, help='Output file (default stdout)')
+    args = parser.parse_args()
+    
+    try:
+        start = parse_timestamp(args.start)
+        end = parse_timestamp(args.end)
+    except ValueError:
+        parser.error('invalid --from or --to value')
+    
+    if args.output:
+        with open(args.output, 'wb') as output:
+            written = export_data(output, args.devices, start, end, args.format, args.gzip)
+        logger.info(f"Exported {written} bytes to {args.output}")
+    else:
+        export_data(sys.stdout.buffer, args.devices, start, end, args.format, args.gzip)
\ No newline at end of file
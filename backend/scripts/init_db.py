@@ -10,9 +10,11 @@ import logging
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from app import app, db
+from database import upgrade_schema
 from models.device import Device
 from models.sensor_data import SensorData
 from models.control_history import ControlHistory
+from models.sensor_rollup import SensorRollup
 
 # Configure logging
 logging.basicConfig(
@@ -24,8 +26,9 @@ logger = logging.getLogger(__name__)
 def initialize_database():
     """Initialize the database with tables and default data."""
     with app.app_context():
-        logger.info("Creating database tables...")
-        db.create_all()
+        logger.info("Creating database tables and indexes...")
+        for name in upgrade_schema():
+            logger.info(f"Created column or index: {name}")
         
         # Check if default devices exist
         logger.info("Creating default devices if they don't exist...")
@@ -62,6 +65,17 @@ def initialize_database():
         db.session.commit()
         logger.info("Database initialization complete.")
 
+def migrate_database():
+    """Apply schema changes (new tables, columns and indexes) to an existing database."""
+    with app.app_context():
+        logger.info("Upgrading database schema...")
+        created = upgrade_schema()
+        
+        for name in created:
+            logger.info(f"Created column or index: {name}")
+        
+        logger.info(f"Database migration complete ({len(created)} columns and indexes created).")
+
 def purge_database():
     """Remove all data from the database."""
     with app.app_context():
@@ -69,6 +83,7 @@ def purge_database():
         
         # Remove all data from tables
         ControlHistory.query.delete()
+        SensorRollup.query.delete()
         SensorData.query.delete()
         Device.query.delete()
         
@@ -81,9 +96,12 @@ if __name__ == '__main__':
     
     parser = argparse.ArgumentParser(description='Initialize or purge the database.')
     parser.add_argument('--purge', action='store_true', help='Purge all data from the database')
+    parser.add_argument('--migrate', action='store_true', help='Add missing tables and indexes to an existing database')
     args = parser.parse_args()
     
     if args.purge:
         purge_database()
+    elif args.migrate:
+        migrate_database()
     else:
         initialize_database()
\ No newline at end of file
@@ -0,0 +1,207 @@
+"""
+Minimal MQTT broker stand-in for the Exhaust Fan IoT System benchmarks.
+
+Implements just enough of MQTT 3.1.1 (CONNECT, PUBLISH at QoS 0/1,
+SUBSCRIBE, UNSUBSCRIBE, PINGREQ, DISCONNECT) for paho clients to exchange
+messages locally when no Mosquitto broker is available. Messages are
+always forwarded to subscribers at QoS 0; there are no sessions, retained
+messages or authentication.
+"""
+
+import socket
+import struct
+import logging
+import argparse
+import threading
+import socketserver
+
+logger = logging.getLogger(__name__)
+
+CONNECT, CONNACK, PUBLISH, PUBACK = 1, 2, 3, 4
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK = 8, 9, 10, 11
+PINGREQ, PINGRESP, DISCONNECT = 12, 13, 14
+
+def topic_matches(pattern, topic):
+    """
+    Check a topic against a subscription filter with ``+`` and ``#`` wildcards.
+    
+    Args:
+        pattern (str): The subscription filter.
+        topic (str): The topic name.
+    
+    Returns:
+        bool: True if the topic matches the filter.
+    """
+    pattern_parts = pattern.split('/')
+    topic_parts = topic.split('/')
+    
+    for index, part in enumerate(pattern_parts):
+        if part == '#':
+            return True
+        if index >= len(topic_parts):
+            return False
+        if part != '+' and part != topic_parts[index]:
+            return False
+    
+    return len(pattern_parts) == len(topic_parts)
+
+def _encode_length(length):
+    encoded = bytearray()
+    while True:
+        byte, length = length % 128, length // 128
+        encoded.append(byte | 0x80 if length else byte)
+        if not length:
+            return bytes(encoded)
+
+def _packet(packet_type, flags, body=b''):
+    return bytes([packet_type << 4 | flags]) + _encode_length(len(body)) + body
+
+def _read_string(data, offset):
+    length = struct.unpack_from('!H', data, offset)[0]
+    return data[offset + 2:offset + 2 + length].decode('utf-8'), offset + 2 + length
+
+class _ClientHandler(socketserver.BaseRequestHandler):
+    """Serves one client connection."""
+    
+    def setup(self):
+        self.subscriptions = set()
+        self.send_lock = threading.Lock()
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    
+    def send(self, packet):
+        with self.send_lock:
+            self.request.sendall(packet)
+    
+    def handle(self):
+        broker = self.server.broker
+        stream = self.request.makefile('rb')
+        
+        try:
+            while True:
+                header = stream.read(1)
+                if not header:
+                    break
+                
+                length, multiplier = 0, 1
+                while True:
+                    byte = stream.read(1)[0]
+                    length += (byte & 0x7F) * multiplier
+                    multiplier *= 128
+                    if not byte & 0x80:
+                        break
+                body = stream.read(length)
+                
+                packet_type, flags = header[0] >> 4, header[0] & 0x0F
+                
+                if packet_type == CONNECT:
+                    broker.add_client(self)
+                    self.send(_packet(CONNACK, 0, b'\x00\x00'))
+                elif packet_type == PUBLISH:
+                    topic, offset = _read_string(body, 0)
+                    qos = (flags >> 1) & 0x03
+                    if qos:
+                        packet_id = body[offset:offset + 2]
+                        offset += 2
+                        self.send(_packet(PUBACK, 0, packet_id))
+                    broker.route(topic, body[offset:])
+                elif packet_type == SUBSCRIBE:
+                    offset, granted = 2, bytearray()
+                    while offset < len(body):
+                        pattern, offset = _read_string(body, offset)
+                        offset += 1
+                        self.subscriptions.add(pattern)
+                        granted.append(0)
+                    self.send(_packet(SUBACK, 0, body[:2] + bytes(granted)))
+                elif packet_type == UNSUBSCRIBE:
+                    offset = 2
+                    while offset < len(body):
+                        pattern, offset = _read_string(body, offset)
+                        self.subscriptions.discard(pattern)
+                    self.send(_packet(UNSUBACK, 0, body[:2]))
+                elif packet_type == PINGREQ:
+                    self.send(_packet(PINGRESP, 0))
+                elif packet_type == DISCONNECT:
+                    break
+        except (OSError, IndexError):
+            pass
+        finally:
+            broker.remove_client(self)
+
+class StubBroker:
+    """Threaded in-process MQTT broker stand-in."""
+    
+    def __init__(self, host='127.0.0.1', port=0):
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._server = socketserver.ThreadingTCPServer((host, port), _ClientHandler)
+        self._server.daemon_threads = True
+        self._server.broker = self
+        self._clients = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.routed = 0
+    
+    @property
+    def address(self):
+        """tuple: The (host, port) the broker listens on."""
+        return self._server.server_address
+    
+    def serve_forever(self):
+        """Serve in the calling thread until stopped."""
+        self._server.serve_forever()
+    
+    def start(self):
+        """Start serving in a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, name='stub-broker',
+                                        daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        """Stop serving and close the listening socket."""
+        if self._thread is not None:
+            self._server.shutdown()
+        self._server.server_close()
+    
+    def add_client(self, client):
+        with self._lock:
+            self._clients.add(client)
+    
+    def remove_client(self, client):
+        with self._lock:
+            self._clients.discard(client)
+    
+    def route(self, topic, payload):
+        """Forward a message to every client with a matching subscription."""
+        with self._lock:
+            targets = [client for client in self._clients
+                       if any(topic_matches(pattern, topic) for pattern in client.subscriptions)]
+        
+        if not targets:
+            return
+        
+        encoded = topic.encode('utf-8')
+        packet = _packet(PUBLISH, 0, struct.pack('!H', len(encoded)) + encoded + payload)
+        for client in targets:
+            try:
+                client.send(packet)
+            except OSError:
+                self.remove_client(client)
+        self.routed += 1
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    
+    parser = argparse.ArgumentParser(description='Run a minimal local MQTT broker for testing.')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=1883, help='Port to listen on')
+    args = parser.parse_args()
+    
+    broker = StubBroker(args.host, args.port)
+    logger.info(f"Stub MQTT broker listening on {args.host}:{args.port}")
+    try:
+        broker.serve_forever()
+    except KeyboardInterrupt:
+        broker.stop()
\ No newline at end of file
@@ -0,0 +1,38 @@
+"""
+Shared helpers for the Exhaust Fan IoT System maintenance scripts.
+"""
+
+import os
+import sys
+
+# Add the parent directory to the path so we can import the backend modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from config import Config
+from database import db
+from storage import storage
+
+def create_script_app(**overrides):
+    """
+    Create a Flask app bound to the configured database, without MQTT.
+    
+    Unlike importing ``app``, this starts no MQTT subscription, ingest
+    writer or scheduler, so a script can run next to the services.
+    
+    Args:
+        **overrides: Extra config values.
+        
+    Returns:
+        Flask: The configured application.
+    """
+    app = Flask('exhaust_fan_script')
+    app.config.from_object(Config)
+    app.config.update(overrides)
+    db.init_app(app)
+    storage.init_app(app)
+    
+    # Register all models before the first query
+    import models  # noqa: F401
+    
+    return app
\ No newline at end of file
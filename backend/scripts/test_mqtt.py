@@ -15,6 +15,7 @@ import paho.mqtt.client as mqtt
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from config import Config
+from utils.payload_codec import encode_binary
 
 # Configure logging
 logging.basicConfig(
@@ -52,15 +53,18 @@ client.on_connect = on_connect
 client.on_message = on_message
 client.on_disconnect = on_disconnect
 
-def send_device_data(device_id, temperature=None, fan_status=None, auto_mode=None):
+def build_device_payload(device_id, temperature=None, fan_status=None, auto_mode=None):
     """
-    Send simulated device data to MQTT broker.
+    Build a simulated device message in the ESP32 firmware format.
     
     Args:
         device_id (str): Device ID.
         temperature (float, optional): Temperature value. If None, a random value is generated.
         fan_status (bool, optional): Fan status. If None, a random value is generated.
         auto_mode (bool, optional): Auto mode status. If None, defaults to True.
+    
+    Returns:
+        str: The JSON message.
     """
     # Generate random values if not provided
     if temperature is None:
@@ -82,15 +86,33 @@ def send_device_data(device_id, temperature=None, fan_status=None, auto_mode=Non
     }
     
     # Convert to JSON
-    message = json.dumps(payload)
+    return json.dumps(payload)
+
+def send_device_data(device_id, temperature=None, fan_status=None, auto_mode=None, binary=False):
+    """
+    Send simulated device data to MQTT broker.
     
-    # Publish to device topic
+    Args:
+        device_id (str): Device ID.
+        temperature (float, optional): Temperature value. If None, a random value is generated.
+        fan_status (bool, optional): Fan status. If None, a random value is generated.
+        auto_mode (bool, optional): Auto mode status. If None, defaults to True.
+        binary (bool): Send a binary frame, as firmware built with USE_BINARY_PAYLOAD does.
+    """
+    message = build_device_payload(device_id, temperature, fan_status, auto_mode)
     topic = f"device/{device_id}"
+    
+    if binary:
+        data = json.loads(message)
+        message = encode_binary(data["temperature"], data["fan"], data["auto"], data["timestamp"])
+        topic = f"device/{device_id}/bin"
+    
+    # Publish to device topic
     client.publish(topic, message)
     
     logger.info(f"Published to {topic}: {message}")
 
-def simulate_devices(device_ids, interval=5, duration=60):
+def simulate_devices(device_ids, interval=5, duration=60, binary=False):
     """
     Simulate multiple devices sending data at regular intervals.
     
@@ -98,6 +120,7 @@ def simulate_devices(device_ids, interval=5, duration=60):
         device_ids (list): List of device IDs to simulate.
         interval (int): Interval between messages in seconds.
         duration (int): Total duration of simulation in seconds.
+        binary (bool): Send binary frames instead of JSON.
     """
     start_time = time.time()
     end_time = start_time + duration
@@ -111,7 +134,7 @@ def simulate_devices(device_ids, interval=5, duration=60):
             fan_status = temperature > 35.0
             
             # Send data
-            send_device_data(device_id, temperature, fan_status)
+            send_device_data(device_id, temperature, fan_status, binary=binary)
         
         # Wait for the next interval
         time.sleep(interval)
@@ -129,6 +152,7 @@ if __name__ == "__main__":
     parser.add_argument('--duration', type=int, default=60, help='Duration of simulation in seconds')
     parser.add_argument('--temperature', type=float, help='Fixed temperature value (if not random)')
     parser.add_argument('--fan', type=str, choices=['on', 'off'], help='Fixed fan status (if not random)')
+    parser.add_argument('--binary', action='store_true', help='Send binary frames instead of JSON')
     
     args = parser.parse_args()
     
@@ -155,10 +179,10 @@ if __name__ == "__main__":
         if args.temperature is not None or fan_status is not None:
             # Send a single message with fixed values
             for device_id in device_ids:
-                send_device_data(device_id, args.temperature, fan_status)
+                send_device_data(device_id, args.temperature, fan_status, binary=args.binary)
         else:
             # Run continuous simulation
-            simulate_devices(device_ids, args.interval, args.duration)
+            simulate_devices(device_ids, args.interval, args.duration, args.binary)
         
         # Allow time for messages to be sent
         time.sleep(1)
@@ -7,7 +7,11 @@ from services.device_service import (
     process_device_message,
     send_fan_control,
     send_mode_control,
+    send_bulk_fan_control,
+    send_bulk_mode_control,
     get_device_status,
+    get_device_status_versioned,
     get_all_devices,
+    get_all_devices_versioned,
     update_device_info
 )
\ No newline at end of file
@@ -0,0 +1,353 @@
+"""
+Fleet sensor anomaly detection for the Exhaust Fan IoT System.
+
+The process that consumes device reports keeps the last
+``ANOMALY_WINDOW`` temperatures of every device in one NumPy array (a ring
+buffer per row). Every ``ANOMALY_INTERVAL`` the whole fleet is evaluated
+at once with array operations:
+
+- flatline: the window has not moved by more than
+  ``ANOMALY_FLATLINE_TOLERANCE`` (a frozen sensor);
+- drift: the window median is more than ``ANOMALY_DRIFT_THRESHOLD`` away
+  from the median of the devices at the same ``location``, given at least
+  ``ANOMALY_DRIFT_MIN_PEERS`` of them.
+
+The cycle also leaves each device's window median and spike limit behind,
+so every incoming reading is checked in constant time:
+
+- spike: the reading is further from the window median than both
+  ``ANOMALY_SPIKE_DELTA`` and ``ANOMALY_SPIKE_MAD`` scaled MADs;
+- range: the reading is outside what the sensors can measure (this
+  catches the 85 °C DS18B20 power-on value).
+
+Spike and range episodes last until a cycle in which the device reported
+only plausible readings.
+
+Readings are stored with the device's current anomaly kinds in
+``SensorData.anomaly``; spike and range readings are kept out of the
+device state and automation. Episodes start and end with the evaluation
+cycles and are recorded in ``SensorAnomaly``.
+"""
+
+import threading
+import time
+from datetime import datetime
+import numpy as np
+from database import db
+from models.device import Device
+from models.sensor_anomaly import SensorAnomaly
+import metrics
+
+FLATLINE = 0x01
+SPIKE = 0x02
+DRIFT = 0x04
+RANGE = 0x08
+
+KINDS = ((FLATLINE, 'flatline'), (SPIKE, 'spike'), (DRIFT, 'drift'), (RANGE, 'range'))
+
+# Kinds judged from the window, as opposed to single readings
+WINDOW_KINDS = FLATLINE | DRIFT
+IMPLAUSIBLE = SPIKE | RANGE
+
+# Scales a median absolute deviation to the standard deviation of normal data
+MAD_SCALE = 1.4826
+
+# Reading tag (comma-separated kinds) for every flag combination
+_TAGS = tuple(','.join(kind for bit, kind in KINDS if flags & bit) or None
+              for flags in range(16))
+
+_INITIAL_ROWS = 64
+
+class FleetAnomalyDetector:
+    """Sliding-window plausibility checks over the readings of all devices."""
+    
+    def __init__(self, app=None):
+        self.enabled = False
+        self.window = 30
+        self.min_samples = 10
+        self.flatline_tolerance = 0.0
+        self.spike_delta = 5.0
+        self.spike_mad = 6.0
+        self.drift_threshold = 4.0
+        self.drift_min_peers = 3
+        self.min_temperature = -40.0
+        self.max_temperature = 80.0
+        self.location_refresh = 300.0
+        self._lock = threading.Lock()
+        self._reset()
+        
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """
+        Configure the detector from the app config.
+        
+        Args:
+            app (Flask): The Flask application.
+        """
+        self.enabled = app.config['ANOMALY_ENABLED']
+        self.window = app.config['ANOMALY_WINDOW']
+        self.min_samples = min(app.config['ANOMALY_MIN_SAMPLES'], self.window)
+        self.flatline_tolerance = app.config['ANOMALY_FLATLINE_TOLERANCE']
+        self.spike_delta = app.config['ANOMALY_SPIKE_DELTA']
+        self.spike_mad = app.config['ANOMALY_SPIKE_MAD']
+        self.drift_threshold = app.config['ANOMALY_DRIFT_THRESHOLD']
+        self.drift_min_peers = app.config['ANOMALY_DRIFT_MIN_PEERS']
+        self.min_temperature = app.config['ANOMALY_MIN_TEMPERATURE']
+        self.max_temperature = app.config['ANOMALY_MAX_TEMPERATURE']
+        self.location_refresh = app.config['ANOMALY_LOCATION_REFRESH']
+        self._reset()
+    
+    def _reset(self):
+        """Allocate empty per-device state for the configured window."""
+        self._rows = {}
+        self._device_ids = []
+        self._values = np.full((_INITIAL_ROWS, self.window), np.nan)
+        # Per-device scalars stay in lists, which are cheaper to touch per reading
+        self._positions = []
+        self._evaluated_positions = []
+        self._locations = []
+        self._flags = []
+        self._reading_flags = []
+        self._reading_values = []
+        self._medians = []
+        self._spike_limits = []
+        self._locations_loaded_at = None
+        self._locations_stale = True
+        self._active = 0
+        self._loaded = False
+    
+    def active_count(self):
+        """
+        Get the number of devices with an active anomaly.
+        
+        Returns:
+            int: Devices flagged by the last evaluation cycle.
+        """
+        return self._active
+    
+    def observe(self, device_id, temperature):
+        """
+        Add a reading to its device's window and check it.
+        
+        Args:
+            device_id (str): The device ID.
+            temperature (float): The reported temperature, or None.
+        
+        Returns:
+            tuple: (tag for ``SensorData.anomaly`` or None, True if the
+            reading may update device state and drive automation).
+        """
+        if not self.enabled or temperature is None:
+            return None, True
+        
+        with self._lock:
+            row = self._rows.get(device_id)
+            if row is None:
+                row = self._add_device(device_id)
+            
+            flags = 0
+            if not self.min_temperature <= temperature <= self.max_temperature:
+                flags |= RANGE
+            # NaN medians (too few samples yet) never compare greater
+            if abs(temperature - self._medians[row]) > self._spike_limits[row]:
+                flags |= SPIKE
+            if flags:
+                self._reading_flags[row] |= flags
+                self._reading_values[row] = temperature
+            
+            position = self._positions[row]
+            self._values[row, position % self.window] = temperature
+            self._positions[row] = position + 1
+            
+            flags |= self._flags[row] & WINDOW_KINDS
+        
+        return _TAGS[flags], not flags & IMPLAUSIBLE
+    
+    def _add_device(self, device_id):
+        """Assign the next row to a device, growing the window array when full. Lock held."""
+        row = len(self._device_ids)
+        if row == len(self._values):
+            self._values = np.vstack([self._values, np.full(self._values.shape, np.nan)])
+        
+        self._rows[device_id] = row
+        self._device_ids.append(device_id)
+        self._positions.append(0)
+        self._evaluated_positions.append(0)
+        self._locations.append(-1)
+        self._flags.append(0)
+        self._reading_flags.append(0)
+        self._reading_values.append(np.nan)
+        self._medians.append(np.nan)
+        self._spike_limits.append(np.inf)
+        self._locations_stale = True
+        return row
+    
+    def detect(self, values, counts, locations):
+        """
+        Evaluate the windows of many devices at once.
+        
+        Args:
+            values (numpy.ndarray): Temperatures, one row per device, NaN
+                where the window is not filled yet.
+            counts (numpy.ndarray): Readings each device has reported.
+            locations (numpy.ndarray): Location code of each device, -1
+                for devices without a location.
+        
+        Returns:
+            dict: Per-device arrays ``flags`` (window kinds), ``enough``
+            (window has ``min_samples`` readings), ``median``,
+            ``spike_limit`` and ``offset`` (to the location median).
+        """
+        devices = len(values)
+        rows = np.arange(devices)
+        filled = np.clip(counts, 1, values.shape[1])
+        enough = counts >= self.min_samples
+        lower = (filled - 1) // 2
+        upper = filled // 2
+        
+        # NaNs sort last, so the filled part of every row comes first
+        ordered = np.sort(values, axis=1)
+        median = (ordered[rows, lower] + ordered[rows, upper]) / 2
+        spread = ordered[rows, filled - 1] - ordered[:, 0]
+        deviations = np.sort(np.abs(values - median[:, None]), axis=1)
+        mad = (deviations[rows, lower] + deviations[rows, upper]) / 2
+        
+        flags = np.where(enough & (spread <= self.flatline_tolerance), FLATLINE, 0).astype(np.uint8)
+        
+        # Compare each device to the median of its location's healthy devices
+        offset = np.full(devices, np.nan)
+        peers = enough & (flags == 0) & (locations >= 0)
+        if peers.any():
+            codes = locations[peers]
+            medians = median[peers]
+            order = np.lexsort((medians, codes))
+            codes, medians = codes[order], medians[order]
+            sizes = np.bincount(codes, minlength=locations.max() + 1)
+            starts = np.cumsum(sizes) - sizes
+            present = sizes > 0
+            centre = np.full(len(sizes), np.nan)
+            centre[present] = (medians[starts[present] + (sizes[present] - 1) // 2] +
+                               medians[starts[present] + sizes[present] // 2]) / 2
+            
+            located = locations >= 0
+            offset[located] = median[located] - centre[locations[located]]
+            group_size = np.zeros(devices, dtype=np.int64)
+            group_size[located] = sizes[locations[located]]
+            drifting = enough & (group_size >= self.drift_min_peers) & \
+                (np.abs(np.nan_to_num(offset)) > self.drift_threshold)
+            flags[drifting] |= DRIFT
+        
+        spike_limit = np.maximum(self.spike_delta, self.spike_mad * MAD_SCALE * mad)
+        median[~enough] = np.nan
+        
+        return {'flags': flags, 'enough': enough, 'median': median,
+                'spike_limit': spike_limit, 'offset': offset}
+    
+    def evaluate(self):
+        """
+        Run one evaluation cycle over the whole fleet and record the
+        anomaly episodes that started or ended.
+        
+        Must be called within an application context.
+        
+        Returns:
+            dict: Counts of ``devices``, ``opened`` and ``closed`` episodes.
+        """
+        if not self._loaded:
+            self._load_active()
+        if self._locations_stale or self._locations_loaded_at is None or \
+                time.monotonic() - self._locations_loaded_at >= self.location_refresh:
+            self._load_locations()
+        
+        with self._lock:
+            devices = len(self._device_ids)
+            device_ids = list(self._device_ids)
+            values = self._values[:devices].copy()
+            counts = np.array(self._positions, dtype=np.int64)
+            reported = counts > np.array(self._evaluated_positions, dtype=np.int64)
+            locations = np.array(self._locations, dtype=np.int64)
+            previous = np.array(self._flags, dtype=np.uint8)
+            reading_flags = np.array(self._reading_flags, dtype=np.uint8)
+            reading_values = np.array(self._reading_values)
+            self._evaluated_positions = list(self._positions)
+            self._reading_flags = [0] * devices
+        
+        started = time.perf_counter()
+        result = self.detect(values, counts, locations)
+        # Keep the window kinds of devices without enough readings to judge,
+        # and spike and range episodes open until the device reports again
+        flags = np.where(result['enough'], result['flags'], previous & WINDOW_KINDS) | \
+            np.where(reported, reading_flags, previous & IMPLAUSIBLE)
+        metrics.anomaly_evaluation_duration.observe(time.perf_counter() - started)
+        
+        with self._lock:
+            # Devices added meanwhile keep their initial state until the next cycle
+            self._flags[:devices] = flags.tolist()
+            self._medians[:devices] = result['median'].tolist()
+            self._spike_limits[:devices] = result['spike_limit'].tolist()
+            self._active = int(np.count_nonzero(flags))
+        
+        now = datetime.utcnow()
+        opened = []
+        closed = []
+        for row in np.flatnonzero(flags != previous):
+            for bit, kind in KINDS:
+                if flags[row] & bit and not previous[row] & bit:
+                    metrics.anomalies_detected.inc(kind=kind)
+                    temperature = reading_values[row] if bit & IMPLAUSIBLE else result['median'][row]
+                    offset = result['offset'][row] if bit == DRIFT else np.nan
+                    opened.append({
+                        'device_id': device_ids[row],
+                        'kind': kind,
+                        'started_at': now,
+                        'temperature': None if np.isnan(temperature) else float(temperature),
+                        'offset': None if np.isnan(offset) else round(float(offset), 2)
+                    })
+                elif previous[row] & bit and not flags[row] & bit:
+                    closed.append((device_ids[row], kind))
+        
+        SensorAnomaly.record_transitions(opened, closed, now)
+        
+        return {'devices': devices, 'opened': len(opened), 'closed': len(closed)}
+    
+    def _load_active(self):
+        """Resume the episodes still open from before this process started."""
+        episodes = SensorAnomaly.get_active()
+        bits = {kind: bit for bit, kind in KINDS}
+        with self._lock:
+            for episode in episodes:
+                row = self._rows.get(episode.device_id)
+                if row is None:
+                    row = self._add_device(episode.device_id)
+                self._flags[row] |= bits.get(episode.kind, 0)
+        self._loaded = True
+    
+    def _load_locations(self):
+        """Map every tracked device to a location code with a single query."""
+        locations = dict(db.session.query(Device.id, Device.location).all())
+        codes = {}
+        with self._lock:
+            for device_id, row in self._rows.items():
+                location = locations.get(device_id)
+                self._locations[row] = -1 if location is None else codes.setdefault(location, len(codes))
+            self._locations_stale = False
+        self._locations_loaded_at = time.monotonic()
+
+def run_anomaly_job(app):
+    """
+    Scheduler entry point for the fleet anomaly evaluation cycle.
+    
+    Args:
+        app (Flask): The Flask application.
+    """
+    with app.app_context():
+        try:
+            anomaly_detector.evaluate()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Error evaluating sensor anomalies: {str(e)}")
+
+# Process-wide anomaly detector
+anomaly_detector = FleetAnomalyDetector()
\ No newline at end of file
@@ -0,0 +1,177 @@
+"""
+Server-side fan automation for the Exhaust Fan IoT System.
+
+Every temperature reading is checked against the device's threshold and
+hysteresis band and the fan status the device reports with it, so a
+reading costs two dictionary lookups and a command is only sent when the
+fan actually has to switch. A command that was sent is remembered until the
+device reports its value, so readings in between do not repeat it.
+Re-issuing a command the device does not confirm is left to the state
+reconciler; only with reconciliation disabled does the engine send it
+again, once the command dispatcher could no longer deliver it.
+"""
+
+import threading
+import time
+from database import db
+from models.device import Device
+from services.command_service import command_dispatcher
+from services.reconcile_service import state_reconciler
+
+class AutomationEngine:
+    """Hysteresis controller for devices in auto mode."""
+    
+    def __init__(self, app=None):
+        self.enabled = False
+        self.threshold = 35.0
+        self.hysteresis = 2.0
+        self._overrides = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """
+        Configure the engine from the app config.
+        
+        Args:
+            app (Flask): The Flask application.
+        """
+        self.enabled = app.config['AUTOMATION_ENABLED']
+        self.threshold = app.config['TEMPERATURE_THRESHOLD']
+        self.hysteresis = app.config['TEMPERATURE_HYSTERESIS']
+    
+    def thresholds(self, device_id):
+        """
+        Get the threshold and hysteresis that apply to a device.
+        
+        Args:
+            device_id (str): The device ID.
+        
+        Returns:
+            tuple: (threshold, hysteresis) in degrees Celsius.
+        """
+        threshold, hysteresis = self._overrides.get(device_id, (None, None))
+        return (self.threshold if threshold is None else threshold,
+                self.hysteresis if hysteresis is None else hysteresis)
+    
+    def set_thresholds(self, device_id, threshold=None, hysteresis=None):
+        """
+        Set or clear the per-device overrides of the configured thresholds.
+        
+        Args:
+            device_id (str): The device ID.
+            threshold (float, optional): Device threshold, None for the default.
+            hysteresis (float, optional): Device hysteresis, None for the default.
+        """
+        with self._lock:
+            if threshold is None and hysteresis is None:
+                self._overrides.pop(device_id, None)
+            else:
+                self._overrides[device_id] = (threshold, hysteresis)
+    
+    def refresh_thresholds(self):
+        """
+        Reload all per-device threshold overrides with a single query.
+        
+        Must be called within an application context.
+        
+        Returns:
+            int: Number of devices with overrides.
+        """
+        rows = db.session.query(Device.id, Device.temperature_threshold,
+                                Device.temperature_hysteresis) \
+                         .filter(db.or_(Device.temperature_threshold.isnot(None),
+                                        Device.temperature_hysteresis.isnot(None))) \
+                         .all()
+        overrides = {row.id: (row.temperature_threshold, row.temperature_hysteresis)
+                     for row in rows}
+        
+        with self._lock:
+            self._overrides = overrides
+        return len(overrides)
+    
+    def evaluate(self, device_id, temperature, fan_status, auto_mode):
+        """
+        Decide whether a reading requires switching the fan.
+        
+        The reported fan status is the current state. A switch is not
+        repeated while a command for the same value is pending: while the
+        reconciler is enabled until the device reports it, otherwise until
+        the dispatcher's retries would have run out. Devices in manual mode
+        are ignored and their pending command dropped.
+        
+        Args:
+            device_id (str): The device ID.
+            temperature (float): Reported temperature.
+            fan_status (bool): Reported fan status.
+            auto_mode (bool): Reported mode.
+        
+        Returns:
+            bool: The fan state to command, or None if nothing changes.
+        """
+        if not self.enabled or temperature is None:
+            return None
+        
+        if not auto_mode:
+            with self._lock:
+                self._pending.pop(device_id, None)
+            return None
+        
+        current = bool(fan_status)
+        threshold, hysteresis = self.thresholds(device_id)
+        
+        if temperature > threshold:
+            desired = True
+        elif temperature <= threshold - hysteresis:
+            desired = False
+        else:
+            desired = current
+        
+        with self._lock:
+            if desired == current:
+                # The device reports the state it should have; nothing is pending
+                self._pending.pop(device_id, None)
+                return None
+            
+            pending = self._pending.get(device_id)
+            if pending is not None and pending[0] == desired and \
+                    (state_reconciler.enabled or pending[1] > time.monotonic()):
+                return None
+        
+        # The reconciler re-issues a command it is still waiting on
+        if state_reconciler.desired_state(device_id).get('fan') == desired:
+            return None
+        
+        return desired
+    
+    def record_command(self, device_id, fan_status):
+        """
+        Remember a fan command as pending once it has been sent.
+        
+        Args:
+            device_id (str): The device ID.
+            fan_status (bool): The commanded fan status.
+        """
+        expires_at = time.monotonic() + command_dispatcher.max_lifetime
+        with self._lock:
+            self._pending[device_id] = (fan_status, expires_at)
+
+def refresh_automation_thresholds(app):
+    """
+    Scheduler entry point reloading per-device thresholds.
+    
+    Args:
+        app (Flask): The Flask application.
+    """
+    with app.app_context():
+        try:
+            automation_engine.refresh_thresholds()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Error loading automation thresholds: {str(e)}")
+
+# Process-wide automation engine
+automation_engine = AutomationEngine()
\ No newline at end of file
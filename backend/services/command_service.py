@@ -0,0 +1,356 @@
+"""
+Outbound control command pipeline for the Exhaust Fan IoT System.
+
+Control requests are recorded in ``ControlHistory`` as pending and handed
+to a background dispatcher thread, so the caller returns as soon as the
+row is written. The dispatcher publishes each command at ``COMMAND_QOS``,
+tracks it by MQTT message ID until the broker acknowledges it (PUBACK for
+QoS 1), re-publishes with exponential backoff when the acknowledgement
+does not arrive in time, and finally marks the row delivered or failed.
+
+Commands are idempotent state changes, so a retry that duplicates a late
+original is harmless. The command ID is sent along as ``id``, which lets
+the reconciler match device reports to it.
+"""
+
+import atexit
+import heapq
+import itertools
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app
+from database import db
+from models.control_history import ControlHistory
+from mqtt_client import publish_control_command
+import metrics
+
+# Event kinds on the dispatcher queue
+_COMMAND = 'command'
+_ACK = 'ack'
+_STOP = 'stop'
+
+# What happens when a command's timer fires
+_AWAIT_ACK = 'ack'
+_PUBLISH = 'publish'
+
+class PendingCommand:
+    """A control command owned by the dispatcher until it is resolved."""
+    
+    __slots__ = ('command_id', 'device_id', 'command', 'attempts', 'mids', 'submitted_at',
+                 'due', 'action')
+    
+    def __init__(self, command_id, device_id, command):
+        self.command_id = command_id
+        self.device_id = device_id
+        self.command = command
+        self.attempts = 0
+        self.mids = []
+        self.submitted_at = time.monotonic()
+        self.due = None
+        self.action = None
+
+class CommandDispatcher:
+    """Background publisher with acknowledgement tracking and bounded retries."""
+    
+    def __init__(self, app=None):
+        self.app = None
+        self.qos = 1
+        self.ack_timeout = 5.0
+        self.max_retries = 3
+        self.retry_backoff = 1.0
+        self.queue_size = 10000
+        self._events = queue.Queue()
+        self._queued = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        # Dispatcher thread state
+        self._pending = {}
+        self._mids = {}
+        self._timers = []
+        self._sequence = itertools.count()
+        
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """
+        Configure the dispatcher from the app config and start its thread.
+        
+        Args:
+            app (Flask): The Flask application.
+        """
+        self.app = app
+        self.qos = app.config['COMMAND_QOS']
+        self.ack_timeout = app.config['COMMAND_ACK_TIMEOUT']
+        self.max_retries = app.config['COMMAND_MAX_RETRIES']
+        self.retry_backoff = app.config['COMMAND_RETRY_BACKOFF']
+        self.queue_size = app.config['COMMAND_QUEUE_SIZE']
+        
+        self._thread = threading.Thread(target=self._run, name='command-dispatcher', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+    
+    @property
+    def running(self):
+        """bool: Whether the dispatcher thread is active."""
+        return self._thread is not None and self._thread.is_alive()
+    
+    @property
+    def max_lifetime(self):
+        """float: Longest time in seconds a command can stay pending."""
+        backoff = sum(self._backoff(attempt) for attempt in range(1, self.max_retries + 1))
+        return (self.max_retries + 1) * self.ack_timeout + backoff
+    
+    def in_flight(self):
+        """
+        Get the number of commands queued or awaiting acknowledgement.
+        
+        Returns:
+            int: Commands not yet delivered or failed.
+        """
+        return self._queued
+    
+    def submit(self, device_id, command, command_type, command_value, source):
+        """
+        Record a control command as pending and queue it for publishing.
+        
+        Args:
+            device_id (str): The device ID.
+            command (dict): The command payload.
+            command_type (str): Control history command type.
+            command_value (str): Control history command value.
+            source (str): Source of the command.
+        
+        Returns:
+            str: The command ID, or None if the command was not accepted.
+        """
+        return self.submit_many([device_id], command, command_type, command_value, source)[device_id]
+    
+    def submit_many(self, device_ids, command, command_type, command_value, source):
+        """
+        Record the same command for many devices and queue them for publishing.
+        
+        The control history rows are written with a single commit.
+        
+        Args:
+            device_ids (list): The device IDs.
+            command (dict): The command payload.
+            command_type (str): Control history command type.
+            command_value (str): Control history command value.
+            source (str): Source of the command.
+        
+        Returns:
+            dict: Mapping of device ID to its command ID, or None for
+            devices whose command was not accepted.
+        """
+        results = dict.fromkeys(device_ids)
+        
+        if not self.running:
+            current_app.logger.error('Command dispatcher is not running, dropping control commands')
+            return results
+        
+        with self._lock:
+            accepted = list(device_ids)[:max(self.queue_size - self._queued, 0)]
+            self._queued += len(accepted)
+        
+        if len(accepted) < len(device_ids):
+            current_app.logger.warning(
+                f"Command queue full, rejected {len(device_ids) - len(accepted)} {command_type} commands",
+                extra={'sample_key': 'command-queue-full'}
+            )
+        
+        commands = []
+        for device_id in accepted:
+            command_id = uuid.uuid4().hex
+            commands.append(PendingCommand(command_id, device_id, dict(command, id=command_id)))
+        
+        try:
+            ControlHistory.add_control_records([
+                {
+                    'command_id': pending.command_id,
+                    'device_id': pending.device_id,
+                    'command_type': command_type,
+                    'command_value': command_value,
+                    'source': source,
+                    'status': 'pending',
+                    'attempts': 0
+                }
+                for pending in commands
+            ])
+        except Exception:
+            db.session.rollback()
+            with self._lock:
+                self._queued -= len(accepted)
+            raise
+        
+        for pending in commands:
+            self._events.put((_COMMAND, pending))
+            results[pending.device_id] = pending.command_id
+        
+        return results
+    
+    def acknowledge(self, mid):
+        """
+        Report a completed publish; called from the MQTT network thread.
+        
+        Args:
+            mid (int): The MQTT message ID.
+        """
+        self._events.put((_ACK, mid))
+    
+    def stop(self, timeout=5.0):
+        """
+        Stop the dispatcher thread. Unresolved commands stay pending.
+        
+        Args:
+            timeout (float): Maximum seconds to wait for the thread.
+        """
+        if self.running:
+            self._events.put((_STOP, None))
+            self._thread.join(timeout)
+    
+    def _backoff(self, attempt):
+        return self.retry_backoff * 2 ** (attempt - 1)
+    
+    def _run(self):
+        """Dispatcher loop: publish, match acknowledgements and fire timers."""
+        while True:
+            timeout = max(self._timers[0][0] - time.monotonic(), 0) if self._timers else None
+            try:
+                events = [self._events.get(timeout=timeout)]
+            except queue.Empty:
+                events = []
+            
+            # Handle everything that arrived together in one pass
+            while True:
+                try:
+                    events.append(self._events.get_nowait())
+                except queue.Empty:
+                    break
+            
+            updates = []
+            stopping = False
+            with self.app.app_context():
+                for kind, value in events:
+                    if kind == _COMMAND:
+                        self._pending[value.command_id] = value
+                        self._publish(value, updates)
+                    elif kind == _ACK:
+                        pending = self._mids.get(value)
+                        if pending is not None:
+                            self._resolve(pending, 'delivered', updates)
+                    else:
+                        stopping = True
+                
+                self._fire_timers(updates)
+                
+                if updates:
+                    self._write(updates)
+            
+            if stopping:
+                break
+    
+    def _publish(self, pending, updates):
+        """Publish one attempt of a command and start its acknowledgement timer."""
+        pending.attempts += 1
+        if pending.attempts > 1:
+            metrics.command_retries.inc()
+        
+        try:
+            success, mid = publish_control_command(pending.device_id, pending.command, self.qos)
+        except Exception as e:
+            success, mid = False, None
+            self.app.logger.error(f"Error publishing command {pending.command_id}: {str(e)}")
+        
+        if mid is not None:
+            # The client may still deliver a message it could not send yet
+            pending.mids.append(mid)
+            self._mids[mid] = pending
+        
+        if success:
+            self._schedule(pending, self.ack_timeout, _AWAIT_ACK)
+        else:
+            self._retry_or_fail(pending, updates)
+    
+    def _retry_or_fail(self, pending, updates):
+        if pending.attempts > self.max_retries:
+            self._resolve(pending, 'failed', updates)
+        else:
+            self._schedule(pending, self._backoff(pending.attempts), _PUBLISH)
+    
+    def _schedule(self, pending, delay, action):
+        pending.due = time.monotonic() + delay
+        pending.action = action
+        heapq.heappush(self._timers, (pending.due, next(self._sequence), pending))
+    
+    def _fire_timers(self, updates):
+        now = time.monotonic()
+        while self._timers and self._timers[0][0] <= now:
+            due, _, pending = heapq.heappop(self._timers)
+            # Skip timers superseded by a later schedule or a resolution
+            if pending.command_id not in self._pending or pending.due != due:
+                continue
+            
+            if pending.action == _PUBLISH:
+                self._publish(pending, updates)
+            else:
+                self._retry_or_fail(pending, updates)
+    
+    def _resolve(self, pending, status, updates):
+        self._pending.pop(pending.command_id, None)
+        for mid in pending.mids:
+            if self._mids.get(mid) is pending:
+                del self._mids[mid]
+        pending.due = None
+        with self._lock:
+            self._queued -= 1
+        
+        metrics.command_results.inc(status=status)
+        if status == 'delivered':
+            metrics.command_delivery_duration.observe(time.monotonic() - pending.submitted_at)
+        else:
+            self.app.logger.warning(
+                f"Control command {pending.command_id} to {pending.device_id} failed "
+                f"after {pending.attempts} attempts",
+                extra={'sample_key': f'command-failed:{pending.device_id}', 'device_id': pending.device_id}
+            )
+        
+        updates.append({
+            'command_id': pending.command_id,
+            'status': status,
+            'attempts': pending.attempts,
+            'completed_at': datetime.utcnow()
+        })
+    
+    def _write(self, updates):
+        try:
+            ControlHistory.update_command_status(updates)
+        except Exception as e:
+            db.session.rollback()
+            self.app.logger.error(f"Error recording status of {len(updates)} commands: {str(e)}")
+        finally:
+            db.session.remove()
+
+def run_stale_command_job(app):
+    """
+    Scheduler entry point failing commands left pending by a process that
+    exited before resolving them.
+    
+    Args:
+        app (Flask): The Flask application.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=2 * command_dispatcher.max_lifetime)
+    with app.app_context():
+        try:
+            failed = ControlHistory.fail_stale_commands(cutoff)
+            if failed:
+                app.logger.warning(f"Marked {failed} stale pending control commands as failed")
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Error failing stale control commands: {str(e)}")
+
+# Process-wide command dispatcher
+command_dispatcher = CommandDispatcher()
\ No newline at end of file
@@ -0,0 +1,138 @@
+"""
+Event time and duplicate detection for device readings.
+
+Devices with a synchronized clock send ``timestamp`` in milliseconds since
+the epoch. Within ``INGEST_MAX_LATENESS`` and ``INGEST_MAX_CLOCK_SKEW`` of
+the receive time it becomes the reading's time and, together with the
+device ID, its identity: QoS redeliveries and reconnect bursts repeat the
+same key. Other timestamps (firmware uptime counters, unsynchronized
+clocks) are not trusted and the receive time is used as before.
+
+Keys ingested recently are kept in memory, so a duplicate costs a set
+lookup. The window cannot vouch for readings older than what it has
+forgotten (or than the process itself); those are marked ``unverified``
+and checked against the unique index by the ingest writer. The window also
+tracks the newest event time of each device so late or out-of-order
+readings are stored without overwriting newer device state.
+"""
+
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+# Smallest epoch value in milliseconds (September 2001); uptime counters stay below it
+_EPOCH_MS_MIN = 10 ** 12
+
+class EventWindow:
+    """Recently ingested reading keys and the latest event time per device."""
+    
+    def __init__(self, app=None):
+        self.window = 600.0
+        self.max_keys = 100000
+        self.max_lateness = timedelta(days=1)
+        self.max_clock_skew = timedelta(seconds=60)
+        self._keys = {}
+        self._arrivals = deque()
+        self._latest = {}
+        self._covered_since = datetime.utcnow() + self.max_clock_skew
+        self._lock = threading.Lock()
+        
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """
+        Configure the window from the app config.
+        
+        Args:
+            app (Flask): The Flask application.
+        """
+        self.window = app.config['INGEST_DEDUP_WINDOW']
+        self.max_keys = app.config['INGEST_DEDUP_MAX_KEYS']
+        self.max_lateness = timedelta(seconds=app.config['INGEST_MAX_LATENESS'])
+        self.max_clock_skew = timedelta(seconds=app.config['INGEST_MAX_CLOCK_SKEW'])
+        # Readings ingested before this process started are unknown to it
+        self._covered_since = datetime.utcnow() + self.max_clock_skew
+    
+    def event_time(self, device_timestamp, received_at):
+        """
+        Resolve the event time of a reading.
+        
+        Args:
+            device_timestamp: The ``timestamp`` value the device sent.
+            received_at (datetime): Time the reading was received.
+        
+        Returns:
+            tuple: (device timestamp in ms, or None if it is not a usable
+            epoch time; event time as a naive UTC datetime).
+        """
+        if isinstance(device_timestamp, bool) or not isinstance(device_timestamp, (int, float)) or \
+                device_timestamp < _EPOCH_MS_MIN:
+            return None, received_at
+        
+        device_timestamp = int(device_timestamp)
+        event_at = datetime(1970, 1, 1) + timedelta(milliseconds=device_timestamp)
+        if not received_at - self.max_lateness <= event_at <= received_at + self.max_clock_skew:
+            return None, received_at
+        
+        return device_timestamp, event_at
+    
+    def admit(self, device_id, device_timestamp, event_at):
+        """
+        Record a reading's key and check whether it was already ingested.
+        
+        Args:
+            device_id (str): The device ID.
+            device_timestamp (int): Device timestamp in ms, or None.
+            event_at (datetime): Event time of the reading.
+        
+        Returns:
+            tuple: (True if the reading is a known duplicate, True if it is
+            older than what the window can vouch for and must be checked
+            against the database).
+        """
+        if device_timestamp is None:
+            return False, False
+        
+        key = (device_id, device_timestamp)
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            if key in self._keys:
+                return True, False
+            
+            self._keys[key] = event_at
+            self._arrivals.append((now, key))
+            return False, event_at <= self._covered_since
+    
+    def is_current(self, device_id, event_at):
+        """
+        Check whether a reading is the newest of its device and record it.
+        
+        Args:
+            device_id (str): The device ID.
+            event_at (datetime): Event time of the reading.
+        
+        Returns:
+            bool: False if a newer reading of the device was already seen.
+        """
+        with self._lock:
+            latest = self._latest.get(device_id)
+            if latest is not None and event_at < latest:
+                return False
+            self._latest[device_id] = event_at
+            return True
+    
+    def _expire(self, now):
+        """Forget keys past the window or over the size limit."""
+        horizon = now - self.window
+        while self._arrivals and (self._arrivals[0][0] < horizon or len(self._arrivals) > self.max_keys):
+            _, key = self._arrivals.popleft()
+            event_at = self._keys.pop(key)
+            # Anything at or before a forgotten event time may be a duplicate
+            if event_at > self._covered_since:
+                self._covered_since = event_at
+
+# Process-wide event window
+event_window = EventWindow()
\ No newline at end of file
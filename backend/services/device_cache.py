@@ -0,0 +1,322 @@
+"""
+In-memory device state cache for the Exhaust Fan IoT System.
+
+Reads of device rows are served from memory and refreshed from the
+database after a short TTL. In the process that ingests device messages,
+state updates (temperature, fan, mode, last seen) are applied to the cache
+and written back to the ``devices`` table in periodic batches.
+
+Every change to a cached device bumps a version number, so callers can
+reuse anything they derived from an unchanged device.
+"""
+
+import threading
+import time
+from datetime import datetime
+from models.device import Device
+
+# Columns owned by device reports and written back by the cache
+STATE_FIELDS = ('last_temperature', 'fan_status', 'auto_mode', 'last_seen')
+
+def _row_to_entry(device):
+    """Copy the column values of a Device row into a plain dict."""
+    return {column.name: getattr(device, column.name) for column in Device.__table__.columns}
+
+def _serialize(entry):
+    """Convert a cache entry to the same shape as ``Device.to_dict``."""
+    return {
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in entry.items()
+    }
+
+class DeviceStateCache:
+    """Process-wide cache of device rows keyed by device ID."""
+    
+    def __init__(self, app=None):
+        self.ttl = 5.0
+        self.flush_interval = 10.0
+        self._entries = {}
+        self._loaded_at = {}
+        self._all_loaded_at = 0.0
+        self._dirty = {}
+        self._owned = set()
+        self._last_flush = time.monotonic()
+        self._versions = {}
+        self._version = 0
+        self._lock = threading.RLock()
+        
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """
+        Configure the cache from the app config.
+        
+        Args:
+            app (Flask): The Flask application.
+        """
+        self.ttl = app.config['DEVICE_CACHE_TTL']
+        self.flush_interval = app.config['DEVICE_CACHE_FLUSH_INTERVAL']
+    
+    def get(self, device_id):
+        """
+        Get a device from the cache, loading it from the database if needed.
+        
+        Args:
+            device_id (str): The device ID.
+        
+        Returns:
+            dict: Device information or None if device not found.
+        """
+        return self.get_versioned(device_id)[1]
+    
+    def get_versioned(self, device_id):
+        """
+        Get a device together with the version of its cached state.
+        
+        Args:
+            device_id (str): The device ID.
+        
+        Returns:
+            tuple: (version, device information), both None if the device
+            is not found.
+        """
+        with self._lock:
+            entry = self._entries.get(device_id)
+            if entry is not None and self._is_fresh(device_id):
+                return self._versions[device_id], _serialize(entry)
+        
+        device = Device.query.get(device_id)
+        if not device:
+            return None, None
+        
+        with self._lock:
+            entry = self._store(device)
+            return self._versions[device_id], _serialize(entry)
+    
+    def get_all(self):
+        """
+        Get all devices, reloading the full list once it is older than the TTL.
+        
+        Returns:
+            list: List of devices as dictionaries.
+        """
+        return self.get_all_versioned()[1]
+    
+    def get_all_versioned(self):
+        """
+        Get all devices together with the version of the whole cache.
+        
+        Returns:
+            tuple: (version, list of devices as dictionaries).
+        """
+        with self._lock:
+            if time.monotonic() - self._all_loaded_at < self.ttl:
+                return self._version, [_serialize(entry) for entry in self._entries.values()]
+        
+        devices = Device.query.all()
+        
+        with self._lock:
+            seen = set()
+            for device in devices:
+                self._store(device)
+                seen.add(device.id)
+            # Drop devices deleted elsewhere, keeping ones not written yet
+            for device_id in list(self._entries):
+                if device_id not in seen and device_id not in self._dirty:
+                    self._forget(device_id)
+            self._all_loaded_at = time.monotonic()
+            return self._version, [_serialize(entry) for entry in self._entries.values()]
+    
+    def apply_reading(self, device_id, temperature=None, fan_status=None, auto_mode=None,
+                      seen_at=None):
+        """
+        Apply a device report to the cached state and mark it for write-back.
+        
+        Devices that are not in the database yet are created in memory and
+        inserted on the next flush.
+        
+        Args:
+            device_id (str): The device ID.
+            temperature (float, optional): Reported temperature.
+            fan_status (bool, optional): Reported fan status.
+            auto_mode (bool, optional): Reported mode.
+            seen_at (datetime, optional): Time the report was received.
+        
+        Returns:
+            dict: The merged device state (raw column values).
+        """
+        seen_at = seen_at or datetime.utcnow()
+        device = None
+        
+        with self._lock:
+            known = device_id in self._entries
+        
+        if not known:
+            device = Device.query.get(device_id)
+        
+        with self._lock:
+            entry = self._entries.get(device_id)
+            if entry is None:
+                if device is not None:
+                    entry = self._store(device)
+                else:
+                    entry = self._store_new(device_id, seen_at)
+            
+            changes = {'last_seen': seen_at}
+            if temperature is not None:
+                changes['last_temperature'] = temperature
+            if fan_status is not None:
+                changes['fan_status'] = fan_status
+            if auto_mode is not None:
+                changes['auto_mode'] = auto_mode
+            
+            entry.update(changes)
+            entry['updated_at'] = seen_at
+            self._bump(device_id)
+            self._dirty.setdefault(device_id, {}).update(changes)
+            self._owned.add(device_id)
+            return dict(entry)
+    
+    def pending_count(self):
+        """
+        Get the number of devices with state waiting to be written back.
+        
+        Returns:
+            int: Number of dirty devices.
+        """
+        return len(self._dirty)
+    
+    def invalidate(self, device_id=None):
+        """
+        Drop cached descriptive data so it is reloaded on the next read.
+        
+        Reported state that has not been written back yet is kept.
+        
+        Args:
+            device_id (str, optional): The device to invalidate, or None for all.
+        """
+        with self._lock:
+            device_ids = [device_id] if device_id is not None else list(self._entries)
+            for key in device_ids:
+                if key in self._owned:
+                    self._loaded_at[key] = 0.0
+                else:
+                    self._forget(key)
+            self._all_loaded_at = 0.0
+    
+    def take_changes(self, force=False):
+        """
+        Take the pending state changes that are due to be written back.
+        
+        Changes are due when the flush interval has elapsed, when new
+        devices are waiting to be inserted, or when forced. The caller
+        writes them with ``write_changes`` and must hand them back to
+        ``restore_changes`` if its transaction is rolled back.
+        
+        Args:
+            force (bool): Take the changes regardless of the interval.
+        
+        Returns:
+            dict: Pending column values by device ID, empty if none are due.
+        """
+        with self._lock:
+            if not self._dirty:
+                return {}
+            has_new = any('name' in values for values in self._dirty.values())
+            if not (force or has_new or
+                    time.monotonic() - self._last_flush >= self.flush_interval):
+                return {}
+            changes = self._dirty
+            self._dirty = {}
+            self._last_flush = time.monotonic()
+        
+        return changes
+    
+    def write_changes(self, changes):
+        """
+        Add state changes to the ``devices`` table in the current transaction.
+        
+        Must be called within an application context. The caller is
+        responsible for committing the session, so the device rows share a
+        transaction with the readings that produced them.
+        
+        Args:
+            changes (dict): Changes as returned by ``take_changes``.
+        
+        Returns:
+            int: Number of devices written.
+        """
+        if not changes:
+            return 0
+        
+        existing_ids = {key for key, values in changes.items() if 'name' not in values}
+        Device.bulk_upsert(
+            {key: {field: values[field] for field in STATE_FIELDS if field in values}
+             for key, values in changes.items()},
+            existing_ids=existing_ids
+        )
+        return len(changes)
+    
+    def restore_changes(self, changes):
+        """
+        Put back changes whose transaction was rolled back.
+        
+        Args:
+            changes (dict): Changes as returned by ``take_changes``.
+        """
+        # Newer changes to the same device win
+        with self._lock:
+            for key, values in changes.items():
+                merged = dict(values)
+                merged.update(self._dirty.get(key, {}))
+                self._dirty[key] = merged
+    
+    def _bump(self, device_id):
+        """Give a device (and the cache as a whole) a new version."""
+        self._version += 1
+        self._versions[device_id] = self._version
+    
+    def _is_fresh(self, device_id):
+        return time.monotonic() - self._loaded_at.get(device_id, 0.0) < self.ttl
+    
+    def _store(self, device):
+        """Cache a Device row, keeping locally owned state fields."""
+        entry = _row_to_entry(device)
+        current = self._entries.get(device.id)
+        if current is not None and device.id in self._owned:
+            for field in STATE_FIELDS:
+                entry[field] = current[field]
+        if entry != current:
+            self._bump(device.id)
+        self._entries[device.id] = entry
+        self._loaded_at[device.id] = time.monotonic()
+        return entry
+    
+    def _store_new(self, device_id, seen_at):
+        """Cache a device that only exists in memory until the next flush."""
+        entry = {column.name: None for column in Device.__table__.columns}
+        entry.update({
+            'id': device_id,
+            'name': Device.default_name(device_id),
+            'location': 'Unknown',
+            'fan_status': False,
+            'auto_mode': True,
+            'created_at': seen_at,
+            'updated_at': seen_at
+        })
+        self._entries[device_id] = entry
+        self._loaded_at[device_id] = time.monotonic()
+        self._bump(device_id)
+        # A 'name' key marks the pending write as an insert
+        self._dirty[device_id] = {'name': entry['name']}
+        return entry
+    
+    def _forget(self, device_id):
+        if self._entries.pop(device_id, None) is not None:
+            self._version += 1
+        self._loaded_at.pop(device_id, None)
+        self._versions.pop(device_id, None)
+
+# Process-wide device state cache
+device_cache = DeviceStateCache()
@@ -2,14 +2,26 @@
 Device service for the Exhaust Fan IoT System.
 """
 
-import json
+import math
 from datetime import datetime
 from flask import current_app
 from database import db
 from models.device import Device
-from models.sensor_data import SensorData
-from models.control_history import ControlHistory
-from mqtt_client import publish_control_command
+from services.command_service import command_dispatcher
+from services.ingest_service import ingest_buffer
+from services.device_cache import device_cache
+from services.automation_service import automation_engine
+from services.telemetry_service import telemetry_hub
+from services.reconcile_service import state_reconciler
+from services.dedup_service import event_window
+from services.anomaly_service import anomaly_detector
+from services.liveness_service import liveness_tracker
+from utils.payload_codec import decode_device_message
+import metrics
+
+def _valid_temperature(value):
+    """Check that a reported temperature is a finite number."""
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
 
 def process_device_message(message):
     """
@@ -21,65 +33,128 @@ def process_device_message(message):
     Returns:
         bool: True if message was processed successfully, False otherwise.
     """
+    metrics.messages_received.inc()
+    
     try:
         # Extract topic and payload
         topic = message.topic
-        payload = message.payload.decode('utf-8')
         
-        # Parse the payload as JSON
-        data = json.loads(payload)
+        try:
+            # Decode the payload as JSON or a binary frame
+            device_id, data, encoding = decode_device_message(topic, message.payload)
+        except ValueError as e:
+            metrics.messages_rejected.inc(reason='invalid')
+            current_app.logger.warning(f"Invalid device message on {topic}: {str(e)}",
+                                       extra={'sample_key': f'invalid:{topic}', 'topic': topic})
+            return False
         
-        # Extract device_id from topic or data
-        if 'device_id' in data:
-            device_id = data['device_id']
-        else:
-            # Extract from topic (format should be 'device/{device_id}')
-            device_id = topic.split('/')[-1]
+        # A reading the writer cannot store would fail its whole batch
+        if 'temperature' in data and not _valid_temperature(data['temperature']):
+            metrics.messages_rejected.inc(reason='invalid')
+            current_app.logger.warning(f"Invalid temperature from device {device_id}: {data['temperature']!r}",
+                                       extra={'sample_key': f'invalid:{topic}', 'topic': topic})
+            return False
         
-        # Get or create device in database
-        device = Device.get_or_create(device_id)
+        metrics.messages_parsed.inc(encoding=encoding)
         
-        # Update device status
-        if 'temperature' in data:
-            device.last_temperature = data['temperature']
-        if 'fan' in data:
-            device.fan_status = data['fan']
-        if 'auto' in data:
-            device.auto_mode = data['auto']
+        # Stamp the reading with the device clock when it can be trusted
+        received_at = datetime.utcnow()
+        device_timestamp, event_at = event_window.event_time(data.get('timestamp'), received_at)
+        
+        # Drop redeliveries of readings already ingested
+        duplicate, unverified = event_window.admit(device_id, device_timestamp, event_at)
+        if duplicate:
+            metrics.messages_rejected.inc(reason='duplicate')
+            return True
+        
+        # Any message, late or not, shows the device is alive now
+        liveness_tracker.observe(device_id, received_at)
         
-        # Update last seen timestamp
-        device.last_seen = datetime.utcnow()
+        # A late reading is stored but must not overwrite newer device state
+        current = event_window.is_current(device_id, event_at)
+        report = data if current else {}
         
-        # Save device changes
-        db.session.commit()
+        # Check the reading against its device's recent window; implausible
+        # values are stored tagged but kept out of device state and automation
+        anomaly, plausible = anomaly_detector.observe(device_id, report.get('temperature'))
         
-        # Add sensor data record
+        # Update cached device state; it is written back in batches
+        state = device_cache.apply_reading(
+            device_id,
+            temperature=report.get('temperature') if plausible else None,
+            fan_status=report.get('fan'),
+            auto_mode=report.get('auto'),
+            seen_at=received_at
+        )
+        
+        if current:
+            # Confirm pending commands the reported state satisfies
+            state_reconciler.observe(device_id, data)
+        else:
+            metrics.messages_late.inc()
+        
+        # Queue the sensor data record for the next flush window
         if 'temperature' in data:
-            SensorData.add_sensor_reading(
-                device_id=device_id,
-                temperature=data['temperature'],
-                fan_status=data.get('fan', device.fan_status),
-                auto_mode=data.get('auto', device.auto_mode)
-            )
+            reading = {
+                'device_id': device_id,
+                'temperature': data['temperature'],
+                'fan_status': data['fan'] if data.get('fan') is not None else state['fan_status'],
+                'auto_mode': data['auto'] if data.get('auto') is not None else state['auto_mode'],
+                'timestamp': event_at,
+                'device_timestamp': device_timestamp,
+                'anomaly': anomaly
+            }
+            if unverified:
+                reading['unverified'] = True
+            
+            accepted = ingest_buffer.submit(reading)
+            
+            if not accepted:
+                metrics.messages_rejected.inc(reason='queue_full')
+                return False
+            
+            # Switch the fan when the reading crosses the hysteresis band
+            if current and plausible:
+                fan_command = automation_engine.evaluate(
+                    device_id, data['temperature'], state['fan_status'], state['auto_mode']
+                )
+                if fan_command is not None and send_fan_control(device_id, fan_command, source='auto'):
+                    automation_engine.record_command(device_id, fan_command)
+        
+        if not current:
+            return True
+        
+        # Push the new state to live telemetry subscribers
+        telemetry_hub.publish({
+            'device_id': device_id,
+            'temperature': state['last_temperature'],
+            'fan_status': state['fan_status'],
+            'auto_mode': state['auto_mode'],
+            'timestamp': event_at.isoformat()
+        })
         
-        current_app.logger.info(f"Processed device message from {device_id}")
         return True
         
     except Exception as e:
-        current_app.logger.error(f"Error processing device message: {str(e)}")
+        metrics.messages_rejected.inc(reason='error')
+        current_app.logger.error(f"Error processing device message: {str(e)}",
+                                 extra={'sample_key': 'device-message-error'})
         return False
 
 def send_fan_control(device_id, fan_status, source="app"):
     """
     Send a fan control command to a device.
     
+    The command is recorded as pending and published in the background;
+    its control history row is updated once it is delivered or fails.
+    
     Args:
         device_id (str): The device ID.
         fan_status (bool): The desired fan status (True = ON, False = OFF).
         source (str): Source of the command (default: "app").
-        
+    
     Returns:
-        bool: True if command was sent successfully, False otherwise.
+        str: ID of the queued command, or None if it could not be queued.
     """
     try:
         # Create command
@@ -87,37 +162,39 @@ def send_fan_control(device_id, fan_status, source="app"):
             "fan": fan_status
         }
         
-        # Publish command to device
-        success = publish_control_command(device_id, command)
+        # Automation commands must not switch the device to manual mode
+        if source == "auto":
+            command["source"] = source
         
-        if success:
-            # Record command in control history
-            ControlHistory.add_control_record(
-                device_id=device_id,
-                command_type="fan_control",
-                command_value="on" if fan_status else "off",
-                source=source
-            )
-            
-            current_app.logger.info(f"Fan control command sent to {device_id}: {'ON' if fan_status else 'OFF'}")
+        # Record the command and queue it for publishing
+        command_id = command_dispatcher.submit(device_id, command, "fan_control",
+                                               "on" if fan_status else "off", source)
         
-        return success
+        if command_id:
+            current_app.logger.info(
+                f"Fan control command {command_id} queued for {device_id}: {'ON' if fan_status else 'OFF'}"
+            )
         
+        return command_id
+    
     except Exception as e:
         current_app.logger.error(f"Error sending fan control command: {str(e)}")
-        return False
+        return None
 
 def send_mode_control(device_id, auto_mode, source="app"):
     """
     Send a mode control command to a device.
     
+    The command is recorded as pending and published in the background;
+    its control history row is updated once it is delivered or fails.
+    
     Args:
         device_id (str): The device ID.
         auto_mode (bool): The desired mode (True = AUTO, False = MANUAL).
         source (str): Source of the command (default: "app").
-        
+    
     Returns:
-        bool: True if command was sent successfully, False otherwise.
+        str: ID of the queued command, or None if it could not be queued.
     """
     try:
         # Create command
@@ -125,25 +202,106 @@ def send_mode_control(device_id, auto_mode, source="app"):
             "auto": auto_mode
         }
         
-        # Publish command to device
-        success = publish_control_command(device_id, command)
+        # Record the command and queue it for publishing
+        command_id = command_dispatcher.submit(device_id, command, "mode_change",
+                                               "auto" if auto_mode else "manual", source)
         
-        if success:
-            # Record command in control history
-            ControlHistory.add_control_record(
-                device_id=device_id,
-                command_type="mode_change",
-                command_value="auto" if auto_mode else "manual",
-                source=source
+        if command_id:
+            current_app.logger.info(
+                f"Mode control command {command_id} queued for {device_id}: {'AUTO' if auto_mode else 'MANUAL'}"
             )
-            
-            current_app.logger.info(f"Mode control command sent to {device_id}: {'AUTO' if auto_mode else 'MANUAL'}")
-        
-        return success
         
+        return command_id
+    
     except Exception as e:
         current_app.logger.error(f"Error sending mode control command: {str(e)}")
-        return False
+        return None
+
+def send_bulk_control(device_ids, command, command_type, command_value, source="app"):
+    """
+    Send the same control command to many devices.
+    
+    The commands are recorded in control history as pending with a single
+    commit and published in the background.
+    
+    Args:
+        device_ids (list): The device IDs.
+        command (dict): The command to send to each device.
+        command_type (str): Control history command type.
+        command_value (str): Control history command value.
+        source (str): Source of the command (default: "app").
+    
+    Returns:
+        dict: Mapping of device ID to its command ID, or None if the command
+        could not be queued.
+    """
+    try:
+        results = command_dispatcher.submit_many(device_ids, command, command_type, command_value, source)
+    except Exception as e:
+        current_app.logger.error(f"Error recording bulk control commands: {str(e)}")
+        results = dict.fromkeys(device_ids)
+    
+    queued = sum(1 for command_id in results.values() if command_id)
+    current_app.logger.info(
+        f"Bulk {command_type} command '{command_value}' queued for {queued} of {len(device_ids)} devices"
+    )
+    return results
+
+def send_bulk_fan_control(device_ids, fan_status, source="app"):
+    """
+    Send a fan control command to many devices.
+    
+    Args:
+        device_ids (list): The device IDs.
+        fan_status (bool): The desired fan status (True = ON, False = OFF).
+        source (str): Source of the command (default: "app").
+    
+    Returns:
+        dict: Mapping of device ID to its command ID, or None if the command
+        could not be queued.
+    """
+    return send_bulk_control(device_ids, {"fan": fan_status}, "fan_control",
+                             "on" if fan_status else "off", source)
+
+def send_bulk_mode_control(device_ids, auto_mode, source="app"):
+    """
+    Send a mode control command to many devices.
+    
+    Args:
+        device_ids (list): The device IDs.
+        auto_mode (bool): The desired mode (True = AUTO, False = MANUAL).
+        source (str): Source of the command (default: "app").
+    
+    Returns:
+        dict: Mapping of device ID to its command ID, or None if the command
+        could not be queued.
+    """
+    return send_bulk_control(device_ids, {"auto": auto_mode}, "mode_change",
+                             "auto" if auto_mode else "manual", source)
+
+def resolve_device_targets(device_ids=None, location=None):
+    """
+    Resolve a bulk control target to registered device IDs.
+    
+    Args:
+        device_ids (list, optional): Explicit device IDs.
+        location (str, optional): Select all devices at this location.
+    
+    Returns:
+        tuple: (list of registered device IDs, list of unknown device IDs).
+        All devices are selected when neither argument is given.
+    """
+    devices = get_all_devices()
+    
+    if device_ids is not None:
+        known = {device['id'] for device in devices}
+        return ([device_id for device_id in device_ids if device_id in known],
+                [device_id for device_id in device_ids if device_id not in known])
+    
+    if location is not None:
+        return [device['id'] for device in devices if device['location'] == location], []
+    
+    return [device['id'] for device in devices], []
 
 def get_device_status(device_id):
     """
@@ -155,12 +313,19 @@ def get_device_status(device_id):
     Returns:
         dict: Device status information or None if device not found.
     """
-    device = Device.query.get(device_id)
+    return device_cache.get(device_id)
+
+def get_device_status_versioned(device_id):
+    """
+    Get the current status of a device and the version of that state.
     
-    if not device:
-        return None
+    Args:
+        device_id (str): The device ID.
     
-    return device.to_dict()
+    Returns:
+        tuple: (version, device status), both None if device not found.
+    """
+    return device_cache.get_versioned(device_id)
 
 def get_all_devices():
     """
@@ -169,10 +334,18 @@ def get_all_devices():
     Returns:
         list: List of devices as dictionaries.
     """
-    devices = Device.query.all()
-    return [device.to_dict() for device in devices]
+    return device_cache.get_all()
+
+def get_all_devices_versioned():
+    """
+    Get all registered devices and the version of the device list.
+    
+    Returns:
+        tuple: (version, list of devices as dictionaries).
+    """
+    return device_cache.get_all_versioned()
 
-def update_device_info(device_id, name=None, location=None):
+def update_device_info(device_id, name=None, location=None, overrides=None):
     """
     Update device information.
     
@@ -180,7 +353,10 @@ def update_device_info(device_id, name=None, location=None):
         device_id (str): The device ID.
         name (str, optional): New device name.
         location (str, optional): New device location.
-        
+        overrides (dict, optional): New ``temperature_threshold``,
+            ``temperature_hysteresis`` and/or ``fan_power`` values; None
+            clears an override.
+    
     Returns:
         dict: Updated device information or None if device not found.
     """
@@ -195,6 +371,16 @@ def update_device_info(device_id, name=None, location=None):
     if location is not None:
         device.location = location
     
+    for field, value in (overrides or {}).items():
+        setattr(device, field, value)
+    
     db.session.commit()
     
+    # Make every read in this process see the new name/location
+    device_cache.invalidate(device_id)
+    
+    # Other processes pick up threshold changes on their next refresh
+    automation_engine.set_thresholds(device_id, device.temperature_threshold,
+                                     device.temperature_hysteresis)
+    
     return device.to_dict()
\ No newline at end of file
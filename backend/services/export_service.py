@@ -0,0 +1,108 @@
+"""
+Sensor history export service for the Exhaust Fan IoT System.
+
+Rows are streamed from the database with a server-side cursor and encoded
+as NDJSON or CSV chunk by chunk, optionally gzip-compressed on the fly, so
+exports of any size use constant memory.
+"""
+
+import csv
+import io
+import json
+import zlib
+from sqlalchemy import select
+from database import db
+from models.sensor_data import SensorData
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+EXPORT_COLUMNS = ('id', 'device_id', 'temperature', 'fan_status', 'auto_mode', 'timestamp', 'anomaly')
+
+def iter_sensor_rows(device_ids=None, start=None, end=None, batch_size=1000):
+    """
+    Stream sensor data rows in batches, oldest first.
+    
+    Args:
+        device_ids (list, optional): Devices to include, or None for all.
+        start (datetime, optional): Inclusive lower time bound.
+        end (datetime, optional): Exclusive upper time bound.
+        batch_size (int): Rows fetched from the cursor at a time.
+    
+    Yields:
+        list: Batches of row tuples in ``EXPORT_COLUMNS`` order.
+    """
+    table = SensorData.__table__
+    stmt = select(*[table.c[column] for column in EXPORT_COLUMNS])
+    
+    if device_ids:
+        stmt = stmt.where(table.c.device_id.in_(device_ids))
+    if start is not None:
+        stmt = stmt.where(table.c.timestamp >= start)
+    if end is not None:
+        stmt = stmt.where(table.c.timestamp < end)
+    
+    stmt = stmt.order_by(table.c.timestamp, table.c.id) \
+               .execution_options(stream_results=True, yield_per=batch_size)
+    
+    result = db.session.execute(stmt)
+    try:
+        for partition in result.partitions(batch_size):
+            yield partition
+    finally:
+        result.close()
+
+def _encode_ndjson(rows):
+    lines = []
+    for row in rows:
+        record = dict(zip(EXPORT_COLUMNS, row))
+        record['timestamp'] = record['timestamp'].isoformat()
+        lines.append(json.dumps(record))
+    return '\n'.join(lines) + '\n'
+
+def _encode_csv(rows, header=False):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        writer.writerow([value.isoformat() if column == 'timestamp' else value
+                         for column, value in zip(EXPORT_COLUMNS, row)])
+    return buffer.getvalue()
+
+def generate_export(device_ids=None, start=None, end=None, fmt='ndjson', compress=False,
+                    batch_size=1000):
+    """
+    Generate an encoded sensor data export chunk by chunk.
+    
+    Args:
+        device_ids (list, optional): Devices to include, or None for all.
+        start (datetime, optional): Inclusive lower time bound.
+        end (datetime, optional): Exclusive upper time bound.
+        fmt (str): 'ndjson' or 'csv'.
+        compress (bool): Gzip-compress the output.
+        batch_size (int): Rows encoded per chunk.
+    
+    Yields:
+        bytes: Chunks of the export.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f'Unsupported export format: {fmt}')
+    
+    # wbits=31 selects the gzip container
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    
+    def emit(text):
+        data = text.encode('utf-8')
+        return compressor.compress(data) if compressor else data
+    
+    if fmt == 'csv':
+        chunk = emit(_encode_csv([], header=True))
+        if chunk:
+            yield chunk
+    
+    for rows in iter_sensor_rows(device_ids, start, end, batch_size):
+        chunk = emit(_encode_ndjson(rows) if fmt == 'ndjson' else _encode_csv(rows))
+        if chunk:
+            yield chunk
+    
+    if compressor:
+        yield compressor.flush()
\ No newline at end of file
@@ -0,0 +1,383 @@
+"""
+Fan run time and energy analytics for the Exhaust Fan IoT System.
+
+Every reading's ``fan_status`` holds until the device's next reading, but
+for at most ``FAN_USAGE_MAX_GAP`` seconds, so a silent device does not
+accrue run time. On time, covered time and toggles (status changes between
+consecutive readings at most that far apart) are computed with NumPy over
+columns bulk-loaded from ``sensor_data`` rather than per-row ORM objects:
+each reading becomes one interval, clipped to the range and split at
+bucket boundaries.
+
+Closed five-minute buckets are stored in ``FanUsage`` by a scheduler job,
+in order, once no more readings are expected for them, and summed into
+hourly and daily buckets as those complete. A range query sums the
+coarsest stored buckets that fit in the database, so a month for the
+whole fleet reads about a day of rows per device, and only computes the
+parts of the range that are not stored yet (minutes at the edges and the
+last few minutes) from raw readings. Energy is estimated from the on time and each device's
+``fan_power``, or ``FAN_POWER_WATTS``.
+"""
+
+from datetime import datetime, timedelta
+import numpy as np
+from flask import current_app
+from sqlalchemy import select
+from database import db
+from models.device import Device
+from models.sensor_data import SensorData
+from models.fan_usage import FanUsage
+from utils.time_utils import bucket_start
+
+# Widths of the stored bucket tiers in seconds, finest first; each divides the next
+FAN_USAGE_RESOLUTIONS = (300, 3600, 86400)
+
+_EPOCH = datetime(1970, 1, 1)
+_JULIAN_EPOCH = 2440587.5  # julianday('1970-01-01')
+
+def _epoch(timestamp):
+    """Seconds since the epoch of a naive UTC datetime."""
+    return (timestamp - _EPOCH).total_seconds()
+
+def _epoch_column(column):
+    """SQL expression giving a timestamp column in seconds since the epoch, if supported."""
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        return (db.func.julianday(column) - _JULIAN_EPOCH) * 86400.0
+    if dialect == 'postgresql':
+        return db.cast(db.func.extract('epoch', column), db.Float)
+    return None
+
+def load_fan_columns(start, end, device_ids=None):
+    """
+    Bulk-load the fan status columns of a time range.
+    
+    Args:
+        start (datetime): Inclusive start.
+        end (datetime): Exclusive end.
+        device_ids (list, optional): Devices to include, or None for all.
+    
+    Returns:
+        tuple: (list of device IDs, device index per reading, reading times
+        in epoch seconds, fan status per reading), ordered by device and time.
+    """
+    epoch = _epoch_column(SensorData.timestamp)
+    stmt = select(SensorData.device_id,
+                  SensorData.timestamp if epoch is None else epoch,
+                  SensorData.fan_status) \
+        .where(SensorData.timestamp >= start, SensorData.timestamp < end) \
+        .order_by(SensorData.device_id, SensorData.timestamp)
+    if device_ids is not None:
+        stmt = stmt.where(SensorData.device_id.in_(device_ids))
+    
+    rows = db.session.execute(stmt).fetchall()
+    if not rows:
+        return [], np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0, dtype=bool)
+    
+    ids, times, states = zip(*rows)
+    if epoch is None:
+        times = [_epoch(timestamp) for timestamp in times]
+    
+    ids = np.array(ids, dtype=object)
+    first = np.concatenate(([True], ids[1:] != ids[:-1]))
+    codes = np.cumsum(first) - 1
+    
+    return ids[first].tolist(), codes, np.array(times, dtype=np.float64), np.array(states, dtype=bool)
+
+def interval_usage(codes, times, states, devices, start, end, resolution, max_gap):
+    """
+    Compute on time, covered time and toggles per device and bucket.
+    
+    Args:
+        codes (numpy.ndarray): Device index of each reading.
+        times (numpy.ndarray): Reading times in epoch seconds, ordered by
+            device and time.
+        states (numpy.ndarray): Fan status of each reading.
+        devices (int): Number of devices.
+        start (float): Range start in epoch seconds.
+        end (float): Range end in epoch seconds.
+        resolution (float): Bucket width in seconds, at least ``max_gap``.
+        max_gap (float): Longest time a reading's status holds.
+    
+    Returns:
+        tuple: (on seconds, covered seconds, toggles), arrays of shape
+        (devices, buckets).
+    """
+    buckets = max(int(np.ceil((end - start) / resolution)), 1)
+    cells = devices * buckets
+    if not len(times):
+        return np.zeros((devices, buckets)), np.zeros((devices, buckets)), \
+            np.zeros((devices, buckets), dtype=np.int64)
+    
+    same_next = np.zeros(len(times), dtype=bool)
+    same_next[:-1] = codes[1:] == codes[:-1]
+    next_times = np.append(times[1:], np.inf)
+    held_until = np.where(same_next, np.minimum(next_times, times + max_gap), times + max_gap)
+    # Consecutive readings close enough that nothing can have been missed in between
+    adjacent = same_next & (next_times - times <= max_gap)
+    
+    # Each interval is at most one bucket long, so it spans at most two
+    lower = np.clip(times, start, end)
+    upper = np.clip(held_until, start, end)
+    first = np.minimum(((lower - start) // resolution).astype(np.int64), buckets - 1)
+    boundary = start + (first + 1) * resolution
+    head = np.maximum(np.minimum(upper, boundary) - lower, 0.0)
+    tail = np.maximum(upper - boundary, 0.0)
+    spill = tail > 0
+    
+    cell = codes * buckets + first
+    covered = np.bincount(cell, head, cells) + np.bincount(cell[spill] + 1, tail[spill], cells)
+    on = np.bincount(cell, head * states, cells) + \
+        np.bincount(cell[spill] + 1, (tail * states)[spill], cells)
+    
+    # A toggle belongs to the bucket of the reading that shows the new status
+    toggled = np.zeros(len(times), dtype=bool)
+    toggled[1:] = adjacent[:-1] & (states[1:] != states[:-1])
+    toggled &= (times >= start) & (times < end)
+    toggle_cells = codes[toggled] * buckets + ((times[toggled] - start) // resolution).astype(np.int64)
+    toggles = np.bincount(toggle_cells, minlength=cells)
+    
+    shape = (devices, buckets)
+    return on.reshape(shape), covered.reshape(shape), toggles.reshape(shape)
+
+def compute_usage(start, end, resolution, device_ids=None):
+    """
+    Compute fan usage from raw readings.
+    
+    Args:
+        start (datetime): Inclusive start.
+        end (datetime): Exclusive end.
+        resolution (int): Bucket width in seconds.
+        device_ids (list, optional): Devices to include, or None for all.
+    
+    Returns:
+        tuple: (list of device IDs, on seconds, covered seconds, toggles);
+        the arrays have one row per device and one column per bucket.
+    """
+    max_gap = current_app.config['FAN_USAGE_MAX_GAP']
+    # The last reading before the range may still hold into it
+    ids, codes, times, states = load_fan_columns(start - timedelta(seconds=max_gap), end, device_ids)
+    on, covered, toggles = interval_usage(codes, times, states, len(ids), _epoch(start), _epoch(end),
+                                          resolution, max_gap)
+    return ids, on, covered, toggles
+
+def _store_from_readings(closed_until, batch):
+    """
+    Compute the next closed buckets of the finest tier from raw readings.
+    
+    Args:
+        closed_until (datetime): End of the newest closed bucket.
+        batch (timedelta): Longest stretch of readings computed per call.
+    
+    Returns:
+        int: Number of device buckets stored.
+    """
+    resolution = FAN_USAGE_RESOLUTIONS[0]
+    
+    # Skip stretches without any readings, which have nothing to store
+    since = FanUsage.computed_until(resolution) or datetime.min
+    first = db.session.query(db.func.min(SensorData.timestamp)) \
+                      .filter(SensorData.timestamp >= since) \
+                      .scalar()
+    if first is None:
+        return 0
+    since = max(since, bucket_start(first, resolution))
+    
+    until = min(closed_until, since + batch)
+    if since >= until:
+        return 0
+    
+    ids, on, covered, toggles = compute_usage(since, until, resolution)
+    rows, columns = np.nonzero((covered > 0) | (toggles > 0))
+    buckets = [
+        {
+            'device_id': ids[row],
+            'resolution': resolution,
+            'bucket_start': since + timedelta(seconds=resolution * int(column)),
+            'on_seconds': round(float(on[row, column]), 3),
+            'observed_seconds': round(float(covered[row, column]), 3),
+            'toggles': int(toggles[row, column])
+        }
+        for row, column in zip(rows.tolist(), columns.tolist())
+    ]
+    
+    FanUsage.add_buckets(buckets)
+    db.session.commit()
+    return len(buckets)
+
+def _roll_up(fine, coarse):
+    """
+    Store the coarse buckets whose fine buckets are all stored.
+    
+    Args:
+        fine (int): Width in seconds of the tier summed.
+        coarse (int): Width in seconds of the tier stored.
+    
+    Returns:
+        int: Number of device buckets stored.
+    """
+    fine_until = FanUsage.computed_until(fine)
+    if fine_until is None:
+        return 0
+    until = bucket_start(fine_until, coarse)
+    
+    since = FanUsage.computed_until(coarse) or datetime.min
+    first = FanUsage.first_bucket(fine, since)
+    if first is None:
+        return 0
+    since = max(since, bucket_start(first, coarse))
+    
+    stored = 0
+    width = timedelta(seconds=coarse)
+    while since < until:
+        buckets = [
+            {
+                'device_id': row.device_id,
+                'resolution': coarse,
+                'bucket_start': since,
+                'on_seconds': round(row.on_seconds, 3),
+                'observed_seconds': round(row.observed_seconds, 3),
+                'toggles': int(row.toggles)
+            }
+            for row in FanUsage.totals(fine, since, since + width)
+        ]
+        FanUsage.add_buckets(buckets)
+        db.session.commit()
+        stored += len(buckets)
+        since += width
+    
+    return stored
+
+def store_closed_buckets(now=None):
+    """
+    Compute and store the closed buckets of every tier not stored yet.
+    
+    Buckets of the finest tier are closed ``FAN_USAGE_SETTLE`` seconds after
+    they end and computed from at most ``FAN_USAGE_BATCH_HOURS`` of readings
+    per call, so catching up on a backlog is spread over several runs. Each
+    coarser tier is then summed from the tier below. Must be called within
+    an application context.
+    
+    Args:
+        now (datetime, optional): Reference time, defaults to the current time.
+    
+    Returns:
+        int: Number of device buckets stored.
+    """
+    config = current_app.config
+    now = now or datetime.utcnow()
+    closed_until = bucket_start(now - timedelta(seconds=config['FAN_USAGE_SETTLE']), FAN_USAGE_RESOLUTIONS[0])
+    
+    stored = _store_from_readings(closed_until, timedelta(hours=config['FAN_USAGE_BATCH_HOURS']))
+    for fine, coarse in zip(FAN_USAGE_RESOLUTIONS, FAN_USAGE_RESOLUTIONS[1:]):
+        stored += _roll_up(fine, coarse)
+    return stored
+
+def get_fan_usage(start, end, device_ids=None):
+    """
+    Get fan run time, toggles and estimated energy per device and location.
+    
+    Args:
+        start (datetime): Inclusive start.
+        end (datetime): Exclusive end.
+        device_ids (list, optional): Devices to include, or None for all.
+    
+    Returns:
+        dict: ``devices`` and ``locations`` lists and fleet ``totals``.
+    """
+    usage = {}
+    
+    def add(device_id, on_seconds, covered_seconds, toggles):
+        entry = usage.setdefault(device_id, [0.0, 0.0, 0])
+        entry[0] += on_seconds
+        entry[1] += covered_seconds
+        entry[2] += toggles
+    
+    # Serve the widest aligned part of each span from the coarsest tier that
+    # has it, leaving the unaligned or unstored remainder to finer tiers
+    spans = [(start, end)]
+    for resolution in reversed(FAN_USAGE_RESOLUTIONS):
+        stored_until = FanUsage.computed_until(resolution)
+        if stored_until is None:
+            continue
+        width = timedelta(seconds=resolution)
+        remaining = []
+        for span_start, span_end in spans:
+            cached_start = bucket_start(span_start, resolution)
+            if cached_start < span_start:
+                cached_start += width
+            cached_end = min(bucket_start(span_end, resolution), stored_until)
+            if cached_start >= cached_end:
+                remaining.append((span_start, span_end))
+                continue
+            for row in FanUsage.totals(resolution, cached_start, cached_end, device_ids):
+                add(row.device_id, row.on_seconds, row.observed_seconds, int(row.toggles))
+            remaining.extend(span for span in ((span_start, cached_start), (cached_end, span_end))
+                             if span[0] < span[1])
+        spans = remaining
+    
+    for span_start, span_end in spans:
+        ids, on, covered, toggles = compute_usage(span_start, span_end,
+                                                  (span_end - span_start).total_seconds(), device_ids)
+        for device_id, on_seconds, covered_seconds, count in zip(ids, on[:, 0].tolist(),
+                                                                 covered[:, 0].tolist(),
+                                                                 toggles[:, 0].tolist()):
+            add(device_id, on_seconds, covered_seconds, count)
+    
+    return _summarize(usage)
+
+def _summarize(usage):
+    """Turn per-device sums into device, location and fleet summaries."""
+    default_power = current_app.config['FAN_POWER_WATTS']
+    devices = {row.id: row for row in db.session.query(Device.id, Device.location, Device.fan_power)}
+    
+    def summary(on_seconds, covered_seconds, toggles, energy):
+        return {
+            'on_hours': round(on_seconds / 3600, 3),
+            'observed_hours': round(covered_seconds / 3600, 3),
+            'duty_cycle': round(on_seconds / covered_seconds, 4) if covered_seconds else None,
+            'toggles': toggles,
+            'energy_kwh': round(energy, 3)
+        }
+    
+    device_summaries = []
+    locations = {}
+    for device_id, (on_seconds, covered_seconds, toggles) in sorted(usage.items()):
+        device = devices.get(device_id)
+        location = device.location if device else None
+        power = device.fan_power if device and device.fan_power is not None else default_power
+        energy = on_seconds / 3600 * power / 1000
+        
+        device_summaries.append(dict(summary(on_seconds, covered_seconds, toggles, energy),
+                                     device_id=device_id, location=location, fan_power=power))
+        
+        totals = locations.setdefault(location, [0.0, 0.0, 0, 0.0, 0])
+        totals[0] += on_seconds
+        totals[1] += covered_seconds
+        totals[2] += toggles
+        totals[3] += energy
+        totals[4] += 1
+    
+    location_summaries = [dict(summary(*totals[:4]), location=location, device_count=totals[4])
+                          for location, totals in sorted(locations.items(), key=lambda item: item[0] or '')]
+    fleet = [sum(totals[index] for totals in locations.values()) for index in range(5)]
+    
+    return {
+        'devices': device_summaries,
+        'locations': location_summaries,
+        'totals': dict(summary(*fleet[:4]), device_count=fleet[4])
+    }
+
+def run_fan_usage_job(app):
+    """
+    Scheduler entry point storing closed fan usage buckets.
+    
+    Args:
+        app (Flask): The Flask application.
+    """
+    with app.app_context():
+        try:
+            store_closed_buckets()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Error storing fan usage buckets: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,317 @@
+"""
+Buffered sensor ingestion pipeline for the Exhaust Fan IoT System.
+
+Decoded device readings are put on a bounded in-memory queue and written
+by a single background thread. Each flush stores the whole window with one
+bulk ``SensorData`` insert, one rollup upsert and one commit, which also
+writes back pending ``Device`` state from the device cache, so device rows
+never show a state whose readings were not stored and neither costs a
+commit on the MQTT thread. Other threads of the ingest
+process still commit their own writes: the MQTT thread (control history of
+automation commands), the command dispatcher and the scheduler jobs;
+SQLite's busy timeout serialises them.
+"""
+
+import atexit
+import queue
+import threading
+import time
+from flask import current_app, has_app_context
+from sqlalchemy.exc import DataError, IntegrityError
+from database import db
+from models.sensor_data import SensorData
+from services.device_cache import device_cache
+from services.rollup_service import record_readings
+import metrics
+
+# Marker put on the queue to tell the writer thread to drain and exit
+_STOP = object()
+
+class IngestBuffer:
+    """Bounded queue of device readings flushed to the database in batches."""
+    
+    def __init__(self, app=None):
+        self.app = None
+        self.batch_size = 500
+        self.flush_interval = 1.0
+        self.enqueue_timeout = 0.5
+        self._queue = None
+        self._thread = None
+        self._stopped = False
+        self._listeners = []
+        self._lock = threading.Lock()
+        
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """
+        Configure the buffer from the app config and start the writer thread.
+        
+        Args:
+            app (Flask): The Flask application.
+        """
+        self.app = app
+        self.batch_size = app.config['INGEST_BATCH_SIZE']
+        self.flush_interval = app.config['INGEST_FLUSH_INTERVAL']
+        self.enqueue_timeout = app.config['INGEST_ENQUEUE_TIMEOUT']
+        self._queue = queue.Queue(maxsize=app.config['INGEST_QUEUE_SIZE'])
+        
+        self._thread = threading.Thread(target=self._run, name='ingest-writer', daemon=True)
+        self._thread.start()
+        
+        # Drain whatever is still buffered when the process exits
+        atexit.register(self.stop)
+    
+    def add_listener(self, callback):
+        """
+        Register a callback run by the writer after each committed batch.
+        
+        Args:
+            callback (callable): Called with the committed readings and the
+                commit duration in seconds.
+        """
+        self._listeners.append(callback)
+    
+    @property
+    def running(self):
+        """bool: Whether the background writer thread is active."""
+        return self._thread is not None and self._thread.is_alive()
+    
+    def depth(self):
+        """
+        Get the number of readings waiting to be written.
+        
+        Returns:
+            int: Current queue depth.
+        """
+        return self._queue.qsize() if self._queue is not None else 0
+    
+    def submit(self, reading):
+        """
+        Queue a decoded reading for the next flush.
+        
+        When no writer thread is running (e.g. in scripts) the reading is
+        written synchronously instead.
+        
+        Args:
+            reading (dict): ``SensorData`` column values (``device_id``,
+                ``temperature``, ``fan_status``, ``auto_mode``, ``timestamp``).
+        
+        Returns:
+            bool: True if the reading was accepted, False if it was dropped.
+        """
+        if not self.running:
+            if self._stopped:
+                return False
+            self.flush([reading], force=True)
+            return True
+        
+        try:
+            self._queue.put(reading, timeout=self.enqueue_timeout)
+            return True
+        except queue.Full:
+            current_app.logger.warning(
+                f"Ingest queue full, dropping reading from {reading['device_id']}",
+                extra={'sample_key': 'ingest-queue-full', 'device_id': reading['device_id']}
+            )
+            return False
+    
+    def stop(self, timeout=10.0):
+        """
+        Stop accepting readings, flush everything queued and join the writer.
+        
+        Args:
+            timeout (float): Maximum seconds to wait for the drain.
+        """
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+        
+        if self.running:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+    
+    def _run(self):
+        """Writer loop: collect a window of readings and flush it."""
+        while True:
+            batch = []
+            deadline = None
+            stopping = False
+            
+            while len(batch) < self.batch_size:
+                # Wait up to one window for the first reading so pending
+                # device state is still written back when traffic stops,
+                # then no longer than the rest of the window for the others
+                timeout = self.flush_interval
+                if deadline is not None:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                batch.append(item)
+            
+            self.flush(batch)
+            
+            if stopping:
+                self._drain()
+                self.flush([], force=True)
+                return
+    
+    def _drain(self):
+        """Flush readings that were queued before the stop marker."""
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                continue
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+        
+        if batch:
+            self.flush(batch)
+    
+    def flush(self, batch, force=False):
+        """
+        Write a batch of readings in a single transaction.
+        
+        Pending device state is written back first in the same transaction,
+        so devices seen for the first time exist before their readings are
+        inserted.
+        
+        Args:
+            batch (list): Readings as accepted by ``submit``.
+            force (bool): Write back all pending device state now.
+        
+        Returns:
+            bool: True if the batch was committed, False otherwise.
+        """
+        if has_app_context():
+            return self._write(batch, force)
+        
+        with self.app.app_context():
+            return self._write(batch, force)
+    
+    def _drop_stored(self, batch):
+        """
+        Remove readings the database already has from a batch.
+        
+        Only readings flagged ``unverified`` (older than the dedup window
+        can vouch for, e.g. redelivered after a restart) are looked up, so
+        the rollups do not count them twice.
+        """
+        unverified = [reading for reading in batch if reading.pop('unverified', False)]
+        if not unverified:
+            return batch
+        
+        stored = SensorData.existing_event_keys(unverified)
+        if not stored:
+            return batch
+        
+        metrics.messages_rejected.inc(len(stored), reason='duplicate')
+        return [reading for reading in batch
+                if (reading['device_id'], reading.get('device_timestamp')) not in stored]
+    
+    def _write(self, batch, force):
+        """Commit the batch of readings together with pending device state."""
+        started = time.perf_counter()
+        changes = device_cache.take_changes(force=force)
+        try:
+            device_cache.write_changes(changes)
+            
+            if batch:
+                batch = self._drop_stored(batch)
+            
+            if batch:
+                SensorData.add_sensor_readings(batch)
+                record_readings(batch)
+            
+            if changes or batch:
+                db.session.commit()
+        except (IntegrityError, DataError) as e:
+            db.session.rollback()
+            self._write_changes(changes)
+            batch = self._write_rejected(batch, e) if batch else []
+        except Exception as e:
+            db.session.rollback()
+            device_cache.restore_changes(changes)
+            metrics.ingest_flush_failures.inc()
+            current_app.logger.error(f"Error flushing {len(batch)} device readings: {str(e)}")
+            return False
+        
+        if batch:
+            duration = time.perf_counter() - started
+            for listener in self._listeners:
+                listener(batch, duration)
+        return True
+    
+    def _write_changes(self, changes):
+        """Commit device state on its own after its batch was rejected."""
+        if not changes:
+            return
+        
+        try:
+            device_cache.write_changes(changes)
+            db.session.commit()
+        except (IntegrityError, DataError) as e:
+            # The same values would be rejected on every later flush
+            db.session.rollback()
+            metrics.ingest_flush_failures.inc()
+            current_app.logger.error(f"Dropping state of {len(changes)} devices: {str(e)}")
+        except Exception as e:
+            db.session.rollback()
+            device_cache.restore_changes(changes)
+            current_app.logger.error(f"Error writing back device state: {str(e)}")
+    
+    def _write_rejected(self, batch, error):
+        """
+        Retry a batch the database rejected in halves until the bad rows are isolated.
+        
+        Each half is committed on its own, so one bad reading costs about
+        two commits per halving instead of the whole window.
+        
+        Args:
+            batch (list): Readings whose insert failed.
+            error (Exception): The error the database raised.
+        
+        Returns:
+            list: The readings that were stored.
+        """
+        if len(batch) == 1:
+            reading = batch[0]
+            metrics.messages_rejected.inc(reason='invalid')
+            current_app.logger.warning(
+                f"Rejected reading from device {reading['device_id']}: {str(error)}",
+                extra={'sample_key': f"rejected:{reading['device_id']}", 'device_id': reading['device_id']}
+            )
+            return []
+        
+        stored = []
+        middle = len(batch) // 2
+        for half in (batch[:middle], batch[middle:]):
+            try:
+                SensorData.add_sensor_readings(half)
+                record_readings(half)
+                db.session.commit()
+                stored.extend(half)
+            except (IntegrityError, DataError) as e:
+                db.session.rollback()
+                stored.extend(self._write_rejected(half, e))
+        return stored
+
+# Process-wide ingestion buffer
+ingest_buffer = IngestBuffer()
@@ -0,0 +1,287 @@
+"""
+Device liveness tracking for the Exhaust Fan IoT System.
+
+Devices publish every ``LIVENESS_PUBLISH_INTERVAL`` seconds (``PUBLISH_INTERVAL``
+in the firmware), so each message sets a deadline of
+``LIVENESS_MISSED_INTERVALS`` intervals after it. Each tracked device has
+one entry in a heap ordered by deadline. A message only moves the device's
+current deadline (a dictionary update; O(log n) when the device has no
+entry yet), and the periodic check pops just the entries that came due:
+one whose device reported since is pushed back with the current deadline,
+any other device goes offline. A check therefore touches about one entry
+per device and timeout instead of scanning every device. The next message
+of an offline device brings it back online.
+
+Transitions are recorded as ``DeviceOutage`` rows, which every process can
+read for device state and availability statistics, and pushed to live
+telemetry subscribers as ``status`` events.
+"""
+
+import heapq
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from database import db
+from models.device import Device
+from models.device_outage import DeviceOutage
+from services.telemetry_service import telemetry_hub
+import metrics
+
+class LivenessTracker:
+    """Detects devices that stopped reporting from a heap of report deadlines."""
+    
+    def __init__(self, app=None):
+        self.enabled = False
+        self.interval = timedelta(seconds=30)
+        self.missed_intervals = 3
+        self._deadlines = {}
+        self._last_seen = {}
+        self._heap = []
+        self._queued = set()
+        self._offline = {}
+        self._returned = []
+        self._lock = threading.Lock()
+        self._loaded = False
+        
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """
+        Configure the tracker from the app config.
+        
+        Args:
+            app (Flask): The Flask application.
+        """
+        self.enabled = app.config['LIVENESS_ENABLED']
+        self.interval = timedelta(seconds=app.config['LIVENESS_PUBLISH_INTERVAL'])
+        self.missed_intervals = app.config['LIVENESS_MISSED_INTERVALS']
+    
+    @property
+    def timeout(self):
+        """timedelta: Silence after which a device is considered offline."""
+        return self.interval * self.missed_intervals
+    
+    def offline_count(self):
+        """
+        Get the number of devices currently offline.
+        
+        Returns:
+            int: Offline devices known to this process.
+        """
+        return len(self._offline)
+    
+    def observe(self, device_id, seen_at):
+        """
+        Record a message from a device and move its deadline.
+        
+        Args:
+            device_id (str): The device ID.
+            seen_at (datetime): When the message was received.
+        """
+        if not self.enabled:
+            return
+        
+        deadline = seen_at + self.timeout
+        with self._lock:
+            self._deadlines[device_id] = deadline
+            self._last_seen[device_id] = seen_at
+            if device_id not in self._queued:
+                self._queued.add(device_id)
+                heapq.heappush(self._heap, (deadline, device_id))
+            if self._offline.pop(device_id, None) is not None:
+                self._returned.append((device_id, seen_at))
+    
+    def expire(self, now):
+        """
+        Take devices whose deadline passed offline.
+        
+        Args:
+            now (datetime): Reference time.
+        
+        Returns:
+            tuple: (list of ``(device_id, offline since, last seen)`` for
+            devices that went offline, list of ``(device_id, seen_at)`` for
+            devices that reported again since the previous call).
+        """
+        went_offline = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, device_id = self._heap[0]
+                deadline = self._deadlines[device_id]
+                if deadline > now:
+                    # Reported since the entry was pushed; wait for the current deadline
+                    heapq.heapreplace(self._heap, (deadline, device_id))
+                    continue
+                
+                heapq.heappop(self._heap)
+                self._queued.discard(device_id)
+                last_seen = self._last_seen[device_id]
+                since = last_seen + self.interval
+                self._offline[device_id] = since
+                went_offline.append((device_id, since, last_seen))
+            
+            returned, self._returned = self._returned, []
+        
+        return went_offline, returned
+    
+    def check(self, now=None):
+        """
+        Record and announce the online/offline transitions since the last check.
+        
+        Must be called within an application context.
+        
+        Args:
+            now (datetime, optional): Reference time, defaults to the current time.
+        
+        Returns:
+            dict: Number of devices that went ``offline`` and came back ``online``.
+        """
+        if not self._loaded:
+            self._load()
+        
+        went_offline, returned = self.expire(now or datetime.utcnow())
+        if not went_offline and not returned:
+            return {'offline': 0, 'online': 0}
+        
+        DeviceOutage.record_transitions(
+            [{'device_id': device_id, 'started_at': since, 'last_seen': last_seen}
+             for device_id, since, last_seen in went_offline],
+            returned
+        )
+        
+        for device_id, since, last_seen in went_offline:
+            metrics.liveness_transitions.inc(status='offline')
+            current_app.logger.warning(
+                f"Device {device_id} went offline, last seen {last_seen.isoformat()}",
+                extra={'sample_key': f'offline:{device_id}', 'device_id': device_id}
+            )
+            telemetry_hub.publish({'type': 'status', 'device_id': device_id, 'online': False,
+                                   'timestamp': since.isoformat(), 'last_seen': last_seen.isoformat()})
+        for device_id, seen_at in returned:
+            metrics.liveness_transitions.inc(status='online')
+            current_app.logger.info(f"Device {device_id} is back online")
+            telemetry_hub.publish({'type': 'status', 'device_id': device_id, 'online': True,
+                                   'timestamp': seen_at.isoformat(), 'last_seen': seen_at.isoformat()})
+        
+        return {'offline': len(went_offline), 'online': len(returned)}
+    
+    def _load(self):
+        """Seed deadlines from stored last_seen values and resume open outages."""
+        devices = db.session.query(Device.id, Device.last_seen).all()
+        outages = DeviceOutage.get_active()
+        
+        with self._lock:
+            for device_id, last_seen in devices:
+                # Messages received since this process started are newer
+                if device_id in self._deadlines or last_seen is None:
+                    continue
+                self._last_seen[device_id] = last_seen
+                self._deadlines[device_id] = last_seen + self.timeout
+                self._queued.add(device_id)
+                self._heap.append((last_seen + self.timeout, device_id))
+            heapq.heapify(self._heap)
+            
+            for outage in outages:
+                last_seen = self._last_seen.get(outage.device_id)
+                if last_seen is not None and last_seen > outage.last_seen:
+                    self._returned.append((outage.device_id, last_seen))
+                else:
+                    self._offline[outage.device_id] = outage.started_at
+        
+        self._loaded = True
+
+# Process-wide liveness tracker; only fed where device topics are consumed
+liveness_tracker = LivenessTracker()
+
+def get_availability(start, end, device_ids=None):
+    """
+    Get online state and availability per device and location for a time range.
+    
+    A device is available whenever it has no outage; its time before it
+    was registered does not count.
+    
+    Args:
+        start (datetime): Inclusive start.
+        end (datetime): Exclusive end.
+        device_ids (list, optional): Devices to include, or None for all.
+    
+    Returns:
+        dict: ``devices`` and ``locations`` lists and fleet ``totals``.
+    """
+    query = db.session.query(Device.id, Device.location, Device.created_at, Device.last_seen)
+    if device_ids is not None:
+        query = query.filter(Device.id.in_(device_ids))
+    devices = query.order_by(Device.id).all()
+    
+    downtime = {}
+    outage_counts = {}
+    offline_since = {}
+    recovered = []
+    for outage in DeviceOutage.get_overlapping(start, end, device_ids):
+        outage_end = min(outage.ended_at or end, end)
+        seconds = (outage_end - max(outage.started_at, start)).total_seconds()
+        downtime[outage.device_id] = downtime.get(outage.device_id, 0.0) + max(seconds, 0.0)
+        outage_counts[outage.device_id] = outage_counts.get(outage.device_id, 0) + 1
+        if outage.ended_at is None:
+            offline_since[outage.device_id] = outage.started_at
+        elif outage.ended_at <= end:
+            recovered.append((outage.ended_at - outage.started_at).total_seconds())
+    
+    def summary(window, down, outages):
+        return {
+            'availability': round(1 - down / window, 4) if window > 0 else None,
+            'downtime_hours': round(down / 3600, 3),
+            'outages': outages
+        }
+    
+    device_summaries = []
+    locations = {}
+    for device in devices:
+        window = max((end - max(start, device.created_at or start)).total_seconds(), 0.0)
+        down = min(downtime.get(device.id, 0.0), window)
+        outages = outage_counts.get(device.id, 0)
+        since = offline_since.get(device.id)
+        
+        device_summaries.append(dict(summary(window, down, outages),
+                                     device_id=device.id, location=device.location,
+                                     online=since is None,
+                                     offline_since=since.isoformat() if since else None,
+                                     last_seen=device.last_seen.isoformat() if device.last_seen else None))
+        
+        totals = locations.setdefault(device.location, [0.0, 0.0, 0, 0, 0])
+        totals[0] += window
+        totals[1] += down
+        totals[2] += outages
+        totals[3] += 1
+        totals[4] += since is None
+    
+    def group(totals):
+        return dict(summary(*totals[:3]), device_count=totals[3], online=totals[4],
+                    offline=totals[3] - totals[4])
+    
+    location_summaries = [dict(group(totals), location=location)
+                          for location, totals in sorted(locations.items(), key=lambda item: item[0] or '')]
+    fleet = [sum(totals[index] for totals in locations.values()) for index in range(5)]
+    
+    return {
+        'devices': device_summaries,
+        'locations': location_summaries,
+        'totals': dict(group(fleet),
+                       mean_time_to_recover_minutes=round(sum(recovered) / len(recovered) / 60, 2)
+                       if recovered else None)
+    }
+
+def run_liveness_job(app):
+    """
+    Scheduler entry point recording device online/offline transitions.
+    
+    Args:
+        app (Flask): The Flask application.
+    """
+    with app.app_context():
+        try:
+            liveness_tracker.check()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Error checking device liveness: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,280 @@
+"""
+Desired/reported state reconciliation for the Exhaust Fan IoT System.
+
+The process that consumes device reports also subscribes to ``control/#``,
+so it sees every command any worker publishes. Each command sets the
+desired fan or mode state of its device; device reports are matched
+against it. A report with the desired value (or echoing the command ID as
+``ack``) confirms the command and records the command-to-effect latency.
+Commands still unconfirmed after ``RECONCILE_DEADLINE`` are re-issued up
+to ``RECONCILE_MAX_REISSUES`` times, then marked diverged. Unless set, the
+deadline covers every publish attempt of the command dispatcher plus
+``RECONCILE_CONFIRM_GRACE`` for the device to report, so a command is not
+re-issued while the dispatcher is still retrying it.
+
+Deadlines sit in a heap, so a report costs a dictionary lookup per field
+and the periodic sweep only touches expired commands.
+"""
+
+import heapq
+import itertools
+import json
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+from database import db
+from models.control_history import ControlHistory
+from services.command_service import command_dispatcher
+import metrics
+
+# Command payload keys reconciled and how their commands are recorded
+FIELDS = {
+    'fan': ('fan_control', ('off', 'on')),
+    'auto': ('mode_change', ('manual', 'auto'))
+}
+
+class DesiredState:
+    """An unconfirmed command for one field of a device."""
+    
+    __slots__ = ('device_id', 'field', 'value', 'source', 'command_ids', 'issued_at',
+                 'deadline', 'reissues')
+    
+    def __init__(self, device_id, field, value, source, command_id):
+        self.device_id = device_id
+        self.field = field
+        self.value = value
+        self.source = source
+        self.command_ids = [command_id]
+        self.issued_at = time.monotonic()
+        self.deadline = None
+        self.reissues = 0
+
+class StateReconciler:
+    """Tracks desired device state until device reports confirm it."""
+    
+    def __init__(self, app=None):
+        self.enabled = False
+        self.deadline = None
+        self.confirm_grace = 10.0
+        self.max_reissues = 2
+        self._desired = {}
+        self._deadlines = []
+        self._sequence = itertools.count()
+        self._confirmed = []
+        self._diverged = []
+        self._lock = threading.Lock()
+        
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """
+        Configure the reconciler from the app config.
+        
+        Args:
+            app (Flask): The Flask application.
+        """
+        self.enabled = app.config['RECONCILE_ENABLED']
+        self.deadline = app.config['RECONCILE_DEADLINE']
+        self.confirm_grace = app.config['RECONCILE_CONFIRM_GRACE']
+        self.max_reissues = app.config['RECONCILE_MAX_REISSUES']
+    
+    @property
+    def timeout(self):
+        """float: Seconds a command has to be confirmed before it is re-issued."""
+        if self.deadline is not None:
+            return self.deadline
+        return command_dispatcher.max_lifetime + self.confirm_grace
+    
+    def pending_count(self):
+        """
+        Get the number of commands awaiting confirmation.
+        
+        Returns:
+            int: Unconfirmed device fields.
+        """
+        return len(self._desired)
+    
+    def desired_state(self, device_id):
+        """
+        Get the unconfirmed desired state of a device.
+        
+        Args:
+            device_id (str): The device ID.
+        
+        Returns:
+            dict: Desired values by field (``fan``, ``auto``) still awaiting
+            confirmation.
+        """
+        with self._lock:
+            return {field: self._desired[(device_id, field)].value for field in FIELDS
+                    if (device_id, field) in self._desired}
+    
+    def process_command_message(self, message):
+        """
+        Track a control command seen on ``control/<device_id>``.
+        
+        Args:
+            message (mqtt.Message): The control message.
+        
+        Returns:
+            bool: True if the command was tracked.
+        """
+        try:
+            command = json.loads(message.payload.decode('utf-8'))
+        except ValueError:
+            return False
+        
+        command_id = command.get('id')
+        if not self.enabled or not command_id:
+            return False
+        
+        return self.track(message.topic.split('/')[-1], command, command_id)
+    
+    def track(self, device_id, command, command_id):
+        """
+        Record the desired state set by a command.
+        
+        A command for a field that already has a different desired value
+        supersedes it; a repeat of the same value (a publish retry or a
+        re-issue) keeps the original issue time.
+        
+        Args:
+            device_id (str): The device ID.
+            command (dict): The command payload.
+            command_id (str): The command ID.
+        
+        Returns:
+            bool: True if the command set any reconciled field.
+        """
+        tracked = False
+        with self._lock:
+            for field in FIELDS:
+                if field not in command:
+                    continue
+                tracked = True
+                value = bool(command[field])
+                
+                desired = self._desired.get((device_id, field))
+                if desired is not None and desired.value == value:
+                    if command_id not in desired.command_ids:
+                        desired.command_ids.append(command_id)
+                    continue
+                
+                if desired is not None:
+                    metrics.reconcile_results.inc(outcome='superseded')
+                
+                desired = DesiredState(device_id, field, value, command.get('source', 'app'), command_id)
+                self._desired[(device_id, field)] = desired
+                self._schedule(desired)
+        
+        return tracked
+    
+    def observe(self, device_id, data):
+        """
+        Match a device report against the device's desired state.
+        
+        Args:
+            device_id (str): The device ID.
+            data (dict): The decoded report.
+        """
+        if not self._desired:
+            return
+        
+        ack = data.get('ack')
+        with self._lock:
+            for field in FIELDS:
+                desired = self._desired.get((device_id, field))
+                if desired is None:
+                    continue
+                
+                if (ack is not None and ack in desired.command_ids) or \
+                        (field in data and bool(data[field]) == desired.value):
+                    del self._desired[(device_id, field)]
+                    duration = time.monotonic() - desired.issued_at
+                    metrics.reconcile_results.inc(outcome='confirmed')
+                    metrics.command_convergence_duration.observe(duration)
+                    confirmed_at = datetime.utcnow()
+                    self._confirmed.extend({'command_id': command_id, 'confirmed_at': confirmed_at}
+                                           for command_id in desired.command_ids)
+    
+    def sweep(self):
+        """
+        Re-issue or give up on expired commands and record outcomes.
+        
+        Must be called within an application context.
+        
+        Returns:
+            dict: Counts of ``reissued`` and ``diverged`` commands.
+        """
+        now = time.monotonic()
+        reissue = []
+        with self._lock:
+            while self._deadlines and self._deadlines[0][0] <= now:
+                deadline, _, desired = heapq.heappop(self._deadlines)
+                # Skip deadlines of confirmed, superseded or rescheduled commands
+                if self._desired.get((desired.device_id, desired.field)) is not desired or \
+                        desired.deadline != deadline:
+                    continue
+                
+                if desired.reissues < self.max_reissues:
+                    desired.reissues += 1
+                    self._schedule(desired)
+                    reissue.append(desired)
+                else:
+                    del self._desired[(desired.device_id, desired.field)]
+                    self._diverged.extend(desired.command_ids)
+                    metrics.reconcile_results.inc(outcome='diverged')
+                    current_app.logger.warning(
+                        f"Device {desired.device_id} did not confirm {desired.field}="
+                        f"{desired.value} after {desired.reissues} re-issues",
+                        extra={'sample_key': f'diverged:{desired.device_id}', 'device_id': desired.device_id}
+                    )
+            
+            confirmed, self._confirmed = self._confirmed, []
+            diverged, self._diverged = self._diverged, []
+        
+        for desired in reissue:
+            command_type, values = FIELDS[desired.field]
+            command = {desired.field: desired.value}
+            # Re-issued automation commands must not switch the device to manual mode
+            if desired.source == 'auto':
+                command['source'] = 'auto'
+            command_id = command_dispatcher.submit(desired.device_id, command,
+                                                   command_type, values[desired.value], 'reconcile')
+            if command_id:
+                metrics.reconcile_results.inc(outcome='reissued')
+                with self._lock:
+                    desired.command_ids.append(command_id)
+        
+        if confirmed or diverged:
+            try:
+                ControlHistory.confirm_commands(confirmed)
+                ControlHistory.mark_diverged(diverged)
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error(f"Error recording reconciled commands: {str(e)}")
+        
+        return {'reissued': len(reissue), 'diverged': len(diverged)}
+    
+    def _schedule(self, desired):
+        desired.deadline = time.monotonic() + self.timeout
+        heapq.heappush(self._deadlines, (desired.deadline, next(self._sequence), desired))
+
+def run_reconcile_job(app):
+    """
+    Scheduler entry point for the reconciliation sweep.
+    
+    Args:
+        app (Flask): The Flask application.
+    """
+    with app.app_context():
+        try:
+            state_reconciler.sweep()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Error reconciling device state: {str(e)}")
+
+# Process-wide state reconciler
+state_reconciler = StateReconciler()
\ No newline at end of file
@@ -0,0 +1,221 @@
+"""
+Data retention service for the Exhaust Fan IoT System.
+
+Deletes sensor data and control history older than the configured
+retention periods. Rows are removed in small chunks selected through the
+``timestamp`` index, with a commit and a short pause after each chunk, so
+the job never holds the SQLite write lock for long. Backends with time
+partitions drop whole expired partitions first.
+"""
+
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from database import db
+from storage import storage
+from models.sensor_data import SensorData
+from models.control_history import ControlHistory
+from models.sensor_rollup import SensorRollup
+from models.fan_usage import FanUsage
+from services.rollup_service import ROLLUP_RESOLUTIONS, aggregate_readings
+from services.fan_usage_service import FAN_USAGE_RESOLUTIONS
+from utils.time_utils import bucket_start
+
+def purge_expired(model, cutoff, chunk_size, pause=0.0):
+    """
+    Delete rows of a timestamped model older than the cutoff, in chunks.
+    
+    Args:
+        model (db.Model): Model with ``id`` and indexed ``timestamp`` columns.
+        cutoff (datetime): Rows with an older timestamp are deleted.
+        chunk_size (int): Maximum rows deleted per transaction.
+        pause (float): Seconds to sleep between chunks.
+    
+    Returns:
+        int: Number of rows deleted.
+    """
+    removed = 0
+    
+    while True:
+        ids = [row.id for row in db.session.query(model.id)
+                                           .filter(model.timestamp < cutoff)
+                                           .order_by(model.timestamp)
+                                           .limit(chunk_size)]
+        if not ids:
+            break
+        
+        db.session.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        removed += len(ids)
+        
+        if len(ids) < chunk_size:
+            break
+        time.sleep(pause)
+    
+    return removed
+
+def backfill_rollups(cutoff):
+    """
+    Roll up expiring sensor data that has no aggregates yet.
+    
+    Works one whole hour at a time so every tier's buckets are complete.
+    Buckets that already exist (written during ingestion) are left alone.
+    
+    Args:
+        cutoff (datetime): Hour-aligned time before which data will expire.
+    
+    Returns:
+        int: Number of buckets inserted.
+    """
+    oldest = db.session.query(db.func.min(SensorData.timestamp)).scalar()
+    if oldest is None:
+        return 0
+    
+    window = timedelta(seconds=ROLLUP_RESOLUTIONS[-1])
+    start = bucket_start(oldest, ROLLUP_RESOLUTIONS[-1])
+    inserted = 0
+    
+    while start < cutoff:
+        end = start + window
+        rows = db.session.query(SensorData.device_id, SensorData.temperature,
+                                SensorData.fan_status, SensorData.timestamp) \
+                         .filter(SensorData.timestamp >= start, SensorData.timestamp < end) \
+                         .all()
+        
+        if rows:
+            inserted += SensorRollup.insert_missing(
+                aggregate_readings([row._asdict() for row in rows])
+            )
+            db.session.commit()
+        start = end
+    
+    return inserted
+
+def purge_rollups(resolution, cutoff, pause=0.0):
+    """
+    Delete rollup buckets of one tier older than the cutoff, a day at a time.
+    
+    Args:
+        resolution (int): Bucket width in seconds of the tier to prune.
+        cutoff (datetime): Buckets starting before this time are deleted.
+        pause (float): Seconds to sleep between days.
+    
+    Returns:
+        int: Number of buckets deleted.
+    """
+    oldest = db.session.query(db.func.min(SensorRollup.bucket_start)) \
+                       .filter(SensorRollup.resolution == resolution) \
+                       .scalar()
+    removed = 0
+    
+    while oldest is not None and oldest < cutoff:
+        end = min(oldest + timedelta(days=1), cutoff)
+        removed += SensorRollup.query.filter(SensorRollup.resolution == resolution,
+                                             SensorRollup.bucket_start < end) \
+                                     .delete(synchronize_session=False)
+        db.session.commit()
+        oldest = end
+        time.sleep(pause)
+    
+    return removed
+
+def purge_fan_usage(resolution, cutoff, pause=0.0):
+    """
+    Delete fan usage buckets of one tier older than the cutoff, a day at a time.
+    
+    Args:
+        resolution (int): Bucket width in seconds of the tier to prune.
+        cutoff (datetime): Buckets starting before this time are deleted.
+        pause (float): Seconds to sleep between days.
+    
+    Returns:
+        int: Number of buckets deleted.
+    """
+    oldest = db.session.query(db.func.min(FanUsage.bucket_start)) \
+                       .filter(FanUsage.resolution == resolution) \
+                       .scalar()
+    removed = 0
+    
+    while oldest is not None and oldest < cutoff:
+        end = min(oldest + timedelta(days=1), cutoff)
+        removed += FanUsage.query.filter(FanUsage.resolution == resolution,
+                                         FanUsage.bucket_start < end) \
+                                 .delete(synchronize_session=False)
+        db.session.commit()
+        oldest = end
+        time.sleep(pause)
+    
+    return removed
+
+def enforce_retention(now=None):
+    """
+    Apply the configured retention periods to all time-series tables.
+    
+    Must be called within an application context.
+    
+    Args:
+        now (datetime, optional): Reference time, defaults to the current time.
+    
+    Returns:
+        dict: Rows removed per table and the time spent in seconds.
+    """
+    config = current_app.config
+    now = now or datetime.utcnow()
+    started = time.monotonic()
+    chunk_size = config['RETENTION_CHUNK_SIZE']
+    pause = config['RETENTION_CHUNK_PAUSE']
+    
+    sensor_cutoff = now - timedelta(days=config['SENSOR_DATA_RETENTION'])
+    control_cutoff = now - timedelta(days=config['CONTROL_HISTORY_RETENTION'])
+    report = {'rollups_added': 0}
+    
+    if config['RETENTION_ROLLUP_BEFORE_DELETE']:
+        # Only expire whole hours so the backfilled buckets are complete
+        sensor_cutoff = bucket_start(sensor_cutoff, ROLLUP_RESOLUTIONS[-1])
+        report['rollups_added'] = backfill_rollups(sensor_cutoff)
+    
+    report['partitions_dropped'] = (storage.drop_partitions(SensorData, sensor_cutoff) +
+                                    storage.drop_partitions(ControlHistory, control_cutoff))
+    report['sensor_data'] = purge_expired(SensorData, sensor_cutoff, chunk_size, pause)
+    report['control_history'] = purge_expired(ControlHistory, control_cutoff, chunk_size, pause)
+    
+    # Minute buckets are only useful for ranges raw data could also serve
+    report['rollups_removed'] = purge_rollups(
+        ROLLUP_RESOLUTIONS[0],
+        now - timedelta(days=config['SENSOR_DATA_RETENTION']),
+        pause
+    )
+    # Five-minute fan usage only refines the edges of ranges raw data still covers
+    report['fan_usage_removed'] = purge_fan_usage(
+        FAN_USAGE_RESOLUTIONS[0],
+        now - timedelta(days=config['SENSOR_DATA_RETENTION']),
+        pause
+    )
+    for resolution in FAN_USAGE_RESOLUTIONS[1:]:
+        report['fan_usage_removed'] += purge_fan_usage(
+            resolution,
+            now - timedelta(days=config['FAN_USAGE_RETENTION']),
+            pause
+        )
+    report['duration'] = round(time.monotonic() - started, 3)
+    
+    current_app.logger.info(
+        f"Retention removed {report['partitions_dropped']} partitions, "
+        f"{report['sensor_data']} sensor rows, {report['control_history']} control rows "
+        f"and {report['rollups_removed']} minute rollups in {report['duration']}s"
+    )
+    return report
+
+def run_retention_job(app):
+    """
+    Scheduler entry point for the retention job.
+    
+    Args:
+        app (Flask): The Flask application.
+    """
+    with app.app_context():
+        try:
+            enforce_retention()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Error enforcing data retention: {str(e)}")
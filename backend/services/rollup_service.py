@@ -0,0 +1,144 @@
+"""
+Sensor data rollup service for the Exhaust Fan IoT System.
+
+Readings are aggregated into 1-minute, 15-minute and hourly buckets as they
+are ingested, so history queries can read a bounded number of points
+instead of scanning raw sensor data.
+"""
+
+from models.sensor_rollup import SensorRollup
+from utils.time_utils import bucket_start
+
+# Rollup tiers in seconds, finest first
+ROLLUP_RESOLUTIONS = (60, 900, 3600)
+
+# Names accepted for the resolution query parameter
+RESOLUTION_NAMES = {'1m': 60, '15m': 900, '1h': 3600}
+
+def aggregate_readings(readings):
+    """
+    Aggregate readings into partial buckets for every rollup tier.
+    
+    Args:
+        readings (list): Sensor data rows as dicts with ``device_id``,
+            ``temperature``, ``fan_status`` and ``timestamp`` keys.
+    
+    Returns:
+        list: Partial bucket dicts ready for ``SensorRollup.upsert_buckets``.
+    """
+    buckets = {}
+    
+    for reading in readings:
+        temperature = reading['temperature']
+        fan_on = 1 if reading['fan_status'] else 0
+        
+        for resolution in ROLLUP_RESOLUTIONS:
+            key = (reading['device_id'], resolution, bucket_start(reading['timestamp'], resolution))
+            bucket = buckets.get(key)
+            
+            if bucket is None:
+                buckets[key] = {
+                    'device_id': key[0],
+                    'resolution': resolution,
+                    'bucket_start': key[2],
+                    'sample_count': 1,
+                    'temperature_min': temperature,
+                    'temperature_max': temperature,
+                    'temperature_sum': temperature,
+                    'fan_on_count': fan_on
+                }
+            else:
+                bucket['sample_count'] += 1
+                bucket['temperature_sum'] += temperature
+                bucket['fan_on_count'] += fan_on
+                if temperature < bucket['temperature_min']:
+                    bucket['temperature_min'] = temperature
+                if temperature > bucket['temperature_max']:
+                    bucket['temperature_max'] = temperature
+    
+    return list(buckets.values())
+
+def record_readings(readings):
+    """
+    Add readings to the rollup tables within the current transaction.
+    
+    Args:
+        readings (list): Sensor data rows as accepted by ``aggregate_readings``.
+    
+    Returns:
+        int: Number of buckets written.
+    """
+    return SensorRollup.upsert_buckets(aggregate_readings(readings))
+
+def parse_resolution(value):
+    """
+    Parse a resolution given as a tier name ('1m', '15m', '1h') or seconds.
+    
+    Args:
+        value (str): The resolution text, or None/'auto' for automatic.
+    
+    Returns:
+        int: Resolution in seconds, or None for automatic selection.
+    
+    Raises:
+        ValueError: If the value is not a valid resolution.
+    """
+    if value is None or value in ('', 'auto'):
+        return None
+    
+    if value in RESOLUTION_NAMES:
+        return RESOLUTION_NAMES[value]
+    
+    seconds = int(value)
+    if seconds <= 0:
+        raise ValueError('Resolution must be positive')
+    
+    return seconds
+
+def select_resolution(start, end, max_points, resolution=None):
+    """
+    Pick the rollup tier for a query.
+    
+    Starts from the coarsest tier that is at least as detailed as the
+    requested resolution (the finest tier if none was requested) and moves
+    to coarser tiers until the range fits in the point budget.
+    
+    Args:
+        start (datetime): Range start.
+        end (datetime): Range end.
+        max_points (int): Maximum number of buckets to return.
+        resolution (int, optional): Requested bucket width in seconds.
+    
+    Returns:
+        int: The chosen resolution in seconds.
+    """
+    index = 0
+    if resolution is not None:
+        for position, tier in enumerate(ROLLUP_RESOLUTIONS):
+            if tier <= resolution:
+                index = position
+    
+    span = (end - start).total_seconds()
+    while index < len(ROLLUP_RESOLUTIONS) - 1 and span / ROLLUP_RESOLUTIONS[index] > max_points:
+        index += 1
+    
+    return ROLLUP_RESOLUTIONS[index]
+
+def get_rollup_series(device_id, start, end, max_points, resolution=None):
+    """
+    Get aggregated sensor history for a device.
+    
+    Args:
+        device_id (str): The device ID.
+        start (datetime): Range start.
+        end (datetime): Range end.
+        max_points (int): Maximum number of buckets to return.
+        resolution (int, optional): Requested bucket width in seconds.
+    
+    Returns:
+        tuple: (resolution in seconds, list of bucket dicts).
+    """
+    chosen = select_resolution(start, end, max_points, resolution)
+    buckets = SensorRollup.get_series(device_id, chosen, bucket_start(start, chosen), end)
+    
+    return chosen, [bucket.to_dict() for bucket in buckets[-max_points:]]
@@ -0,0 +1,365 @@
+"""
+Scheduled fan and mode control for the Exhaust Fan IoT System.
+
+Schedules are stored in ``ControlSchedule`` and target one device or every
+device at a location, e.g. fans on from 12:00 to 15:00 in Greenhouse A.
+The process that runs the maintenance jobs loads the enabled schedules and
+keeps the next firing of each in a heap ordered by due time. Every
+``SCHEDULE_INTERVAL`` the due firings are popped together, and the commands
+of all of them are sent with one bulk control call per command value, so a
+location-wide schedule costs one control history commit however many fans
+it covers.
+
+Each firing is claimed first by moving the schedule's ``last_fired_at`` to
+its scheduled time with a conditional update, so a firing that another
+process (or this one, before a restart) already sent is never sent again.
+On load, the latest missed firing of a schedule is still sent if it is at
+most ``SCHEDULE_MISFIRE_GRACE`` old, which restores the state the schedule
+calls for after downtime. Changes made through the API in other processes
+are picked up every ``SCHEDULE_REFRESH_INTERVAL``.
+"""
+
+import heapq
+import itertools
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from database import db
+from models.control_schedule import ControlSchedule
+from services.device_service import get_all_devices, send_bulk_fan_control, send_bulk_mode_control
+import metrics
+
+class ScheduledControl:
+    """A snapshot of an enabled schedule held by the engine."""
+    
+    __slots__ = ('id', 'device_id', 'location', 'command_type', 'command_value', 'end_value',
+                 'start_time', 'end_time', 'weekdays', 'last_fired_at')
+    
+    def __init__(self, schedule):
+        self.id = schedule.id
+        self.device_id = schedule.device_id
+        self.location = schedule.location
+        self.command_type = schedule.command_type
+        self.command_value = schedule.command_value
+        self.end_value = schedule.end_value
+        self.start_time = schedule.start_time
+        self.end_time = schedule.end_time
+        self.weekdays = schedule.weekdays
+        self.last_fired_at = schedule.last_fired_at
+
+def _firings(schedule, local_date, offset):
+    """
+    Get the firings of a schedule whose window starts on a local date.
+    
+    Returns:
+        list: (UTC time, command value, whether it starts the window) tuples.
+    """
+    if str(local_date.weekday()) not in schedule.weekdays:
+        return []
+    
+    start = datetime.combine(local_date, schedule.start_time) - offset
+    firings = [(start, schedule.command_value, True)]
+    if schedule.end_time is not None:
+        end = datetime.combine(local_date, schedule.end_time) - offset
+        if end <= start:
+            end += timedelta(days=1)
+        firings.append((end, schedule.end_value, False))
+    
+    return firings
+
+def next_firing(schedule, after, offset):
+    """
+    Get the first firing of a schedule after a given time.
+    
+    Args:
+        schedule (ControlSchedule): The schedule (or a snapshot of it).
+        after (datetime): Exclusive lower bound, naive UTC.
+        offset (timedelta): Offset of the schedule's wall-clock times from UTC.
+    
+    Returns:
+        tuple: (UTC time, command value, whether it starts the window), or
+        None if the schedule has no weekdays.
+    """
+    today = (after + offset).date()
+    candidates = [firing for days in range(-1, 8)
+                  for firing in _firings(schedule, today + timedelta(days=days), offset)
+                  if firing[0] > after]
+    return min(candidates, key=lambda firing: firing[0], default=None)
+
+def last_firing(schedule, until, offset):
+    """
+    Get the latest firing of a schedule at or before a given time.
+    
+    Args:
+        schedule (ControlSchedule): The schedule (or a snapshot of it).
+        until (datetime): Inclusive upper bound, naive UTC.
+        offset (timedelta): Offset of the schedule's wall-clock times from UTC.
+    
+    Returns:
+        tuple: (UTC time, command value, whether it starts the window), or
+        None if the schedule has no weekdays.
+    """
+    today = (until + offset).date()
+    candidates = [firing for days in range(-8, 1)
+                  for firing in _firings(schedule, today + timedelta(days=days), offset)
+                  if firing[0] <= until]
+    return max(candidates, key=lambda firing: firing[0], default=None)
+
+class ScheduleEngine:
+    """Fires stored control schedules from a heap of next firing times."""
+    
+    def __init__(self, app=None):
+        self.enabled = False
+        self.offset = timedelta(0)
+        self.misfire_grace = timedelta(hours=1)
+        self.refresh_interval = 30.0
+        self._schedules = {}
+        self._timers = []
+        self._sequence = itertools.count()
+        self._token = None
+        self._refreshed_at = None
+        
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """
+        Configure the engine from the app config.
+        
+        Args:
+            app (Flask): The Flask application.
+        """
+        self.enabled = app.config['SCHEDULE_ENABLED']
+        self.offset = timedelta(minutes=app.config['SCHEDULE_UTC_OFFSET'])
+        self.misfire_grace = timedelta(seconds=app.config['SCHEDULE_MISFIRE_GRACE'])
+        self.refresh_interval = app.config['SCHEDULE_REFRESH_INTERVAL']
+    
+    def scheduled_count(self):
+        """
+        Get the number of enabled schedules loaded.
+        
+        Returns:
+            int: Schedules with a pending firing.
+        """
+        return len(self._schedules)
+    
+    def refresh(self, now=None, force=False):
+        """
+        Reload the schedules and rebuild the heap if any schedule changed.
+        
+        Must be called within an application context.
+        
+        Args:
+            now (datetime, optional): Reference time, defaults to the current time.
+            force (bool): Reload even if nothing changed.
+        
+        Returns:
+            bool: True if the schedules were reloaded.
+        """
+        now = now or datetime.utcnow()
+        self._refreshed_at = time.monotonic()
+        token = ControlSchedule.change_token()
+        if not force and token == self._token:
+            return False
+        
+        schedules = {}
+        timers = []
+        for row in ControlSchedule.get_all(enabled_only=True):
+            schedule = ScheduledControl(row)
+            missed = last_firing(schedule, now, self.offset)
+            if missed is not None and now - missed[0] <= self.misfire_grace and \
+                    (schedule.last_fired_at is None or missed[0] > schedule.last_fired_at):
+                firing = missed
+            else:
+                firing = next_firing(schedule, now, self.offset)
+            if firing is None:
+                continue
+            
+            schedules[schedule.id] = schedule
+            timers.append((firing[0], next(self._sequence), schedule, firing[1], firing[2]))
+        
+        heapq.heapify(timers)
+        self._schedules = schedules
+        self._timers = timers
+        self._token = token
+        return True
+    
+    def fire_due(self, now=None):
+        """
+        Send the commands of every firing that is due.
+        
+        Must be called within an application context.
+        
+        Args:
+            now (datetime, optional): Reference time, defaults to the current time.
+        
+        Returns:
+            int: Number of control commands queued.
+        """
+        now = now or datetime.utcnow()
+        if self._refreshed_at is None or time.monotonic() - self._refreshed_at >= self.refresh_interval:
+            self.refresh(now)
+        
+        due = []
+        while self._timers and self._timers[0][0] <= now:
+            fire_at, _, schedule, value, starting = heapq.heappop(self._timers)
+            due.append((fire_at, schedule, value, starting))
+            
+            # Queue the following firing before anything can fail
+            firing = next_firing(schedule, fire_at, self.offset)
+            if firing is not None:
+                heapq.heappush(self._timers, (firing[0], next(self._sequence), schedule, firing[1], firing[2]))
+        
+        if not due:
+            return 0
+        
+        claimed = [firing for firing in due if ControlSchedule.claim_firing(firing[1].id, firing[0])]
+        db.session.commit()
+        metrics.schedule_firings.inc(len(claimed), result='sent')
+        metrics.schedule_firings.inc(len(due) - len(claimed), result='skipped')
+        if not claimed:
+            return 0
+        
+        return self._send(claimed)
+    
+    def _send(self, firings):
+        """Send the commands of claimed firings, one bulk call per command value."""
+        by_location = {}
+        if any(schedule.device_id is None for _, schedule, _, _ in firings):
+            for device in get_all_devices():
+                by_location.setdefault(device['location'], []).append(device['id'])
+        
+        # One value per device and command type: device schedules win over
+        # location ones, and a window starting wins over one ending
+        targets = {}
+        for _, schedule, value, starting in firings:
+            device_ids = [schedule.device_id] if schedule.device_id else by_location.get(schedule.location, [])
+            rank = (schedule.device_id is not None, starting)
+            for device_id in device_ids:
+                key = (schedule.command_type, device_id)
+                if key not in targets or rank >= targets[key][0]:
+                    targets[key] = (rank, value)
+        
+        groups = {}
+        for (command_type, device_id), (_, value) in targets.items():
+            groups.setdefault((command_type, value), []).append(device_id)
+        
+        queued = 0
+        for (command_type, value), device_ids in groups.items():
+            if command_type == 'fan_control':
+                results = send_bulk_fan_control(device_ids, value == 'on', source='schedule')
+            else:
+                results = send_bulk_mode_control(device_ids, value == 'auto', source='schedule')
+            queued += sum(1 for command_id in results.values() if command_id)
+        
+        current_app.logger.info(f"Schedules fired {len(firings)} times, queuing {queued} control commands")
+        return queued
+
+# Process-wide schedule engine; only the process running the scheduler fires it
+schedule_engine = ScheduleEngine()
+
+def get_schedules():
+    """
+    Get all schedules with their next firing.
+    
+    Returns:
+        list: List of schedule dictionaries.
+    """
+    now = datetime.utcnow()
+    schedules = []
+    for schedule in ControlSchedule.get_all():
+        firing = next_firing(schedule, now, schedule_engine.offset) if schedule.enabled else None
+        schedules.append(dict(schedule.to_dict(),
+                              next_fire_at=firing[0].isoformat() if firing else None,
+                              next_value=firing[1] if firing else None))
+    return schedules
+
+def get_schedule(schedule_id):
+    """
+    Get a schedule with its next firing.
+    
+    Args:
+        schedule_id (int): The schedule ID.
+    
+    Returns:
+        dict: Schedule information or None if the schedule was not found.
+    """
+    schedule = ControlSchedule.query.get(schedule_id)
+    if not schedule:
+        return None
+    
+    firing = next_firing(schedule, datetime.utcnow(), schedule_engine.offset) if schedule.enabled else None
+    return dict(schedule.to_dict(),
+                next_fire_at=firing[0].isoformat() if firing else None,
+                next_value=firing[1] if firing else None)
+
+def create_schedule(fields):
+    """
+    Create a schedule.
+    
+    Args:
+        fields (dict): Validated column values.
+    
+    Returns:
+        dict: The new schedule.
+    """
+    schedule = ControlSchedule(**fields)
+    db.session.add(schedule)
+    db.session.commit()
+    
+    return get_schedule(schedule.id)
+
+def update_schedule(schedule_id, fields):
+    """
+    Update a schedule.
+    
+    Args:
+        schedule_id (int): The schedule ID.
+        fields (dict): Validated column values to change.
+    
+    Returns:
+        dict: Updated schedule or None if the schedule was not found.
+    """
+    schedule = ControlSchedule.query.get(schedule_id)
+    if not schedule:
+        return None
+    
+    for field, value in fields.items():
+        setattr(schedule, field, value)
+    # Changing the target replaces the other one
+    if fields.get('device_id'):
+        schedule.location = None
+    elif fields.get('location'):
+        schedule.device_id = None
+    schedule.updated_at = datetime.utcnow()
+    db.session.commit()
+    
+    return get_schedule(schedule_id)
+
+def delete_schedule(schedule_id):
+    """
+    Delete a schedule.
+    
+    Args:
+        schedule_id (int): The schedule ID.
+    
+    Returns:
+        bool: True if the schedule was deleted, False if it was not found.
+    """
+    deleted = ControlSchedule.query.filter_by(id=schedule_id).delete()
+    db.session.commit()
+    return deleted == 1
+
+def run_schedule_job(app):
+    """
+    Scheduler entry point firing due control schedules.
+    
+    Args:
+        app (Flask): The Flask application.
+    """
+    with app.app_context():
+        try:
+            schedule_engine.fire_due()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Error firing control schedules: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,216 @@
+"""
+Live telemetry fan-out for the Exhaust Fan IoT System.
+
+Processed device readings are published to a process-wide hub that pushes
+them to Server-Sent Events subscribers. Each event is encoded once and
+appended to the bounded buffer of every interested subscriber; a slow
+client loses its oldest events instead of holding up ingestion.
+
+Device online/offline transitions travel the same way as ``status``
+events (marked by their ``type`` key).
+
+Readings are processed by the ingest process, so there the hub relays each
+event to ``telemetry/<device_id>`` and the web workers feed their own hubs
+from that topic.
+"""
+
+import json
+import threading
+import time
+from collections import deque
+
+def encode_event(event, name='reading'):
+    """
+    Encode an event as a Server-Sent Events frame.
+    
+    Args:
+        event (dict): JSON-serializable event data.
+        name (str): SSE event name.
+    
+    Returns:
+        str: The encoded frame.
+    """
+    return f'event: {name}\ndata: {json.dumps(event)}\n\n'
+
+class TelemetrySubscription:
+    """Bounded event buffer of a single stream client."""
+    
+    def __init__(self, device_ids, buffer_size):
+        self.device_ids = frozenset(device_ids) if device_ids else None
+        self.dropped = 0
+        self._frames = deque(maxlen=buffer_size)
+        self._ready = threading.Condition()
+    
+    def push(self, frame):
+        """Append a frame, dropping the oldest one when the buffer is full."""
+        with self._ready:
+            if len(self._frames) == self._frames.maxlen:
+                self.dropped += 1
+            self._frames.append(frame)
+            self._ready.notify()
+    
+    def wait(self, timeout):
+        """
+        Wait for buffered frames and take all of them.
+        
+        Args:
+            timeout (float): Maximum seconds to wait.
+        
+        Returns:
+            list: The buffered frames, empty if the timeout expired.
+        """
+        with self._ready:
+            if not self._frames:
+                self._ready.wait(timeout)
+            frames = list(self._frames)
+            self._frames.clear()
+            return frames
+
+class TelemetryHub:
+    """Process-wide registry of live telemetry subscribers."""
+    
+    def __init__(self, app=None):
+        self.buffer_size = 100
+        self.heartbeat_interval = 15.0
+        self.max_clients = 20
+        self.relay = None
+        self._all = set()
+        self._by_device = {}
+        self._count = 0
+        self._lock = threading.Lock()
+        
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """
+        Configure the hub from the app config.
+        
+        Args:
+            app (Flask): The Flask application.
+        """
+        self.buffer_size = app.config['TELEMETRY_BUFFER_SIZE']
+        self.heartbeat_interval = app.config['TELEMETRY_HEARTBEAT_INTERVAL']
+        self.max_clients = app.config['TELEMETRY_MAX_CLIENTS']
+    
+    @property
+    def client_count(self):
+        """Number of connected subscribers."""
+        return self._count
+    
+    def subscribe(self, device_ids=None):
+        """
+        Register a new subscriber.
+        
+        Args:
+            device_ids (list, optional): Devices to receive events for, or
+                None for all devices.
+        
+        Returns:
+            TelemetrySubscription: The subscription, or None if the hub
+            already serves ``max_clients`` subscribers.
+        """
+        subscription = TelemetrySubscription(device_ids, self.buffer_size)
+        
+        with self._lock:
+            if self._count >= self.max_clients:
+                return None
+            self._count += 1
+            if subscription.device_ids is None:
+                self._all.add(subscription)
+            else:
+                for device_id in subscription.device_ids:
+                    self._by_device.setdefault(device_id, set()).add(subscription)
+        
+        return subscription
+    
+    def unsubscribe(self, subscription):
+        """
+        Remove a subscriber.
+        
+        Args:
+            subscription (TelemetrySubscription): The subscription to remove.
+        """
+        with self._lock:
+            if subscription.device_ids is None:
+                if subscription not in self._all:
+                    return
+                self._all.discard(subscription)
+            else:
+                removed = False
+                for device_id in subscription.device_ids:
+                    subs = self._by_device.get(device_id)
+                    if subs is not None and subscription in subs:
+                        removed = True
+                        subs.discard(subscription)
+                        if not subs:
+                            del self._by_device[device_id]
+                if not removed:
+                    return
+            self._count -= 1
+    
+    def publish(self, event):
+        """
+        Push an event to local subscribers and to the relay, if one is set.
+        
+        Args:
+            event (dict): Event data with at least a ``device_id`` key.
+        """
+        if self.relay is not None:
+            self.relay(event)
+        self.dispatch(event)
+    
+    def dispatch(self, event):
+        """
+        Push an event to the subscribers of this process only.
+        
+        Args:
+            event (dict): Event data with at least a ``device_id`` key.
+        """
+        with self._lock:
+            targets = list(self._all)
+            targets.extend(self._by_device.get(event.get('device_id'), ()))
+        
+        if not targets:
+            return
+        
+        frame = encode_event(event, event.get('type', 'reading'))
+        for subscription in targets:
+            subscription.push(frame)
+    
+    def stream(self, subscription):
+        """
+        Generate the SSE body for a subscription until the client disconnects.
+        
+        A comment line is sent whenever no event arrived for
+        ``heartbeat_interval`` seconds, which keeps proxies from closing the
+        connection and lets the server notice clients that went away.
+        
+        Args:
+            subscription (TelemetrySubscription): The subscription to stream.
+        
+        Yields:
+            str: SSE frames.
+        """
+        try:
+            yield f'retry: {int(self.heartbeat_interval * 1000)}\n\n'
+            last_sent = time.monotonic()
+            reported_drops = 0
+            
+            while True:
+                frames = subscription.wait(self.heartbeat_interval)
+                if subscription.dropped > reported_drops:
+                    # Tell the client it fell behind and missed events
+                    reported_drops = subscription.dropped
+                    frames.insert(0, encode_event({'dropped': reported_drops}, 'dropped'))
+                if frames:
+                    yield ''.join(frames)
+                    last_sent = time.monotonic()
+                elif time.monotonic() - last_sent >= self.heartbeat_interval:
+                    yield ': heartbeat\n\n'
+                    last_sent = time.monotonic()
+        finally:
+            self.unsubscribe(subscription)
+
+# Process-wide telemetry hub
+telemetry_hub = TelemetryHub()
\ No newline at end of file
@@ -0,0 +1,134 @@
+"""
+Storage backends for the Exhaust Fan IoT System.
+
+Model helpers write through the process-wide ``storage`` handle, which
+delegates to the backend matching the configured database: SQLite tuned
+for concurrent processes on one file, or PostgreSQL/TimescaleDB with
+partitioned time-series tables and ``COPY`` bulk loading.
+"""
+
+from sqlalchemy.engine import make_url
+from database import db
+from storage.base import StorageBackend
+from storage.sqlite import SQLiteStorage
+from storage.postgres import PostgresStorage
+
+# Backends by name, as used by STORAGE_BACKEND and database URI schemes;
+# 'generic' turns off all engine-specific tuning
+BACKENDS = {
+    'generic': StorageBackend,
+    'sqlite': SQLiteStorage,
+    'postgresql': PostgresStorage
+}
+
+def create_backend(config):
+    """
+    Create the storage backend for a configuration.
+    
+    Args:
+        config (dict): Flask config with ``STORAGE_BACKEND`` and
+            ``SQLALCHEMY_DATABASE_URI``.
+    
+    Returns:
+        StorageBackend: The backend; the generic one for other databases.
+    
+    Raises:
+        ValueError: If ``STORAGE_BACKEND`` names an unknown backend.
+    """
+    name = config.get('STORAGE_BACKEND', 'auto')
+    if name == 'auto':
+        name = make_url(config['SQLALCHEMY_DATABASE_URI']).get_backend_name()
+    elif name not in BACKENDS:
+        raise ValueError(f'Unknown storage backend: {name}')
+    
+    return BACKENDS.get(name, StorageBackend)(config)
+
+class Storage:
+    """Process-wide handle on the configured storage backend."""
+    
+    def __init__(self, app=None):
+        # Plain SQLAlchemy until an app is configured
+        self.backend = StorageBackend()
+        
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """
+        Select and set up the backend for an app.
+        
+        Must run after ``db.init_app`` and before the engine is first used.
+        
+        Args:
+            app (Flask): The Flask application.
+        """
+        self.backend = create_backend(app.config)
+        self.backend.init_app(app)
+    
+    @property
+    def name(self):
+        """str: Name of the active backend."""
+        return self.backend.name
+    
+    @property
+    def maintenance_interval(self):
+        """int: Seconds between runs of the backend's housekeeping."""
+        return self.backend.maintenance_interval
+    
+    def create_all(self):
+        """Create all missing tables."""
+        self.backend.create_all()
+    
+    def bulk_insert(self, model, rows, ignore_conflicts=False):
+        """
+        Insert many rows within the current transaction.
+        
+        Args:
+            model (db.Model): The model to insert into.
+            rows (list): List of dicts of column values.
+            ignore_conflicts (bool): Skip rows that would violate a unique
+                index instead of failing the transaction.
+        
+        Returns:
+            int: Number of rows submitted.
+        """
+        return self.backend.bulk_insert(model, rows, ignore_conflicts)
+    
+    def drop_partitions(self, model, cutoff):
+        """
+        Drop whole time partitions of a table that end before a cutoff.
+        
+        Args:
+            model (db.Model): Time-series model.
+            cutoff (datetime): Partitions entirely older than this are dropped.
+        
+        Returns:
+            int: Number of partitions dropped.
+        """
+        return self.backend.drop_partitions(model, cutoff)
+    
+    def maintain(self, now=None):
+        """
+        Run the backend's periodic housekeeping.
+        
+        Args:
+            now (datetime, optional): Reference time, defaults to the current time.
+        """
+        self.backend.maintain(now)
+
+def run_storage_maintenance(app):
+    """
+    Scheduler entry point for storage housekeeping.
+    
+    Args:
+        app (Flask): The Flask application.
+    """
+    with app.app_context():
+        try:
+            storage.maintain()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Error running storage maintenance: {str(e)}")
+
+# Process-wide storage handle
+storage = Storage()
\ No newline at end of file
@@ -0,0 +1,122 @@
+"""
+Generic storage backend for the Exhaust Fan IoT System.
+"""
+
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from database import db
+
+class StorageBackend:
+    """
+    Storage operations that depend on the database engine.
+    
+    The base implementation uses plain SQLAlchemy and works with any
+    database; subclasses tune connections and replace the bulk write and
+    time-series maintenance paths for their engine.
+    """
+    
+    name = 'generic'
+    
+    def __init__(self, config=None):
+        self.config = config or {}
+        # Seconds between runs of maintain()
+        self.maintenance_interval = self.config.get('STORAGE_MAINTENANCE_INTERVAL', 3600)
+    
+    def init_app(self, app):
+        """
+        Apply the engine options and connection hook to the app's engine.
+        
+        Must run after ``db.init_app`` and before the engine is first used,
+        since engine options only apply when it is created.
+        
+        Args:
+            app (Flask): The Flask application.
+        """
+        options = self.engine_options()
+        options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+        
+        with app.app_context():
+            event.listen(db.engine, 'connect', self.on_connect)
+    
+    def engine_options(self):
+        """
+        Get SQLAlchemy engine options for this backend.
+        
+        Returns:
+            dict: Keyword arguments for ``create_engine``.
+        """
+        return {}
+    
+    def on_connect(self, dbapi_connection, connection_record):
+        """Configure a new DBAPI connection."""
+        pass
+    
+    def create_all(self):
+        """Create all missing tables."""
+        db.create_all()
+    
+    def bulk_insert(self, model, rows, ignore_conflicts=False):
+        """
+        Insert many rows within the current transaction.
+        
+        Args:
+            model (db.Model): The model to insert into.
+            rows (list): List of dicts of column values.
+            ignore_conflicts (bool): Skip rows that would violate a unique
+                index instead of failing the transaction.
+        
+        Returns:
+            int: Number of rows submitted.
+        """
+        if not rows:
+            return 0
+        
+        if ignore_conflicts:
+            db.session.execute(self.insert_ignoring(model.__table__), rows)
+        else:
+            db.session.bulk_insert_mappings(model, rows)
+        
+        return len(rows)
+    
+    def insert_ignoring(self, table):
+        """
+        Build an INSERT that skips rows conflicting with a unique index.
+        
+        Args:
+            table (Table): The table to insert into.
+        
+        Returns:
+            Insert: The statement; a plain INSERT on engines without an
+            equivalent, where conflicts still raise.
+        """
+        dialect = db.engine.dialect.name
+        if dialect == 'sqlite':
+            return sqlite.insert(table).on_conflict_do_nothing()
+        if dialect == 'postgresql':
+            return postgresql.insert(table).on_conflict_do_nothing()
+        if dialect == 'mysql':
+            return table.insert().prefix_with('IGNORE')
+        return table.insert()
+    
+    def drop_partitions(self, model, cutoff):
+        """
+        Drop whole time partitions of a table that end before a cutoff.
+        
+        Args:
+            model (db.Model): Time-series model.
+            cutoff (datetime): Partitions entirely older than this are dropped.
+        
+        Returns:
+            int: Number of partitions dropped.
+        """
+        return 0
+    
+    def maintain(self, now=None):
+        """
+        Run periodic housekeeping, such as creating upcoming partitions.
+        
+        Args:
+            now (datetime, optional): Reference time, defaults to the current time.
+        """
+        pass
\ No newline at end of file
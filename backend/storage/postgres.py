@@ -0,0 +1,279 @@
+"""
+PostgreSQL / TimescaleDB storage backend for the Exhaust Fan IoT System.
+"""
+
+import io
+import re
+import csv
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import Column, ForeignKey, MetaData, Table, inspect, text
+from database import db
+from storage.base import StorageBackend
+from utils.time_utils import bucket_start
+
+# Time-series tables and the column they are partitioned on
+PARTITIONED_TABLES = {
+    'sensor_data': 'timestamp',
+    'control_history': 'timestamp'
+}
+
+# Upper bound of a range partition as shown by pg_get_expr
+_UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+# Written for NULL in COPY data so empty strings stay empty strings
+_COPY_NULL = '\\N'
+
+def _partitioned_copy(table, column_name, partition_by=None):
+    """
+    Build a copy of a model table keyed for time partitioning.
+    
+    PostgreSQL requires the partition column to be part of the primary key,
+    so it is added to it and made NOT NULL. Indexes are left out; they are
+    created on the parent table by ``upgrade_schema``.
+    
+    Args:
+        table (Table): The model table.
+        column_name (str): Column to partition on.
+        partition_by (str, optional): ``PARTITION BY`` clause for native
+            partitioning.
+    
+    Returns:
+        Table: The table to create.
+    """
+    metadata = MetaData()
+    for foreign_key in table.foreign_keys:
+        foreign_key.column.table.to_metadata(metadata)
+    
+    columns = []
+    for column in table.columns:
+        is_key = column.name == column_name
+        columns.append(Column(
+            column.name,
+            column.type,
+            *[ForeignKey(foreign_key.target_fullname) for foreign_key in column.foreign_keys],
+            primary_key=column.primary_key or is_key,
+            nullable=column.nullable and not is_key and not column.primary_key,
+            autoincrement=column.primary_key
+        ))
+    
+    options = {'postgresql_partition_by': partition_by} if partition_by else {}
+    return Table(table.name, metadata, *columns, **options)
+
+def _copy_value(value):
+    return _COPY_NULL if value is None else value
+
+class PostgresStorage(StorageBackend):
+    """
+    PostgreSQL with time-partitioned sensor and control tables.
+    
+    With the TimescaleDB extension the tables become hypertables and
+    TimescaleDB manages the chunks; otherwise native range partitions of
+    ``STORAGE_PARTITION_DAYS`` are created ahead of time by ``maintain``,
+    with a default partition catching anything outside them. Bulk writes
+    use ``COPY`` when the driver supports it (psycopg2).
+    """
+    
+    name = 'postgresql'
+    
+    def __init__(self, config=None):
+        super().__init__(config)
+        self.timescale = str(self.config.get('STORAGE_TIMESCALE', 'auto')).lower()
+        self.partition_interval = timedelta(days=self.config.get('STORAGE_PARTITION_DAYS', 7))
+        self.partitions_ahead = self.config.get('STORAGE_PARTITIONS_AHEAD', 2)
+        self._uses_timescale = None
+    
+    def engine_options(self):
+        # Server connections can be dropped while the pool holds them
+        return {'pool_pre_ping': True}
+    
+    def uses_timescale(self):
+        """
+        Check whether time-series tables are TimescaleDB hypertables.
+        
+        Returns:
+            bool: True if TimescaleDB is used.
+        """
+        if self._uses_timescale is None:
+            if self.timescale == 'auto':
+                installed = db.session.execute(text(
+                    "SELECT 1 FROM pg_extension WHERE extname = 'timescaledb'"
+                )).scalar()
+                self._uses_timescale = bool(installed)
+            else:
+                self._uses_timescale = self.timescale == 'true'
+        
+        return self._uses_timescale
+    
+    def create_all(self):
+        """Create missing tables, partitioning the time-series ones."""
+        tables = db.metadata.sorted_tables
+        db.metadata.create_all(bind=db.engine,
+                               tables=[table for table in tables if table.name not in PARTITIONED_TABLES])
+        
+        inspector = inspect(db.engine)
+        for table in tables:
+            column_name = PARTITIONED_TABLES.get(table.name)
+            if column_name is None or inspector.has_table(table.name):
+                continue
+            
+            if self.uses_timescale():
+                _partitioned_copy(table, column_name).create(bind=db.engine)
+                with db.engine.begin() as connection:
+                    connection.execute(text(
+                        'SELECT create_hypertable(:table, :column, chunk_time_interval => :interval, '
+                        'if_not_exists => TRUE)'
+                    ), {'table': table.name, 'column': column_name,
+                        'interval': self.partition_interval})
+            else:
+                _partitioned_copy(table, column_name, f'RANGE ({column_name})').create(bind=db.engine)
+                with db.engine.begin() as connection:
+                    connection.execute(text(
+                        f'CREATE TABLE {table.name}_default PARTITION OF {table.name} DEFAULT'
+                    ))
+        
+        self.maintain()
+    
+    def bulk_insert(self, model, rows, ignore_conflicts=False):
+        """
+        Insert many rows with ``COPY`` within the current transaction.
+        
+        Columns missing from the rows get their model defaults, since
+        ``COPY`` bypasses the ORM. ``COPY`` cannot skip duplicates, so with
+        ``ignore_conflicts`` the rows are copied into a temporary staging
+        table and moved over with ``INSERT ... ON CONFLICT DO NOTHING``.
+        Falls back to an executemany insert for drivers without
+        ``copy_expert``.
+        
+        Args:
+            model (db.Model): The model to insert into.
+            rows (list): List of dicts of column values.
+            ignore_conflicts (bool): Skip rows that would violate a unique
+                index instead of failing the transaction.
+        
+        Returns:
+            int: Number of rows submitted.
+        """
+        if not rows:
+            return 0
+        
+        connection = db.session.connection()
+        cursor = connection.connection.cursor()
+        if not hasattr(cursor, 'copy_expert'):
+            cursor.close()
+            return super().bulk_insert(model, rows, ignore_conflicts)
+        
+        table = model.__table__
+        columns = [column for column in table.columns
+                   if column.name in rows[0] or (column.default is not None and not column.primary_key)]
+        defaults = {column.name: column.default.arg for column in columns
+                    if column.default is not None}
+        
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            values = []
+            for column in columns:
+                if column.name in row:
+                    values.append(_copy_value(row[column.name]))
+                else:
+                    default = defaults.get(column.name)
+                    values.append(_copy_value(default(None) if callable(default) else default))
+            writer.writerow(values)
+        buffer.seek(0)
+        
+        quote = connection.dialect.identifier_preparer.quote
+        column_list = ', '.join(quote(column.name) for column in columns)
+        target = quote(table.name)
+        try:
+            if ignore_conflicts:
+                target = quote(f'{table.name}_staging')
+                cursor.execute(
+                    f'CREATE TEMP TABLE IF NOT EXISTS {target} ON COMMIT DROP AS '
+                    f'SELECT {column_list} FROM {quote(table.name)} WITH NO DATA'
+                )
+            
+            cursor.copy_expert(
+                f"COPY {target} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '{_COPY_NULL}')",
+                buffer
+            )
+            
+            if ignore_conflicts:
+                cursor.execute(
+                    f'INSERT INTO {quote(table.name)} ({column_list}) '
+                    f'SELECT {column_list} FROM {target} ON CONFLICT DO NOTHING'
+                )
+                cursor.execute(f'TRUNCATE {target}')
+        finally:
+            cursor.close()
+        
+        return len(rows)
+    
+    def drop_partitions(self, model, cutoff):
+        """
+        Drop whole time partitions of a table that end before a cutoff.
+        
+        Args:
+            model (db.Model): Time-series model.
+            cutoff (datetime): Partitions entirely older than this are dropped.
+        
+        Returns:
+            int: Number of partitions dropped.
+        """
+        table_name = model.__tablename__
+        if table_name not in PARTITIONED_TABLES:
+            return 0
+        
+        if self.uses_timescale():
+            dropped = db.session.execute(text(
+                'SELECT drop_chunks(CAST(:table AS regclass), older_than => :cutoff)'
+            ), {'table': table_name, 'cutoff': cutoff}).fetchall()
+            db.session.commit()
+            return len(dropped)
+        
+        partitions = db.session.execute(text(
+            'SELECT child.relname, pg_get_expr(child.relpartbound, child.oid) '
+            'FROM pg_inherits JOIN pg_class parent ON parent.oid = pg_inherits.inhparent '
+            'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'WHERE parent.relname = :table'
+        ), {'table': table_name}).fetchall()
+        
+        dropped = 0
+        for name, bound in partitions:
+            match = _UPPER_BOUND.search(bound or '')
+            if match and datetime.fromisoformat(match.group(1)) <= cutoff:
+                db.session.execute(text(f'DROP TABLE {name}'))
+                dropped += 1
+        
+        db.session.commit()
+        return dropped
+    
+    def maintain(self, now=None):
+        """
+        Create the native partitions for the current and upcoming intervals.
+        
+        Args:
+            now (datetime, optional): Reference time, defaults to the current time.
+        """
+        if self.uses_timescale():
+            return
+        
+        interval = int(self.partition_interval.total_seconds())
+        start = bucket_start(now or datetime.utcnow(), interval)
+        
+        for table_name in PARTITIONED_TABLES:
+            for step in range(self.partitions_ahead + 1):
+                lower = start + step * self.partition_interval
+                upper = lower + self.partition_interval
+                try:
+                    with db.engine.begin() as connection:
+                        connection.execute(text(
+                            f'CREATE TABLE IF NOT EXISTS {table_name}_p{lower:%Y%m%d} '
+                            f'PARTITION OF {table_name} '
+                            f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+                        ))
+                except Exception as e:
+                    # Typically rows for this range already landed in the default partition
+                    current_app.logger.error(
+                        f"Error creating partition {table_name}_p{lower:%Y%m%d}: {str(e)}"
+                    )
\ No newline at end of file
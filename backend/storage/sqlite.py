@@ -0,0 +1,136 @@
+"""
+SQLite storage backend for the Exhaust Fan IoT System.
+"""
+
+import time
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+import metrics
+from database import db
+from storage.base import StorageBackend
+
+SYNCHRONOUS_LEVELS = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+TEMP_STORES = ('DEFAULT', 'FILE', 'MEMORY')
+
+# Defaults for the settings not configured explicitly. 'default' matches
+# SQLite's own values and a connection per session (as Flask-SQLAlchemy
+# does for SQLite); 'pi' trades some memory for fewer SD card reads and
+# keeps connections open for the threaded gunicorn workers.
+SQLITE_PROFILES = {
+    'default': {
+        'cache_size': 2000,  # KiB per connection
+        'mmap_size': 0,  # bytes
+        'temp_store': 'DEFAULT',
+        'wal_autocheckpoint': 1000,  # pages
+        'journal_size_limit': -1,  # bytes, -1 for no limit
+        'pool_size': 0,  # 0 opens a connection per session
+        'pool_overflow': 0,
+        'checkpoint_interval': 300  # seconds
+    },
+    'pi': {
+        'cache_size': 4096,
+        'mmap_size': 128 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'wal_autocheckpoint': 4000,
+        'journal_size_limit': 32 * 1024 * 1024,
+        'pool_size': 4,
+        'pool_overflow': 8,
+        'checkpoint_interval': 60
+    }
+}
+
+class SQLiteStorage(StorageBackend):
+    """
+    SQLite tuned for several processes writing to one database file.
+    
+    WAL journaling lets readers run alongside the single writer, and the
+    busy timeout makes a writer wait for the lock instead of failing with
+    ``database is locked``. ``synchronous=NORMAL`` only syncs at WAL
+    checkpoints, which is durable against application crashes and much
+    cheaper on SD cards.
+    
+    Cache, memory mapping and pool sizes come from ``SQLITE_PROFILE`` unless
+    set individually. ``maintain`` runs a passive WAL checkpoint, so the WAL
+    is usually copied back by the scheduler instead of inline by whichever
+    writer commits when it passes ``wal_autocheckpoint`` pages.
+    """
+    
+    name = 'sqlite'
+    
+    def __init__(self, config=None):
+        super().__init__(config)
+        profile_name = self.config.get('SQLITE_PROFILE', 'default')
+        if profile_name not in SQLITE_PROFILES:
+            raise ValueError(f'SQLITE_PROFILE must be one of {", ".join(SQLITE_PROFILES)}')
+        
+        profile = SQLITE_PROFILES[profile_name]
+        
+        def setting(name, convert=int):
+            value = self.config.get(f'SQLITE_{name.upper()}')
+            return convert(value) if value not in (None, '') else profile[name]
+        
+        self.profile = profile_name
+        self.synchronous = self.config.get('SQLITE_SYNCHRONOUS', 'NORMAL').upper()
+        self.busy_timeout = self.config.get('SQLITE_BUSY_TIMEOUT', 30.0)
+        self.cache_size = setting('cache_size')
+        self.mmap_size = setting('mmap_size')
+        self.temp_store = setting('temp_store', str).upper()
+        self.wal_autocheckpoint = profile['wal_autocheckpoint']
+        self.journal_size_limit = profile['journal_size_limit']
+        self.pool_size = setting('pool_size')
+        self.pool_overflow = setting('pool_overflow')
+        self.maintenance_interval = setting('checkpoint_interval')
+        
+        if self.synchronous not in SYNCHRONOUS_LEVELS:
+            raise ValueError(f'SQLITE_SYNCHRONOUS must be one of {", ".join(SYNCHRONOUS_LEVELS)}')
+        if self.temp_store not in TEMP_STORES:
+            raise ValueError(f'SQLITE_TEMP_STORE must be one of {", ".join(TEMP_STORES)}')
+    
+    def engine_options(self):
+        # The sqlite3 module applies its own lock timeout before the pragma runs
+        options = {'connect_args': {'timeout': self.busy_timeout}}
+        
+        database = make_url(self.config.get('SQLALCHEMY_DATABASE_URI', 'sqlite://')).database
+        if self.pool_size and database not in (None, '', ':memory:'):
+            # Pooled connections are handed between request threads
+            options['connect_args']['check_same_thread'] = False
+            options.update({
+                'poolclass': QueuePool,
+                'pool_size': self.pool_size,
+                'max_overflow': self.pool_overflow
+            })
+        
+        return options
+    
+    def on_connect(self, dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute(f'PRAGMA synchronous={self.synchronous}')
+        cursor.execute(f'PRAGMA busy_timeout={int(self.busy_timeout * 1000)}')
+        # A negative cache size is in KiB rather than pages
+        cursor.execute(f'PRAGMA cache_size={-abs(self.cache_size)}')
+        cursor.execute(f'PRAGMA mmap_size={self.mmap_size}')
+        cursor.execute(f'PRAGMA temp_store={self.temp_store}')
+        cursor.execute(f'PRAGMA wal_autocheckpoint={self.wal_autocheckpoint}')
+        cursor.execute(f'PRAGMA journal_size_limit={self.journal_size_limit}')
+        cursor.close()
+    
+    def maintain(self, now=None):
+        """
+        Copy committed WAL pages back into the database file.
+        
+        Runs a passive checkpoint, which never waits for readers or the
+        writer; pages still in use are left for the next run.
+        
+        Args:
+            now (datetime, optional): Unused, for interface compatibility.
+        """
+        started = time.perf_counter()
+        with db.engine.connect() as connection:
+            busy, wal_pages, checkpointed = connection.exec_driver_sql(
+                'PRAGMA wal_checkpoint(PASSIVE)'
+            ).one()
+        
+        metrics.db_checkpoint_duration.observe(time.perf_counter() - started)
+        metrics.db_wal_pages.set(max(wal_pages, 0))
+        metrics.db_wal_pages_pending.set(max(wal_pages - checkpointed, 0))
\ No newline at end of file
@@ -0,0 +1,7 @@
+"""
+Package initialization for the utils module.
+"""
+
+# Import helpers so they can be imported from the utils package
+from utils.time_utils import parse_timestamp, bucket_start
+from utils.pagination import encode_cursor, decode_cursor, keyset_page
\ No newline at end of file
@@ -0,0 +1,115 @@
+"""
+HTTP response caching helpers for the Exhaust Fan IoT System.
+
+Serialized JSON bodies are kept per resource together with a strong ETag.
+Within the TTL a cached body is served without touching the data source;
+after that it is still reused, without re-encoding, as long as the version
+of the underlying data is unchanged.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, jsonify, request
+
+class CachedResponse:
+    """A serialized response body with its ETag and data version."""
+    
+    __slots__ = ('version', 'body', 'etag', 'cached_at')
+    
+    def __init__(self, version, body):
+        self.version = version
+        self.body = body
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.cached_at = time.monotonic()
+
+class ResponseCache:
+    """Bounded, short-lived cache of serialized JSON responses."""
+    
+    def __init__(self, app=None):
+        self.ttl = 1.0
+        self.max_entries = 1024
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """
+        Configure the cache from the app config.
+        
+        Args:
+            app (Flask): The Flask application.
+        """
+        self.ttl = app.config['RESPONSE_CACHE_TTL']
+        self.max_entries = app.config['RESPONSE_CACHE_MAX_ENTRIES']
+    
+    def get(self, key):
+        """
+        Get a cached response that is younger than the TTL.
+        
+        Args:
+            key (str): The resource key.
+        
+        Returns:
+            CachedResponse: The cached response or None.
+        """
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and time.monotonic() - cached.cached_at < self.ttl:
+                return cached
+        return None
+    
+    def put(self, key, version, payload):
+        """
+        Cache the response for a payload, reusing the body of the same version.
+        
+        Args:
+            key (str): The resource key.
+            version (int): Version of the data the payload was built from.
+            payload (dict): The JSON payload.
+        
+        Returns:
+            CachedResponse: The cached response.
+        """
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached.version == version:
+                cached.cached_at = time.monotonic()
+                self._entries.move_to_end(key)
+                return cached
+        
+        cached = CachedResponse(version, jsonify(payload).get_data())
+        
+        with self._lock:
+            self._entries[key] = cached
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return cached
+    
+    def clear(self):
+        """Drop all cached responses."""
+        with self._lock:
+            self._entries.clear()
+
+def conditional_response(cached):
+    """
+    Build a response for a cached body, honouring ``If-None-Match``.
+    
+    Args:
+        cached (CachedResponse): The cached response.
+    
+    Returns:
+        Response: A 200 response with the body, or a 304 without one if the
+        client already has the current representation.
+    """
+    response = current_app.response_class(cached.body, mimetype=current_app.config['JSONIFY_MIMETYPE'])
+    response.set_etag(cached.etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+# Process-wide response cache
+response_cache = ResponseCache()
\ No newline at end of file
@@ -0,0 +1,152 @@
+"""
+Logging setup for the Exhaust Fan IoT System.
+
+Log calls only format the record and put it on a bounded in-memory queue;
+a background listener thread does the file (and console) I/O. Records that
+carry a ``sample_key`` extra are rate-limited per key, so per-device
+messages stay bounded however large the fleet or the message rate gets.
+Output lines are JSON objects.
+"""
+
+import os
+import sys
+import copy
+import json
+import queue
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from flask.logging import default_handler
+
+# LogRecord attributes that are not user-supplied extras
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+    
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno
+        }
+        
+        # Structured context passed with extra={...}
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry and value is not None:
+                entry[key] = value
+        
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        
+        return json.dumps(entry, default=str)
+
+class SamplingFilter(logging.Filter):
+    """
+    Let through one record per ``sample_key`` per interval.
+    
+    Records without a ``sample_key`` extra always pass. The next record
+    emitted for a key reports how many were suppressed in between as
+    ``suppressed``.
+    """
+    
+    def __init__(self, interval=60.0, max_keys=10000):
+        super().__init__()
+        self.interval = interval
+        self.max_keys = max_keys
+        self._keys = {}
+        self._lock = threading.Lock()
+    
+    def filter(self, record):
+        key = getattr(record, 'sample_key', None)
+        if key is None:
+            return True
+        
+        now = time.monotonic()
+        with self._lock:
+            last, suppressed = self._keys.get(key, (None, 0))
+            if last is not None and now - last < self.interval:
+                self._keys[key] = (last, suppressed + 1)
+                return False
+            
+            if len(self._keys) >= self.max_keys:
+                # Forget keys whose window has passed to bound memory
+                self._keys = {k: v for k, v in self._keys.items() if now - v[0] < self.interval}
+            self._keys[key] = (now, 0)
+        
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+class DroppingQueueHandler(QueueHandler):
+    """Queue handler that drops records instead of blocking when the queue is full."""
+    
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+    
+    def prepare(self, record):
+        # Resolve the message and traceback now, but keep them apart so the
+        # JSON formatter can put the traceback in its own field
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+    
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def configure_logging(app):
+    """
+    Route the app logger through a queue to a JSON log file writer thread.
+    
+    Args:
+        app (Flask): The Flask application.
+    
+    Returns:
+        QueueListener: The started listener (stopped again at exit).
+    """
+    config = app.config
+    log_dir = os.path.dirname(config['LOG_FILE'])
+    if log_dir and not os.path.exists(log_dir):
+        os.makedirs(log_dir)
+    
+    handlers = []
+    
+    file_handler = RotatingFileHandler(config['LOG_FILE'], maxBytes=config['LOG_MAX_BYTES'],
+                                       backupCount=config['LOG_BACKUP_COUNT'])
+    file_handler.setFormatter(JsonFormatter())
+    handlers.append(file_handler)
+    
+    if config['LOG_TO_STDOUT']:
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(JsonFormatter())
+        handlers.append(stream_handler)
+    
+    log_queue = queue.Queue(maxsize=config['LOG_QUEUE_SIZE'])
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(config['LOG_SAMPLE_INTERVAL']))
+    
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    
+    # Flask's default stderr handler would write synchronously in the caller
+    app.logger.removeHandler(default_handler)
+    app.logger.addHandler(queue_handler)
+    app.logger.setLevel(config['LOG_LEVEL'])
+    return listener
\ No newline at end of file
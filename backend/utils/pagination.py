@@ -0,0 +1,87 @@
+"""
+Keyset pagination helpers for the Exhaust Fan IoT System.
+
+History endpoints page on (timestamp, id), newest first. The cursor is the
+key of the last row of a page, so each page costs one index range scan no
+matter how deep into the history it is.
+"""
+
+import base64
+import binascii
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+def encode_cursor(timestamp, row_id):
+    """
+    Encode the key of a row as an opaque cursor string.
+    
+    Args:
+        timestamp (datetime): Row timestamp.
+        row_id (int): Row primary key.
+        
+    Returns:
+        str: URL-safe cursor.
+    """
+    raw = f'{timestamp.isoformat()}|{row_id}'.encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by ``encode_cursor``.
+    
+    Args:
+        cursor (str): The cursor string.
+        
+    Returns:
+        tuple: (timestamp, row_id).
+        
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, row_id = base64.urlsafe_b64decode(padded).decode('utf-8').split('|')
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (TypeError, UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError('Invalid cursor') from e
+
+def keyset_page(query, model, start=None, end=None, cursor=None, limit=100):
+    """
+    Fetch one page of a timestamped query, newest first.
+    
+    Args:
+        query (Query): Base query, already filtered (e.g. by device).
+        model (db.Model): Model with ``timestamp`` and ``id`` columns.
+        start (datetime, optional): Inclusive lower time bound.
+        end (datetime, optional): Exclusive upper time bound.
+        cursor (str, optional): Cursor returned with the previous page.
+        limit (int): Page size.
+        
+    Returns:
+        tuple: (list of records, next cursor or None when there are no more).
+        
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    if start is not None:
+        query = query.filter(model.timestamp >= start)
+    if end is not None:
+        query = query.filter(model.timestamp < end)
+    
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            model.timestamp < timestamp,
+            and_(model.timestamp == timestamp, model.id < row_id)
+        ))
+    
+    # Fetch one extra row to learn whether another page exists
+    rows = query.order_by(model.timestamp.desc(), model.id.desc()) \
+                .limit(limit + 1) \
+                .all()
+    
+    if len(rows) <= limit:
+        return rows, None
+    
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].timestamp, rows[-1].id)
\ No newline at end of file
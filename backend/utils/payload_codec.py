@@ -0,0 +1,148 @@
+"""
+Device message decoding for the Exhaust Fan IoT System.
+
+Devices report either a JSON object or a fixed-layout binary frame. A
+binary frame starts with ``BINARY_MARKER``, a byte that cannot begin a
+JSON document, so the encoding is detected from the first byte on any
+topic; firmware built with ``USE_BINARY_PAYLOAD`` also publishes to
+``device/<device_id>/bin``, where a frame without the marker is rejected.
+
+Binary frame (little endian, 13 bytes, plus the acknowledged command ID):
+
+    offset  size  field
+    0       1     marker (0xFE)
+    1       1     version (2)
+    2       1     flags: bit 0 fan on, bit 1 auto mode, bit 2 temperature
+                  present, bit 3 command ID follows
+    3       2     temperature in hundredths of a degree Celsius (int16)
+    5       8     device timestamp in milliseconds (uint64), since the
+                  epoch once the device clock is synchronized
+    13      32    ID of the last applied command (ASCII hex), if flagged
+
+Version 1 frames carry a 4-byte uptime (uint32) as the timestamp instead.
+
+Both encodings decode to the same dict keys (``temperature``, ``fan``,
+``auto``, ``timestamp`` and ``ack``).
+"""
+
+import json
+import struct
+
+BINARY_MARKER = 0xFE
+BINARY_VERSION = 2
+BINARY_TOPIC_SUFFIX = 'bin'
+
+FLAG_FAN = 0x01
+FLAG_AUTO = 0x02
+FLAG_TEMPERATURE = 0x04
+FLAG_ACK = 0x08
+
+COMMAND_ID_SIZE = 32
+
+_FRAMES = {
+    1: struct.Struct('<BBBhI'),
+    2: struct.Struct('<BBBhQ')
+}
+_MARKER_BYTE = bytes([BINARY_MARKER])
+
+def device_topic_id(topic):
+    """
+    Get the device ID from a ``device/<device_id>[/bin]`` topic.
+    
+    Args:
+        topic (str): The MQTT topic.
+    
+    Returns:
+        str: The device ID.
+    """
+    parts = topic.split('/')
+    if len(parts) > 2 and parts[-1] == BINARY_TOPIC_SUFFIX:
+        return parts[-2]
+    return parts[-1]
+
+def decode_binary(payload):
+    """
+    Decode a binary device frame.
+    
+    Args:
+        payload (bytes): The frame, starting with the marker byte.
+    
+    Returns:
+        dict: The decoded report.
+    
+    Raises:
+        ValueError: If the frame is truncated or of an unknown version.
+    """
+    frame = _FRAMES.get(payload[1]) if len(payload) > 1 else None
+    if frame is None:
+        raise ValueError('Unsupported binary frame version')
+    if len(payload) < frame.size:
+        raise ValueError(f'Binary frame of {len(payload)} bytes is too short')
+    
+    _, _, flags, centidegrees, timestamp = frame.unpack_from(payload)
+    
+    data = {
+        'fan': bool(flags & FLAG_FAN),
+        'auto': bool(flags & FLAG_AUTO),
+        'timestamp': timestamp
+    }
+    if flags & FLAG_TEMPERATURE:
+        data['temperature'] = centidegrees / 100
+    if flags & FLAG_ACK:
+        ack = payload[frame.size:frame.size + COMMAND_ID_SIZE]
+        if len(ack) != COMMAND_ID_SIZE:
+            raise ValueError('Binary frame command ID is truncated')
+        data['ack'] = ack.decode('ascii')
+    
+    return data
+
+def encode_binary(temperature=None, fan_status=False, auto_mode=True, timestamp=0, ack=None):
+    """
+    Encode a report as a binary device frame, as the firmware does.
+    
+    Args:
+        temperature (float, optional): Temperature in degrees Celsius.
+        fan_status (bool): Fan status.
+        auto_mode (bool): Auto mode status.
+        timestamp (int): Device timestamp in milliseconds.
+        ack (str, optional): ID of the last applied command.
+    
+    Returns:
+        bytes: The frame.
+    """
+    flags = (FLAG_FAN if fan_status else 0) | (FLAG_AUTO if auto_mode else 0)
+    centidegrees = 0
+    if temperature is not None:
+        flags |= FLAG_TEMPERATURE
+        centidegrees = int(round(temperature * 100))
+    if ack:
+        flags |= FLAG_ACK
+    
+    frame = _FRAMES[BINARY_VERSION].pack(BINARY_MARKER, BINARY_VERSION, flags, centidegrees, timestamp)
+    return frame + ack.encode('ascii') if ack else frame
+
+def decode_device_message(topic, payload):
+    """
+    Decode a device message in either encoding.
+    
+    Args:
+        topic (str): The MQTT topic.
+        payload (bytes): The message payload.
+    
+    Returns:
+        tuple: (device ID, decoded report dict, encoding name).
+    
+    Raises:
+        ValueError: If the payload cannot be decoded.
+    """
+    if payload[:1] == _MARKER_BYTE:
+        return device_topic_id(topic), decode_binary(payload), 'binary'
+    
+    if topic.endswith('/' + BINARY_TOPIC_SUFFIX):
+        raise ValueError('Binary topic payload does not start with the frame marker')
+    
+    data = json.loads(payload)
+    if not isinstance(data, dict):
+        raise ValueError('Device message is not a JSON object')
+    
+    return data.get('device_id') or device_topic_id(topic), data, 'json'
\ No newline at end of file
@@ -0,0 +1,59 @@
+"""
+Time helpers for the Exhaust Fan IoT System.
+"""
+
+from datetime import datetime, timezone
+
+# Epoch values above this are treated as milliseconds (year 5138 in seconds)
+_EPOCH_MS_THRESHOLD = 10 ** 11
+
+def parse_timestamp(value):
+    """
+    Parse a timestamp given as ISO 8601 text or as epoch seconds/milliseconds.
+    
+    Args:
+        value (str): The timestamp text. Empty values are allowed.
+    
+    Returns:
+        datetime: Naive UTC datetime, or None if value is empty.
+    
+    Raises:
+        ValueError: If the value cannot be parsed.
+    """
+    if value is None or value == '':
+        return None
+    
+    text = str(value).strip()
+    
+    try:
+        number = float(text)
+    except ValueError:
+        number = None
+    
+    if number is not None:
+        if number > _EPOCH_MS_THRESHOLD:
+            number /= 1000.0
+        return datetime.utcfromtimestamp(number)
+    
+    if text.endswith('Z'):
+        text = text[:-1] + '+00:00'
+    
+    parsed = datetime.fromisoformat(text)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    
+    return parsed
+
+def bucket_start(timestamp, resolution):
+    """
+    Floor a timestamp to the start of its fixed-width time bucket.
+    
+    Args:
+        timestamp (datetime): Naive UTC datetime.
+        resolution (int): Bucket width in seconds.
+    
+    Returns:
+        datetime: Start of the bucket containing the timestamp.
+    """
+    epoch = timestamp.replace(tzinfo=timezone.utc).timestamp()
+    return datetime.utcfromtimestamp(epoch - epoch % resolution)
@@ -15,17 +15,26 @@
 #define MQTT_USERNAME "mqtt_user"
 #define MQTT_PASSWORD "mqtt_password"
 
+// Time configuration
+#define NTP_SERVER "pool.ntp.org" // Or the Raspberry Pi if it serves NTP on an isolated network
+
 // Pin configuration
 #define RELAY_PIN_CONFIG 26   // GPIO pin connected to relay
 #define DHT_PIN_CONFIG 27     // GPIO pin connected to DHT22
 #define ONE_WIRE_BUS_CONFIG 5 // GPIO pin connected to DS18B20
 
+// Payload configuration
+#define USE_BINARY_PAYLOAD false // Set to true to publish compact binary frames to device/<id>/bin
+                                 // instead of JSON (supported by the backend alongside JSON)
+
 // Sensor configuration
 #define USE_DHT22 true // Set to false if using DS18B20
 
 // Temperature control parameters
 #define TEMP_THRESHOLD 35.0     // Temperature threshold to turn on fan (in Celsius)
 #define TEMP_HYSTERESIS 2.0     // Hysteresis to prevent rapid on/off switching
+#define SERVER_AUTOMATION false // Set to true when the backend runs automation (AUTOMATION_ENABLED);
+                                // local control then only runs while MQTT is disconnected
 
 // Timing configuration (in milliseconds)
 #define TEMP_CHECK_INTERVAL 10000  // Check temperature every 10 seconds
@@ -10,6 +10,7 @@
 #include <DHT.h>
 #include <OneWire.h>
 #include <DallasTemperature.h>
+#include <sys/time.h>
 #include "config.h"
 
 // Pin definitions
@@ -36,6 +37,7 @@ bool autoMode = true;
 unsigned long lastTempCheck = 0;
 unsigned long lastPublish = 0;
 char topic[50];
+char lastCommandId[33] = "";  // ID of the last applied command, echoed as "ack"
 
 void setup() {
   Serial.begin(115200);
@@ -54,12 +56,19 @@ void setup() {
   // Connect to WiFi
   setupWiFi();
   
+  // Synchronize the clock so readings carry their event time (UTC)
+  configTime(0, 0, NTP_SERVER);
+  
   // Initialize MQTT client
   client.setServer(MQTT_SERVER, MQTT_PORT);
   client.setCallback(callback);
   
   // Set device topic
-  sprintf(topic, "device/%s", DEVICE_ID);
+  #if USE_BINARY_PAYLOAD
+    sprintf(topic, "device/%s/bin", DEVICE_ID);
+  #else
+    sprintf(topic, "device/%s", DEVICE_ID);
+  #endif
 }
 
 void loop() {
@@ -82,8 +91,8 @@ void loop() {
     lastTempCheck = currentMillis;
     readTemperature();
     
-    // Auto control based on temperature
-    if (autoMode) {
+    // Auto control based on temperature (left to the server while connected)
+    if (autoMode && !(SERVER_AUTOMATION && client.connected())) {
       if (temperature > TEMP_THRESHOLD && !fanStatus) {
         setFanStatus(true);
       } else if (temperature <= TEMP_THRESHOLD - TEMP_HYSTERESIS && fanStatus) {
@@ -165,10 +174,19 @@ void callback(char* topic, byte* payload, unsigned int length) {
   DeserializationError error = deserializeJson(doc, message);
   
   if (!error) {
+    // Remember the command ID so the next report confirms it
+    const char* commandId = doc["id"] | "";
+    strncpy(lastCommandId, commandId, sizeof(lastCommandId) - 1);
+    lastCommandId[sizeof(lastCommandId) - 1] = '\0';
+    
     // Process control commands
     if (doc.containsKey("fan")) {
       bool newFanStatus = doc["fan"];
-      autoMode = false;  // Switch to manual mode
+      // Server automation commands keep auto mode, others switch to manual
+      const char* source = doc["source"] | "";
+      if (strcmp(source, "auto") != 0) {
+        autoMode = false;
+      }
       setFanStatus(newFanStatus);
     }
     
@@ -182,6 +200,8 @@ void callback(char* topic, byte* payload, unsigned int length) {
           setFanStatus(false);
         }
       }
+      // Report the new mode right away
+      publishData();
     }
   }
 }
@@ -222,13 +242,21 @@ void setFanStatus(bool status) {
 }
 
 void publishData() {
+  #if USE_BINARY_PAYLOAD
+    publishBinaryData();
+    return;
+  #endif
+  
   // Create JSON document
   DynamicJsonDocument doc(1024);
   doc["device_id"] = DEVICE_ID;
   doc["temperature"] = temperature;
   doc["fan"] = fanStatus;
   doc["auto"] = autoMode;
-  doc["timestamp"] = millis();
+  doc["timestamp"] = eventTimestamp();
+  if (lastCommandId[0] != '\0') {
+    doc["ack"] = lastCommandId;
+  }
   
   // Serialize JSON to string
   char buffer[256];
@@ -236,4 +264,39 @@ void publishData() {
   
   // Publish to MQTT topic
   client.publish(topic, buffer, n);
+}
+
+// Publish the fixed-layout binary frame decoded by backend/utils/payload_codec.py
+void publishBinaryData() {
+  uint8_t frame[13 + 32];
+  uint8_t flags = (fanStatus ? 0x01 : 0) | (autoMode ? 0x02 : 0) | 0x04;
+  int16_t centidegrees = (int16_t)lroundf(temperature * 100.0f);
+  uint64_t timestamp = eventTimestamp();
+  size_t length = 13;
+  
+  frame[0] = 0xFE;  // Marker, never the first byte of JSON
+  frame[1] = 2;     // Frame version
+  // The ESP32 is little endian, matching the frame layout
+  memcpy(frame + 3, &centidegrees, sizeof(centidegrees));
+  memcpy(frame + 5, &timestamp, sizeof(timestamp));
+  
+  if (strlen(lastCommandId) == 32) {
+    flags |= 0x08;
+    memcpy(frame + 13, lastCommandId, 32);
+    length += 32;
+  }
+  frame[2] = flags;
+  
+  client.publish(topic, frame, length);
+}
+
+// Milliseconds since the epoch once NTP has set the clock, uptime before that;
+// the backend only uses epoch values as event time and for deduplication
+uint64_t eventTimestamp() {
+  struct timeval now;
+  gettimeofday(&now, NULL);
+  if (now.tv_sec > 1600000000) {
+    return (uint64_t)now.tv_sec * 1000 + now.tv_usec / 1000;
+  }
+  return millis();
 }
\ No newline at end of file
@@ -89,6 +89,7 @@ cp $PROJECT_DIR/raspberry_pi/systemd/mosquitto.service $SYSTEMD_DIR/
 # Set up Systemd service for the backend
 echo "Setting up Systemd service for the backend..."
 cp $PROJECT_DIR/raspberry_pi/systemd/exhaust-backend.service $SYSTEMD_DIR/
+cp $PROJECT_DIR/raspberry_pi/systemd/exhaust-ingest.service $SYSTEMD_DIR/
 
 # Initialize the database
 echo "Initializing database..."
@@ -103,6 +104,8 @@ systemctl enable mosquitto.service
 systemctl start mosquitto.service
 systemctl enable exhaust-backend.service
 systemctl start exhaust-backend.service
+systemctl enable exhaust-ingest.service
+systemctl start exhaust-ingest.service
 
 # Set up NGINX as a reverse proxy (optional)
 echo "Setting up NGINX as a reverse proxy..."
@@ -132,9 +135,11 @@ echo "MQTT Broker: localhost:1883"
 echo ""
 echo "You can check the service status with:"
 echo "  systemctl status exhaust-backend.service"
+echo "  systemctl status exhaust-ingest.service"
 echo "  systemctl status mosquitto.service"
 echo ""
 echo "View logs with:"
 echo "  journalctl -u exhaust-backend.service"
+echo "  journalctl -u exhaust-ingest.service"
 echo "  journalctl -u mosquitto.service"
 echo "========================================"
\ No newline at end of file